@@ -0,0 +1,76 @@
+import json
+import time
+import asyncio
+import argparse
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+def create_app(
+    token_rate: float = 50.0,
+    first_token_latency: float = 0.2,
+    tokens: int = 60,
+    model: str = "mistral"
+) -> FastAPI:
+    """
+    Build an Ollama stand-in that streams /api/generate as NDJSON.
+
+    Args:
+        token_rate (float): Tokens emitted per second after the first one
+        first_token_latency (float): Seconds before the first token is sent
+        tokens (int): Number of tokens per completion
+        model (str): Model name echoed back in every chunk
+    """
+    app = FastAPI(title="Fake Ollama")
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        prompt_tokens = len(body.get("prompt", "").split())
+
+        async def stream():
+            started = time.perf_counter()
+            await asyncio.sleep(first_token_latency)
+            for i in range(tokens):
+                if i:
+                    await asyncio.sleep(1 / token_rate)
+                yield json.dumps({
+                    "model": model,
+                    "created_at": "",
+                    "response": "calm " if i % 2 else "breathe ",
+                    "done": False
+                }) + "\n"
+            total = time.perf_counter() - started
+            yield json.dumps({
+                "model": model,
+                "created_at": "",
+                "response": "",
+                "done": True,
+                "prompt_eval_count": prompt_tokens,
+                "eval_count": tokens,
+                "eval_duration": int((total - first_token_latency) * 1e9),
+                "total_duration": int(total * 1e9)
+            }) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": f"{model}:latest"}]}
+
+    return app
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a fake Ollama server")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--token-rate", type=float, default=50.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.2)
+    parser.add_argument("--tokens", type=int, default=60)
+    args = parser.parse_args()
+
+    app = create_app(args.token_rate, args.first_token_latency, args.tokens)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Cold-start import budget for the API.
+
+Runs `python -X importtime -c "import server"` in fresh interpreters and fails
+when the cumulative import time of `server` exceeds the budget. The slowest
+imports are listed so a regression can be traced to the module that caused it.
+
+Usage (from backend/):
+    python -m benchmarks.import_time --budget-ms 1200
+"""
+import os
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+def measure(module: str, env: Dict[str, str]) -> List[Tuple[str, int, int]]:
+    """
+    Import `module` in a fresh interpreter.
+
+    Returns:
+        List[Tuple[str, int, int]]: (module, self_us, cumulative_us) per import
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fail when API cold-start import time exceeds a budget")
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500")))
+    parser.add_argument("--runs", type=int, default=3, help="Best of N runs is compared to the budget")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "PYTHONDONTWRITEBYTECODE": "0",
+        "DATABASE_URL": os.getenv("DATABASE_URL", "sqlite:///:memory:"),
+        "LOG_LEVEL": "WARNING",
+    }
+
+    # The first run also warms the bytecode cache
+    runs = [measure(args.module, env) for _ in range(args.runs)]
+    totals = [next(cum for name, _, cum in rows if name == args.module) for rows in runs]
+    best = min(range(len(runs)), key=lambda i: totals[i])
+    best_ms = totals[best] / 1000
+
+    print(f"{'self ms':>9} {'cumulative ms':>14}  module")
+    for name, self_us, cumulative_us in sorted(runs[best], key=lambda row: row[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.1f} {cumulative_us / 1000:>14.1f}  {name}")
+    print(f"import {args.module}: best {best_ms:.0f} ms of {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    if best_ms > args.budget_ms:
+        print(f"Import time budget exceeded by {best_ms - args.budget_ms:.0f} ms")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
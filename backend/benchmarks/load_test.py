@@ -0,0 +1,295 @@
+"""
+End-to-end load test for the HealMind API.
+
+Boots server.app and a fake Ollama in-process (each on its own uvicorn
+thread), stubs STT/TTS, drives a weighted mix of endpoints and reports
+throughput, p50/p95/p99 latency and Ollama time-to-first-token. Every run is
+written to benchmarks/results/ so it can be compared with a baseline.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --requests 500 --concurrency 20
+    python -m benchmarks.load_test --baseline benchmarks/results/<run>.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+RESULTS_DIR = Path(__file__).parent / "results"
+BENCH_API_KEY = "bench-key"
+DEMO_AUTH = {"Authorization": "Bearer DEMO_KEY_123"}
+DEFAULT_MIX = "chat_message=50,list_sessions=20,get_history=10,copilot_summary=10,voice_process=10"
+MESSAGES = [
+    "I feel overwhelmed by my workload this week",
+    "Can you suggest a short breathing exercise?",
+    "I had trouble sleeping again last night",
+    "How do I stay calm before a difficult conversation?",
+]
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    return {
+        "count": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+    }
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return round(value * 1000, 2) if value is not None else None
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+def _parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+def _start_uvicorn(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Server on port {port} failed to start")
+        time.sleep(0.05)
+    return server, thread
+
+class Scenarios:
+    """Requests issued by the load generator, keyed by mix name."""
+
+    def __init__(self, client, wav: bytes):
+        self.client = client
+        self.wav = wav
+        self.session_ids: List[str] = []
+
+    def _session_id(self) -> Optional[str]:
+        return random.choice(self.session_ids) if self.session_ids else None
+
+    async def chat_message(self):
+        session_id = self._session_id() if random.random() < 0.7 else None
+        response = await self.client.post("/api/chat/message", json={
+            "message": random.choice(MESSAGES),
+            "session_id": session_id
+        })
+        if response.status_code == 200 and not session_id:
+            self.session_ids.append(response.json()["session_id"])
+        return response
+
+    async def list_sessions(self):
+        return await self.client.get("/api/chat/sessions")
+
+    async def get_history(self):
+        return await self.client.get(f"/api/chat/sessions/{self._session_id()}")
+
+    async def copilot_summary(self):
+        return await self.client.get(f"/api/chat/copilot-summary/{self._session_id()}")
+
+    async def voice_process(self):
+        return await self.client.post(
+            "/api/voice/process",
+            files={"audio": ("turn.wav", self.wav, "audio/wav")},
+            data={"settings": json.dumps({"language": "en"})},
+            headers=DEMO_AUTH
+        )
+
+async def run_load(base_url: str, args, weights: Dict[str, float]) -> Dict:
+    import httpx
+    from benchmarks.stubs import make_wav
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"X-API-Key": BENCH_API_KEY, "X-User-Email": "bench@healmind.ai"},
+        timeout=args.timeout,
+        limits=limits
+    ) as client:
+        scenarios = Scenarios(client, make_wav(args.audio_seconds))
+
+        # Seed a few sessions so read scenarios have something to hit
+        for _ in range(args.seed_sessions):
+            await scenarios.chat_message()
+
+        names = list(weights)
+        plan = random.choices(names, weights=[weights[n] for n in names], k=args.requests)
+        latencies: Dict[str, List[float]] = {name: [] for name in names}
+        errors: Dict[str, int] = {name: 0 for name in names}
+        queue: asyncio.Queue = asyncio.Queue()
+        for name in plan:
+            queue.put_nowait(name)
+
+        async def worker():
+            while True:
+                try:
+                    name = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                try:
+                    response = await getattr(scenarios, name)()
+                    ok = response.status_code < 400
+                except Exception:
+                    ok = False
+                if ok:
+                    latencies[name].append(time.perf_counter() - started)
+                else:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "overall": summarize(all_latencies, sum(errors.values()), elapsed),
+        "scenarios": {name: summarize(latencies[name], errors[name], elapsed) for name in names},
+    }
+
+def compare(current: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """
+    Return the names whose latency or throughput regressed past the threshold.
+
+    Scenarios are compared on p95 latency; throughput is only compared
+    overall since per-scenario counts depend on the sampled mix.
+    """
+    regressions = []
+    rows = [*current["scenarios"].items(), ("overall", current["overall"])]
+    for name, result in rows:
+        previous = baseline["overall"] if name == "overall" else baseline.get("scenarios", {}).get(name)
+        if not previous or not previous.get("p95_ms") or not result.get("p95_ms"):
+            continue
+        p95_change = result["p95_ms"] / previous["p95_ms"] - 1
+        line = f"  {name:<16} p95 {p95_change:+.1%}"
+        regressed = p95_change > max_regression
+        if name == "overall" and previous.get("throughput_rps"):
+            rps_change = result["throughput_rps"] / previous["throughput_rps"] - 1
+            line += f"  throughput {rps_change:+.1%}"
+            regressed = regressed or rps_change < -max_regression
+        print(line)
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="HealMind end-to-end load test")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="name=weight pairs, e.g. chat_message=5,list_sessions=1")
+    parser.add_argument("--database-url", default=None, help="Defaults to a fresh SQLite file")
+    parser.add_argument("--token-rate", type=float, default=50.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.2)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--stt-latency", type=float, default=0.3)
+    parser.add_argument("--tts-latency", type=float, default=0.4)
+    parser.add_argument("--audio-seconds", type=float, default=2.0)
+    parser.add_argument("--seed-sessions", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--api-port", type=int, default=18001)
+    parser.add_argument("--ollama-port", type=int, default=18434)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", default=None, help="Earlier result file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p95/throughput regression")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    # Configure the app before it is imported
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='healmind-bench-')}/bench.db"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{args.ollama_port}"
+    os.environ["API_KEYS"] = hashlib.sha256(BENCH_API_KEY.encode()).hexdigest()
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from benchmarks.fake_ollama import create_app
+    from benchmarks.stubs import install_voice_stubs
+    import metrics
+
+    install_voice_stubs(args.stt_latency, args.tts_latency)
+    import server
+
+    # Capture exact TTFT samples alongside the Prometheus histogram
+    ttft_samples: List[float] = []
+    observe = metrics.OLLAMA_TIME_TO_FIRST_TOKEN.observe
+    def record_ttft(value, *extra):
+        ttft_samples.append(value)
+        observe(value, *extra)
+    metrics.OLLAMA_TIME_TO_FIRST_TOKEN.observe = record_ttft
+
+    _start_uvicorn(create_app(args.token_rate, args.first_token_latency, args.tokens), args.ollama_port)
+    api_server, api_thread = _start_uvicorn(server.app, args.api_port)
+
+    weights = _parse_mix(args.mix)
+    results = asyncio.run(run_load(f"http://127.0.0.1:{args.api_port}", args, weights))
+    api_server.should_exit = True
+    api_thread.join(timeout=10)
+
+    results["ttft"] = {
+        "count": len(ttft_samples),
+        "p50_ms": _ms(percentile(ttft_samples, 50)),
+        "p95_ms": _ms(percentile(ttft_samples, 95)),
+        "p99_ms": _ms(percentile(ttft_samples, 99)),
+    }
+    report = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "git_revision": _git_revision(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "database": database_url.split("://")[0],
+        **results
+    }
+
+    print(f"{'scenario':<16} {'count':>6} {'errors':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in [*report["scenarios"].items(), ("overall", report["overall"])]:
+        print(
+            f"{name:<16} {row['count']:>6} {row['errors']:>6} {row['throughput_rps']:>8} "
+            f"{row['p50_ms'] or '-':>9} {row['p95_ms'] or '-':>9} {row['p99_ms'] or '-':>9}"
+        )
+    ttft = report["ttft"]
+    print(f"ollama ttft      n={ttft['count']} p50={ttft['p50_ms']} p95={ttft['p95_ms']} p99={ttft['p99_ms']} ms")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.utcnow():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        print(f"Compared with {args.baseline}:")
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(report, baseline, args.max_regression)
+        if regressions:
+            print(f"Regressed past {args.max_regression:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Full-text search latency against a growing chat history.
+
+Seeds a SQLite database (FTS5 index) with synthetic messages spread over many
+users and reports median/p95 latency of ranked, user-scoped searches at each
+history size. Run it against PostgreSQL with --database-url to exercise the
+tsvector/GIN path instead.
+
+Usage (from backend/):
+    python -m benchmarks.search --sizes 10000 100000 --users 200
+"""
+import time
+import uuid
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+WORDS = (
+    "anxious calm breathing sleep work deadline family walk gratitude journal stress focus "
+    "meditation morning evening tired energy friend worry relax mindful body tension rest"
+).split()
+# Long tail so term frequencies are roughly Zipfian, as in real conversations
+VOCABULARY = WORDS + [f"term{i}" for i in range(5000)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+def _seed(engine, users, messages, started_at):
+    from models.chat import ChatSession, ChatMessage
+
+    rng = random.Random(len(users) + messages)
+    with Session(engine) as db:
+        sessions = [str(uuid.uuid4()) for _ in range(len(users) * 3)]
+        db.execute(insert(ChatSession), [
+            {"session_id": session_id, "user_id": users[i % len(users)], "session_metadata": {}}
+            for i, session_id in enumerate(sessions)
+        ])
+        db.execute(insert(ChatMessage), [
+            {
+                "message_id": str(uuid.uuid4()),
+                "session_id": rng.choice(sessions),
+                "role": "user" if i % 2 else "assistant",
+                "content": " ".join(rng.choices(VOCABULARY, WEIGHTS, k=40)),
+                "timestamp": started_at + timedelta(seconds=i)
+            }
+            for i in range(messages)
+        ])
+        db.commit()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Full-text search latency benchmark")
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    from database import Base
+    import models.chat
+    from services.search import ensure_search_schema, search_messages
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine)
+    ensure_search_schema(engine)
+
+    users = [f"user{i}@example.com" for i in range(args.users)]
+    rng = random.Random(0)
+    seeded = 0
+    for size in sorted(args.sizes):
+        _seed(engine, users, size - seeded, datetime.utcnow())
+        seeded = size
+
+        timings = []
+        with Session(engine) as db:
+            for _ in range(args.queries):
+                query = " ".join(rng.choices(VOCABULARY, WEIGHTS, k=2))
+                started = time.perf_counter()
+                search_messages(db, rng.choice(users), query, limit=20)
+                timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        print(
+            f"{size:>9} messages: p50 {statistics.median(timings):6.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:6.2f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
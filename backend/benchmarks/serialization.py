@@ -0,0 +1,98 @@
+"""
+Encode-time benchmark for chat history responses.
+
+Compares the default path (ORM rows -> MessageResponse models -> response_model
+validation -> JSON) with the FAST_JSON_RESPONSES path (column tuples -> orjson)
+and reports time per thousand messages plus gzip/brotli sizes.
+
+Usage (from backend/):
+    python -m benchmarks.serialization --messages 5000
+"""
+import gzip
+import json
+import time
+import uuid
+import argparse
+from datetime import datetime, timedelta
+from typing import Callable, List
+import brotli
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+def _ms_per_thousand(fn: Callable[[], bytes], messages: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    # Seconds per message -> milliseconds per thousand messages
+    return best / messages * 1000 * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Chat history serialisation benchmark")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--content-length", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from database import Base
+    from models.chat import ChatSession, ChatMessage
+    from routers.chat import MessageResponse, MESSAGE_FIELDS
+    from responses import rows_response
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session_id = str(uuid.uuid4())
+    started_at = datetime.utcnow()
+    with Session(engine) as db:
+        db.add(ChatSession(session_id=session_id))
+        db.add_all([
+            ChatMessage(
+                message_id=str(uuid.uuid4()),
+                session_id=session_id,
+                role="user" if i % 2 else "assistant",
+                content=("Take a slow breath and notice how you feel. " * 20)[:args.content_length],
+                timestamp=started_at + timedelta(seconds=i)
+            )
+            for i in range(args.messages)
+        ])
+        db.commit()
+
+    adapter = TypeAdapter(List[MessageResponse])
+
+    with Session(engine) as db:
+        messages = db.query(ChatMessage).filter(ChatMessage.session_id == session_id).order_by(ChatMessage.timestamp).all()
+        rows = db.query(
+            ChatMessage.message_id, ChatMessage.role, ChatMessage.content, ChatMessage.timestamp
+        ).filter(ChatMessage.session_id == session_id).order_by(ChatMessage.timestamp).all()
+
+        def default_path() -> bytes:
+            models = [
+                MessageResponse(message_id=m.message_id, role=m.role, content=m.content, timestamp=m.timestamp)
+                for m in messages
+            ]
+            # What FastAPI does for response_model: validate, then encode
+            validated = adapter.validate_python(models)
+            return json.dumps(jsonable_encoder(adapter.dump_python(validated, mode="json"))).encode("utf-8")
+
+        def fast_path() -> bytes:
+            return rows_response(rows, MESSAGE_FIELDS).body
+
+        assert json.loads(default_path()) == json.loads(fast_path()), "Fast path output differs"
+
+        default_ms = _ms_per_thousand(default_path, args.messages, args.repeat)
+        fast_ms = _ms_per_thousand(fast_path, args.messages, args.repeat)
+
+    body = fast_path()
+    print(f"messages: {args.messages}, content length: {args.content_length}")
+    print(f"default response_model path: {default_ms:8.2f} ms per 1000 messages")
+    print(f"fast orjson path:            {fast_ms:8.2f} ms per 1000 messages ({default_ms / fast_ms:.1f}x)")
+    print(
+        f"body: {len(body) / 1024:.0f} KiB, gzip {len(gzip.compress(body, 6)) / 1024:.0f} KiB, "
+        f"brotli {len(brotli.compress(body, quality=4)) / 1024:.0f} KiB"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import io
+import wave
+import asyncio
+
+STUB_TRANSCRIPT = "I have been feeling stressed at work and I can't switch off in the evening"
+
+def install_voice_stubs(stt_latency: float = 0.3, tts_latency: float = 0.4, tts_bytes: int = 32_000) -> None:
+    """
+    Replace the Whisper and Edge TTS calls of VoiceService with fixed-latency stubs.
+
+    The LLM stage still goes through OllamaService, so voice turns exercise the
+    real prompt building and generation path against the fake Ollama.
+    """
+    from external_integrations.voice_service import VoiceService
+
+    async def transcribe_audio(self, audio_data, filename: str = "audio.wav") -> str:
+        # Drain file uploads in chunks, as the Whisper client would when sending them
+        if hasattr(audio_data, "read"):
+            while audio_data.read(64 * 1024):
+                pass
+        await asyncio.sleep(stt_latency)
+        return STUB_TRANSCRIPT
+
+    async def generate_tts(self, text: str, **kwargs) -> bytes:
+        await asyncio.sleep(tts_latency)
+        return b"ID3" + bytes(tts_bytes)
+
+    VoiceService.transcribe_audio = transcribe_audio
+    VoiceService.generate_tts = generate_tts
+
+def make_wav(seconds: float = 2.0, sample_rate: int = 16_000) -> bytes:
+    """Build a silent mono 16-bit WAV clip to upload as voice input."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(int(seconds * sample_rate) * 2))
+    return buffer.getvalue()
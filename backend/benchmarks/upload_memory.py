@@ -0,0 +1,87 @@
+"""
+Per-request peak memory of voice uploads.
+
+Posts WAV clips of increasing length to /api/voice/process in-process (STT and
+TTS stubbed, LLM against the fake Ollama) and reports the peak Python memory
+traced while each request is handled, next to the upload size. Clips past
+AUDIO_MAX_SECONDS and bodies past AUDIO_MAX_BYTES should be rejected with a
+413 at a small, constant peak.
+
+Usage (from backend/):
+    python -m benchmarks.upload_memory --seconds 10 60 240 600 --oversize-mb 40
+"""
+import io
+import os
+import time
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import tracemalloc
+from typing import Optional
+
+def _row(label: str, size: int, status: int, peak: int, elapsed: float) -> str:
+    return f"{label:<14} {size / 2**20:>9.2f} {status:>6} {peak / 2**10:>11.0f} {elapsed * 1000:>9.1f}"
+
+async def _measure(client, label: str, payload: bytes, content_length: Optional[int] = None) -> str:
+    from benchmarks.load_test import DEMO_AUTH
+
+    headers = dict(DEMO_AUTH)
+    if content_length is not None:
+        headers["Content-Length"] = str(content_length)
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    # A file object makes httpx send the body in 64 KiB chunks, like a real client
+    response = await client.post(
+        "/api/voice/process",
+        files={"audio": ("turn.wav", io.BytesIO(payload), "audio/wav")},
+        headers=headers
+    )
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    return _row(label, len(payload), response.status_code, peak, elapsed)
+
+async def run(args) -> None:
+    import httpx
+    import server
+    from benchmarks.stubs import make_wav
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        print(f"{'upload':<14} {'size MiB':>9} {'status':>6} {'peak KiB':>11} {'time ms':>9}")
+        for seconds in args.seconds:
+            wav = make_wav(seconds, args.sample_rate)
+            print(await _measure(client, f"{seconds:g}s wav", wav))
+        if args.oversize_mb:
+            oversized = make_wav(1, args.sample_rate) + bytes(int(args.oversize_mb * 2**20))
+            print(await _measure(client, f"{args.oversize_mb:g} MiB body", oversized))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Voice upload peak memory benchmark")
+    parser.add_argument("--seconds", type=float, nargs="+", default=[10, 60, 240, 600])
+    parser.add_argument("--sample-rate", type=int, default=16_000)
+    parser.add_argument("--oversize-mb", type=float, default=40)
+    parser.add_argument("--ollama-port", type=int, default=18435)
+    args = parser.parse_args()
+
+    # Configure the app before it is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='healmind-bench-')}/bench.db"
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{args.ollama_port}"
+    os.environ["API_KEYS"] = hashlib.sha256(b"bench-key").hexdigest()
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from benchmarks.fake_ollama import create_app
+    from benchmarks.load_test import _start_uvicorn
+    from benchmarks.stubs import install_voice_stubs
+
+    install_voice_stubs(stt_latency=0, tts_latency=0)
+    _start_uvicorn(create_app(first_token_latency=0, tokens=5, token_rate=1000), args.ollama_port)
+
+    tracemalloc.start()
+    asyncio.run(run(args))
+    tracemalloc.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Maintenance commands for the HealMind backend.
+
+Usage (from backend/):
+    python cli.py backfill-summaries --concurrency 4
+    python cli.py worker
+"""
+import os
+import json
+import signal
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+import typer
+from sqlalchemy import select
+from logging_config import configure_logging
+from database import SessionLocal
+from models.chat import ChatSession
+from services import archive, analytics, embeddings, summaries
+from services.jobs import job_runner, JOB_CONCURRENCY
+from services.usage import usage_meter
+
+app = typer.Typer(help="HealMind backend maintenance commands", no_args_is_help=True)
+logger = logging.getLogger("cli")
+
+@app.callback()
+def main() -> None:
+    configure_logging()
+
+def _load_checkpoint(path: Path) -> Dict:
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"last_session_id": None, "summarized": 0, "skipped": 0, "failed": []}
+
+def _save_checkpoint(path: Path, state: Dict) -> None:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(state, indent=2))
+    os.replace(tmp_path, path)
+
+async def _summarize_one(session_id: str, force: bool, semaphore: asyncio.Semaphore) -> str:
+    async with semaphore:
+        with SessionLocal() as db:
+            session = db.get(ChatSession, session_id)
+            # Archived sessions stay archived; rehydrating everything would undo archival
+            if session is None or session.archived_at is not None:
+                return "skipped"
+            if not force and summaries.cached_summary(session) is not None:
+                return "skipped"
+            try:
+                summary = await summaries.summarize_session(db, session)
+            except Exception as e:
+                logger.warning("Failed to summarize session %s: %s", session_id, e)
+                return "failed"
+            return "summarized" if summary is not None else "skipped"
+
+async def _backfill_summaries(checkpoint: Path, concurrency: int, batch_size: int, limit: Optional[int], force: bool) -> Dict:
+    state = _load_checkpoint(checkpoint)
+    semaphore = asyncio.Semaphore(concurrency)
+    processed = 0
+    while limit is None or processed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - processed)
+        query = select(ChatSession.session_id).order_by(ChatSession.session_id).limit(size)
+        if state["last_session_id"]:
+            query = query.where(ChatSession.session_id > state["last_session_id"])
+        with SessionLocal() as db:
+            session_ids: List[str] = list(db.scalars(query))
+        if not session_ids:
+            break
+
+        outcomes = await asyncio.gather(*(_summarize_one(session_id, force, semaphore) for session_id in session_ids))
+        for session_id, outcome in zip(session_ids, outcomes):
+            if outcome == "failed":
+                state["failed"].append(session_id)
+            else:
+                state[outcome] += 1
+        # Only advance past a batch once all of it has finished, so a restart never skips sessions
+        state["last_session_id"] = session_ids[-1]
+        _save_checkpoint(checkpoint, state)
+        processed += len(session_ids)
+        typer.echo(f"{processed} sessions: {state['summarized']} summarized, {state['skipped']} skipped, {len(state['failed'])} failed")
+    return state
+
+@app.command("backfill-summaries")
+def backfill_summaries(
+    concurrency: int = typer.Option(4, min=1, help="Summaries generated at the same time"),
+    batch_size: int = typer.Option(50, min=1, help="Sessions per checkpointed batch"),
+    checkpoint: Path = typer.Option(Path(".backfill-summaries.json"), help="Progress file; rerun to resume"),
+    limit: Optional[int] = typer.Option(None, help="Stop after this many sessions"),
+    force: bool = typer.Option(False, help="Regenerate summaries that are still current"),
+    restart: bool = typer.Option(False, help="Ignore an existing checkpoint")
+) -> None:
+    """Generate copilot summaries for every chat session."""
+    if restart and checkpoint.exists():
+        checkpoint.unlink()
+    state = asyncio.run(_backfill_summaries(checkpoint, concurrency, batch_size, limit, force))
+    if state["failed"]:
+        typer.echo(f"Failed sessions are listed in {checkpoint}")
+
+async def _run_worker() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    usage_meter.start()
+    job_runner.start()
+    logger.info("Job worker running with concurrency %d", job_runner.concurrency)
+    await stop.wait()
+    await job_runner.stop()
+    await usage_meter.stop()
+
+@app.command()
+def worker(concurrency: int = typer.Option(JOB_CONCURRENCY, min=1)) -> None:
+    """Run queued background jobs until interrupted."""
+    job_runner.concurrency = concurrency
+    asyncio.run(_run_worker())
+
+@app.command("archive")
+def archive_sessions(
+    older_than_days: int = typer.Option(archive.ARCHIVE_RETENTION_DAYS),
+    limit: Optional[int] = None,
+    months_ahead: int = 2
+) -> None:
+    """Archive cold sessions (same as `python -m services.archive`)."""
+    with SessionLocal() as db:
+        archive.ensure_message_partitions(db, months_ahead=months_ahead)
+        archived = archive.archive_cold_sessions(db, older_than_days=older_than_days, limit=limit)
+    typer.echo(f"Archived {archived} sessions")
+
+@app.command("backfill-embeddings")
+def backfill_embeddings(batch_size: int = 64, limit: Optional[int] = None) -> None:
+    """Embed stored messages that have no embedding yet."""
+    embedded = asyncio.run(embeddings.backfill_embeddings(batch_size=batch_size, limit=limit))
+    typer.echo(f"Embedded {embedded} messages")
+
+@app.command("rebuild-analytics")
+def rebuild_analytics(user_id: Optional[str] = None) -> None:
+    """Recompute the daily analytics rollups from chat_messages."""
+    with SessionLocal() as db:
+        processed = analytics.rebuild_user_activity(db, user_id=user_id)
+    typer.echo(f"Rebuilt analytics for {processed} sessions")
+
+if __name__ == "__main__":
+    app()
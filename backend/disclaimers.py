@@ -0,0 +1,46 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Disclaimer templates shown under AI replies; messages store the id, not the text.
+# Changing a text changes it for every stored message that references it.
+WELLNESS = "wellness"
+VOICE_WELLNESS = "voice_wellness"
+
+DISCLAIMERS: Dict[str, str] = {
+    WELLNESS: """
+\n\n---
+*Note: HealMind AI is a wellness and self-improvement tool designed to support your personal growth and stress management. It is not a substitute for professional medical or mental health care. If you are experiencing mental health concerns, please consult with a qualified healthcare provider.*
+""",
+    VOICE_WELLNESS: """
+Note: This is a wellness and self-improvement conversation. For medical concerns, please consult a healthcare provider.
+""",
+}
+
+# Short replies (greetings, acknowledgements) go out without a disclaimer
+MIN_REPLY_CHARS = 100
+
+def disclaimer_for(reply: str, template: str = WELLNESS) -> Optional[str]:
+    """Template id to attach to an AI reply, or None if the reply is too short to carry one."""
+    return template if len(reply) > MIN_REPLY_CHARS else None
+
+def render(content: str, disclaimer: Optional[str]) -> str:
+    """Message text as shown to the user, with its disclaimer appended."""
+    return content + DISCLAIMERS[disclaimer] if disclaimer in DISCLAIMERS else content
+
+def split_disclaimer(content: str) -> Tuple[str, Optional[str]]:
+    """Split a rendered disclaimer off the end of `content`; returns (text, template id)."""
+    for template, text in DISCLAIMERS.items():
+        if content.endswith(text):
+            return content[:-len(text)], template
+    return content, None
+
+def strip_context(context: Iterable[dict]) -> List[dict]:
+    """
+    Remove rendered disclaimers from client-sent history before it goes into a prompt.
+
+    Clients resend replies as they displayed them, disclaimer included.
+    """
+    return [
+        {**turn, "content": split_disclaimer(turn["content"])[0]}
+        if isinstance(turn, dict) and isinstance(turn.get("content"), str) else turn
+        for turn in context
+    ]
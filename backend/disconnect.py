@@ -0,0 +1,59 @@
+import asyncio
+import logging
+from typing import Awaitable, TypeVar
+from starlette.requests import Request
+from metrics import CLIENT_DISCONNECTS
+from profiling import profiler
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# nginx's status for a request the client abandoned; the client never sees it,
+# but it keeps these requests apart from real errors in logs and metrics
+CLIENT_CLOSED_REQUEST = 499
+
+class ClientDisconnected(Exception):
+    """Raised when the client went away before the response was ready"""
+    pass
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Await `awaitable`, cancelling it if the client disconnects first.
+
+    Only call this once the request body has been read: the disconnect is
+    noticed by waiting for the next ASGI message, which the server delivers as
+    soon as the connection drops.
+
+    Raises:
+        ClientDisconnected: If the client disconnected; `awaitable` has been
+        cancelled and has finished unwinding
+    """
+    work = asyncio.ensure_future(awaitable)
+    if isinstance(work, asyncio.Task):
+        # The work no longer runs in the request's task; keep it in the request's profile
+        profiler.adopt(work)
+    watcher = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        work.cancel()
+        watcher.cancel()
+        raise
+    watcher.cancel()
+    if work.done():
+        return work.result()
+
+    work.cancel()
+    await asyncio.gather(work, return_exceptions=True)
+    route = request.scope.get("route")
+    route_path = getattr(route, "path_format", request.url.path)
+    CLIENT_DISCONNECTS.labels(route_path).inc()
+    logger.info("Client disconnected; cancelled %s %s", request.method, route_path)
+    raise ClientDisconnected()
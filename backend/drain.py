@@ -0,0 +1,89 @@
+import os
+import asyncio
+import logging
+from typing import Awaitable, Optional, Set, TypeVar
+from metrics import IN_FLIGHT_GENERATIONS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# How long in-flight generations may keep running after SIGTERM before they are cancelled
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "60"))
+# Retry-After sent with 503s while draining; another instance can take the retry
+DRAIN_RETRY_AFTER = 1
+
+class ServerDraining(Exception):
+    """Raised for generations refused or cut short because the worker is shutting down"""
+    pass
+
+class InFlightWork:
+    """
+    Model generations (chat replies, voice turns) running in this worker.
+
+    On SIGTERM `begin()` marks the worker as draining: new generations are
+    refused with ServerDraining and the running ones get DRAIN_TIMEOUT
+    seconds to finish before they are cancelled, so the worker can flush
+    its buffers and exit before the supervisor kills it.
+    """
+
+    def __init__(self, timeout: float = DRAIN_TIMEOUT):
+        self.timeout = timeout
+        self.draining = False
+        self._tasks: Set[asyncio.Task] = set()
+        self._cut_short: Set[asyncio.Task] = set()
+        self._deadline: Optional[asyncio.TimerHandle] = None
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        """
+        Await `awaitable` as tracked in-flight work.
+
+        Raises:
+            ServerDraining: If the worker is draining, or the drain deadline
+            passed before `awaitable` finished
+        """
+        if self.draining:
+            # Never awaited now; close it so the refusal does not leave a "never awaited" warning
+            close = getattr(awaitable, "close", None)
+            if close is not None:
+                close()
+            raise ServerDraining()
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        IN_FLIGHT_GENERATIONS.inc()
+        try:
+            return await awaitable
+        except asyncio.CancelledError:
+            if task in self._cut_short:
+                raise ServerDraining() from None
+            raise
+        finally:
+            self._tasks.discard(task)
+            self._cut_short.discard(task)
+            IN_FLIGHT_GENERATIONS.dec()
+
+    def begin(self) -> None:
+        """Stop accepting generations and cancel what is left after the timeout. Call on the event loop."""
+        if self.draining:
+            return
+        self.draining = True
+        logger.info("Draining: waiting up to %.0fs for %d in-flight generations", self.timeout, len(self._tasks))
+        self._deadline = asyncio.get_running_loop().call_later(self.timeout, self._cancel_remaining)
+
+    def _cancel_remaining(self) -> None:
+        if not self._tasks:
+            return
+        logger.warning("Drain timeout reached; cancelling %d in-flight generations", len(self._tasks))
+        for task in self._tasks:
+            self._cut_short.add(task)
+            task.cancel()
+
+    async def wait(self) -> None:
+        """Wait until every in-flight generation finished or was cancelled."""
+        while self._tasks:
+            await asyncio.sleep(0.1)
+
+in_flight = InFlightWork()
@@ -1,29 +1,75 @@
 import httpx
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 import os
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 import json
+import time
+from metrics import (
+    OLLAMA_RETRIES,
+    OLLAMA_TIME_TO_FIRST_TOKEN,
+    OLLAMA_TOKENS,
+    OLLAMA_TOKENS_PER_SECOND,
+)
+from services.usage import record_tokens
 
 logger = logging.getLogger(__name__)
 
+class OllamaServiceError(Exception):
+    """Custom exception for Ollama service errors"""
+    pass
+
+# Only failed calls are retried; a cancelled call (e.g. the client went away) propagates at once
+_retry_on_failure = retry_if_exception_type(OllamaServiceError)
+
 class OllamaResponse(BaseModel):
     response: str
     model: str
     created_at: str
     done: bool
+    prompt_eval_count: Optional[int] = None
+    eval_count: Optional[int] = None
+
+def _record_retry(retry_state) -> None:
+    OLLAMA_RETRIES.inc()
+
+def _record_generation(final_obj: Dict) -> None:
+    """Record token counts and throughput from Ollama's final stream object."""
+    prompt_tokens = final_obj.get("prompt_eval_count")
+    completion_tokens = final_obj.get("eval_count")
+    eval_duration = final_obj.get("eval_duration")
+    record_tokens(prompt_tokens, completion_tokens)
+    if prompt_tokens:
+        OLLAMA_TOKENS.labels("prompt").inc(prompt_tokens)
+    if completion_tokens:
+        OLLAMA_TOKENS.labels("completion").inc(completion_tokens)
+        if eval_duration:
+            # eval_duration is reported in nanoseconds
+            OLLAMA_TOKENS_PER_SECOND.observe(completion_tokens / (eval_duration / 1e9))
+    logger.info(
+        "Ollama generation finished",
+        extra={
+            "sampled": True,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_duration_ms": (final_obj.get("total_duration") or 0) / 1e6
+        }
+    )
 
 class OllamaService:
     def __init__(self):
         self.base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
         self.model = "mistral"
+        self.embedding_model = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
         self.timeout = 30.0
         self.max_retries = 3
 
     @retry(
+        retry=_retry_on_failure,
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10)
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        before_sleep=_record_retry
     )
     async def generate_response(
         self,
@@ -46,6 +92,9 @@ class OllamaService:
             
         Raises:
             OllamaServiceError: If the request fails
+
+        Cancelling the call closes the response stream, which makes Ollama
+        stop generating.
         """
         try:
             async with httpx.AsyncClient(timeout=self.timeout) as client:
@@ -59,26 +108,29 @@ class OllamaService:
                 if context:
                     payload["context"] = context
 
-                response = await client.post(
+                started = time.perf_counter()
+                chunks = []
+                last_obj = {}
+                async with client.stream(
+                    "POST",
                     f"{self.base_url}/api/generate",
                     json=payload
-                )
-                
-                response.raise_for_status()
-                response_text = response.text
-                lines = response_text.strip().splitlines()
-                full_response = ""
-                last_obj = {}
-                for line in lines:
-                    try:
-                        obj = json.loads(line)
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.strip():
+                            continue
+                        try:
+                            obj = json.loads(line)
+                        except Exception:
+                            continue
                         if obj.get('response'):
-                            full_response += obj['response']
+                            if not chunks:
+                                OLLAMA_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started)
+                            chunks.append(obj['response'])
                         last_obj = obj
-                    except Exception:
-                        continue
-                if not full_response:
-                    full_response = ""
+                _record_generation(last_obj)
+                full_response = "".join(chunks)
                 if not last_obj:
                     last_obj = {"response": ""}
                 last_obj['response'] = full_response
@@ -87,16 +139,66 @@ class OllamaService:
                     response=last_obj["response"],
                     model=last_obj.get("model", self.model),
                     created_at=last_obj.get("created_at", ""),
-                    done=last_obj.get("done", True)
+                    done=last_obj.get("done", True),
+                    prompt_eval_count=last_obj.get("prompt_eval_count"),
+                    eval_count=last_obj.get("eval_count")
                 )
                 
         except httpx.HTTPError as e:
-            logger.error(f"HTTP error occurred: {str(e)}")
+            logger.error("HTTP error occurred: %s", e)
             raise OllamaServiceError(f"Failed to generate response: {str(e)}")
         except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}")
+            logger.error("Unexpected error: %s", e)
             raise OllamaServiceError(f"Unexpected error occurred: {str(e)}")
 
-class OllamaServiceError(Exception):
-    """Custom exception for Ollama service errors"""
-    pass 
\ No newline at end of file
+    @retry(
+        retry=_retry_on_failure,
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=1, max=5),
+        before_sleep=_record_retry
+    )
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch of texts with the embedding model in one request.
+
+        Args:
+            texts (List[str]): Inputs to embed
+
+        Returns:
+            List[List[float]]: One vector per input, in input order
+
+        Raises:
+            OllamaServiceError: If the request fails
+        """
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                response = await client.post(
+                    f"{self.base_url}/api/embed",
+                    json={"model": self.embedding_model, "input": texts}
+                )
+                response.raise_for_status()
+                data = response.json()
+                embeddings = data["embeddings"]
+        except httpx.HTTPError as e:
+            logger.error("HTTP error occurred while embedding: %s", e)
+            raise OllamaServiceError(f"Failed to embed texts: {str(e)}")
+        except (KeyError, ValueError) as e:
+            raise OllamaServiceError(f"Unexpected embedding response: {str(e)}")
+        if len(embeddings) != len(texts):
+            raise OllamaServiceError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+        record_tokens(data.get("prompt_eval_count"))
+        return embeddings
+
+    async def ping(self, timeout: float = 2.0) -> bool:
+        """
+        Check that the Ollama server answers, without running the model.
+
+        Returns:
+            bool: True if /api/tags responded successfully
+        """
+        try:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                response = await client.get(f"{self.base_url}/api/tags")
+                return response.status_code == 200
+        except httpx.HTTPError:
+            return False 
\ No newline at end of file
@@ -1,24 +1,25 @@
 import os
 import json
 import asyncio
-import edge_tts
-import tempfile
 import io
-from typing import Optional, Dict, Any
-from openai import AsyncOpenAI
+from typing import Optional, Dict, Any, BinaryIO, Union
 from pathlib import Path
-import soundfile as sf
-import numpy as np
-from pydub import AudioSegment
 import logging
 from external_integrations.ollama_service import OllamaService, OllamaServiceError
+from metrics import observe_stage
+from services.usage import record_audio
+import disclaimers
 import re
 
 logger = logging.getLogger(__name__)
 
+# edge-tts returns 48 kbit/s mono MP3, so the byte count gives the duration
+TTS_BYTES_PER_SECOND = 48000 / 8
+
 class VoiceService:
+    # edge_tts and openai are imported on first use so importing this module stays cheap
     def __init__(self):
-        self.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self._openai_client = None
         self.voice_cache = {}
         self.supported_languages = {
             "en": ["en-US-JennyNeural", "en-US-GuyNeural"],  # female, male
@@ -32,30 +33,39 @@ class VoiceService:
         }
         self.ollama_service = OllamaService()
 
-    async def transcribe_audio(self, audio_data: bytes) -> str:
-        """Transcribe audio using OpenAI's Whisper API."""
-        try:
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_file.flush()
-                temp_filename = temp_file.name
+    @property
+    def openai_client(self):
+        if self._openai_client is None:
+            from openai import AsyncOpenAI
+
+            self._openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._openai_client
 
-            # Read file into memory and close it
-            with open(temp_filename, "rb") as audio_file:
-                file_bytes = audio_file.read()
-            os.unlink(temp_filename)
+    async def aclose(self) -> None:
+        """Close the OpenAI client's connection pool, if it was created."""
+        if self._openai_client is not None:
+            await self._openai_client.close()
+            self._openai_client = None
 
-            # Send to OpenAI as BytesIO
-            audio_file_obj = io.BytesIO(file_bytes)
-            audio_file_obj.name = "audio.wav"  # OpenAI expects a name attribute
+    async def transcribe_audio(self, audio: Union[bytes, BinaryIO], filename: str = "audio.wav") -> str:
+        """
+        Transcribe audio using OpenAI's Whisper API.
 
+        `audio` may be raw bytes or a file object such as a spooled upload,
+        which is streamed into the request without being read into memory first.
+        """
+        try:
+            audio_file = io.BytesIO(audio) if isinstance(audio, (bytes, bytearray)) else audio
+            # Whisper infers the codec from the file name; verbose_json adds the audio duration
             transcription = await self.openai_client.audio.transcriptions.create(
                 model="whisper-1",
-                file=audio_file_obj
+                file=(filename, audio_file),
+                response_format="verbose_json"
             )
+            record_audio(stt_seconds=getattr(transcription, "duration", None))
             return transcription.text
         except Exception as e:
-            logger.error(f"Error in transcription: {str(e)}")
+            logger.error("Error in transcription: %s", e)
             raise
 
     async def generate_tts(self, 
@@ -69,22 +79,22 @@ class VoiceService:
             voices = self.supported_languages.get(language, self.supported_languages["en"])
             voice = voices[0] if voice_gender == "female" else voices[-1]
             
+            import edge_tts
+
             # For MVP, use plain text to avoid SSML being spoken aloud
             communicate = edge_tts.Communicate(text, voice)
             
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_file:
-                await communicate.save(temp_file.name)
-                temp_filename = temp_file.name
-
-            # Read the generated audio
-            with open(temp_filename, "rb") as audio_file:
-                audio_data = audio_file.read()
-
-            os.unlink(temp_filename)
+            # Collect the audio in memory: no temp file to leak when the turn is cancelled
+            chunks = []
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    chunks.append(chunk["data"])
+            audio_data = b"".join(chunks)
+            record_audio(tts_seconds=len(audio_data) / TTS_BYTES_PER_SECOND)
             return audio_data
             
         except Exception as e:
-            logger.error(f"Error in TTS generation: {str(e)}")
+            logger.error("Error in TTS generation: %s", e)
             raise
 
     def clean_ai_response(self, text):
@@ -97,15 +107,17 @@ class VoiceService:
         return cleaned
 
     async def process_voice_session(self,
-                                  audio_data: bytes,
+                                  audio_data: Union[bytes, BinaryIO],
                                   language: str = "en",
                                   voice_gender: str = "female",
                                   style: str = "calm",
-                                  context: list = None) -> Dict[str, Any]:
+                                  context: list = None,
+                                  filename: str = "audio.wav") -> Dict[str, Any]:
         """Process a complete voice session: transcribe, get AI response, and generate TTS."""
         try:
             # Step 1: Transcribe audio
-            transcribed_text = await self.transcribe_audio(audio_data)
+            with observe_stage("process_voice_session", "stt"):
+                transcribed_text = await self.transcribe_audio(audio_data, filename)
 
             # Step 2: Build prompt with context if provided
             system_prompt = (
@@ -113,9 +125,9 @@ class VoiceService:
                 "Do not include any commands, markdown, or system tokens."
             )
             if context and isinstance(context, list) and len(context) > 0:
-                # Format context as chat history
+                # Format context as chat history, without the disclaimers shown under replies
                 chat_history = ""
-                for turn in context:
+                for turn in disclaimers.strip_context(context):
                     if turn.get('role') == 'user':
                         chat_history += f"User: {turn.get('content','')}\n"
                     elif turn.get('role') == 'assistant':
@@ -125,18 +137,20 @@ class VoiceService:
             else:
                 prompt = f"{system_prompt}\nUser: {transcribed_text}"
 
-            ai_response_obj = await self.ollama_service.generate_response(
-                prompt=prompt
-            )
+            with observe_stage("process_voice_session", "llm"):
+                ai_response_obj = await self.ollama_service.generate_response(
+                    prompt=prompt
+                )
             ai_response = self.clean_ai_response(ai_response_obj.response)
 
             # Step 3: Generate TTS for the response
-            tts_audio = await self.generate_tts(
-                ai_response,
-                language=language,
-                voice_gender=voice_gender,
-                style=style
-            )
+            with observe_stage("process_voice_session", "tts"):
+                tts_audio = await self.generate_tts(
+                    ai_response,
+                    language=language,
+                    voice_gender=voice_gender,
+                    style=style
+                )
 
             return {
                 "transcribed_text": transcribed_text,
@@ -145,8 +159,8 @@ class VoiceService:
             }
 
         except OllamaServiceError as e:
-            logger.error(f"Ollama service error: {str(e)}")
+            logger.error("Ollama service error: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Error in voice session processing: {str(e)}")
+            logger.error("Error in voice session processing: %s", e)
             raise 
\ No newline at end of file
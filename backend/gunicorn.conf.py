@@ -0,0 +1,29 @@
+import os
+
+# Gunicorn supervises the uvicorn workers and replaces any that die
+bind = f"0.0.0.0:{os.getenv('PORT', '8001')}"
+# Uvicorn workers that let in-flight generations finish on SIGTERM (see workers.py)
+worker_class = "workers.DrainingUvicornWorker"
+# One worker per CPU available to this container unless overridden
+workers = int(os.getenv("WEB_CONCURRENCY", len(os.sched_getaffinity(0))))
+# Long Ollama generations and voice turns must not be killed as stuck workers
+timeout = int(os.getenv("WORKER_TIMEOUT", "180"))
+# Time a worker gets after SIGTERM before it is killed: the generation drain plus flushing writes
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", int(float(os.getenv("DRAIN_TIMEOUT", "60"))) + 30))
+# Longer than nginx's upstream keepalive_timeout so nginx closes idle connections first
+keepalive = 75
+accesslog = "-"
+
+def on_starting(server):
+    if server.cfg.workers > 1 and not os.getenv("IDEMPOTENCY_REDIS_URL"):
+        # The in-memory store is per worker (see services/idempotency.py)
+        server.log.warning(
+            "IDEMPOTENCY_REDIS_URL is not set: Idempotency-Key is only honoured per worker, "
+            "so with %d workers a retried chat or voice turn can run twice", server.cfg.workers
+        )
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
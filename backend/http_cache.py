@@ -0,0 +1,63 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+
+# Bump when the JSON representation of a cached resource changes (2: disclaimers rendered from template ids)
+ETAG_VERSION = "2"
+
+# Per-user data: the browser may keep it but must revalidate on every use
+REVALIDATE = "private, no-cache"
+# Static catalogs that only change with a deploy
+LONG_LIVED = "public, max-age=86400"
+
+def make_etag(*parts) -> str:
+    """Weak ETag over the given validator parts (weak so compressed bodies still match)."""
+    digest = hashlib.sha1("|".join([ETAG_VERSION, *map(str, parts)]).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Evaluate If-None-Match, falling back to If-Modified-Since when no ETag
+    was sent (RFC 9110 section 13.2.2).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+def set_validators(
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = REVALIDATE
+) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return response
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None, cache_control: str = REVALIDATE) -> Response:
+    return set_validators(Response(status_code=304), etag, last_modified, cache_control)
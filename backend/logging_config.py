@@ -0,0 +1,125 @@
+import os
+import sys
+import copy
+import queue
+import atexit
+import random
+import logging
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from pythonjsonlogger import jsonlogger
+
+# Request id of the request currently being handled, set by RequestIdMiddleware
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Loggers whose INFO records are sampled; in-app records opt in with extra={"sampled": True}
+DEFAULT_SAMPLED_LOGGERS = "uvicorn.access,httpx"
+
+_listener: Optional[QueueListener] = None
+
+class RequestContextFilter(logging.Filter):
+    """Stamp each record with the current request id."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of high-volume INFO/DEBUG records.
+
+    Warnings and errors are never dropped.
+    """
+
+    def __init__(self, rate: float, loggers):
+        super().__init__()
+        self.rate = rate
+        self.loggers = set(loggers)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or self.rate >= 1.0:
+            return True
+        if record.name in self.loggers or getattr(record, "sampled", False):
+            return random.random() < self.rate
+        return True
+
+class _RecordQueueHandler(QueueHandler):
+    """
+    Hand records to the listener thread with their message already merged.
+
+    Unlike the stdlib QueueHandler this keeps the traceback in exc_text
+    instead of folding it into the message, so it ends up in its own JSON field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        # Uvicorn attaches an ANSI-coloured duplicate of the message
+        record.__dict__.pop("color_message", None)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def _build_formatter(log_format: str) -> logging.Formatter:
+    if log_format == "text":
+        return logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s")
+    return jsonlogger.JsonFormatter(
+        "%(asctime)s %(levelname)s %(name)s %(message)s %(request_id)s",
+        rename_fields={"asctime": "timestamp", "levelname": "level", "name": "logger"}
+    )
+
+def configure_logging() -> None:
+    """
+    Route all logging through a queue drained by a background thread.
+
+    Request handlers only pay for building the record and a queue put; JSON
+    formatting and the write to stdout happen on the listener thread.
+
+    Environment:
+        LOG_LEVEL: Root log level (default INFO)
+        LOG_FORMAT: "json" (default) or "text"
+        LOG_SAMPLE_RATE: Fraction of sampled INFO records kept (default 0.1)
+        LOG_SAMPLED_LOGGERS: Comma-separated loggers whose INFO records are sampled
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(_build_formatter(os.getenv("LOG_FORMAT", "json")))
+
+    queue_handler = _RecordQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(SamplingFilter(
+        rate=float(os.getenv("LOG_SAMPLE_RATE", "0.1")),
+        loggers=os.getenv("LOG_SAMPLED_LOGGERS", DEFAULT_SAMPLED_LOGGERS).split(",")
+    ))
+    queue_handler.addFilter(RequestContextFilter())
+
+    # Set on the handler too, since uvicorn's loggers carry their own levels
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    queue_handler.setLevel(level)
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+
+    # Uvicorn installs its own stream handlers; send its records through the queue too
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,120 @@
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+# Latency buckets (seconds) wide enough for LLM and voice turns
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+REQUEST_LATENCY = Histogram(
+    "healmind_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+STAGE_LATENCY = Histogram(
+    "healmind_stage_duration_seconds",
+    "Latency of individual stages inside hot request handlers",
+    ["operation", "stage"],
+    buckets=LATENCY_BUCKETS
+)
+
+OLLAMA_TIME_TO_FIRST_TOKEN = Histogram(
+    "healmind_ollama_time_to_first_token_seconds",
+    "Time from sending a generate request to Ollama until the first token arrives",
+    buckets=LATENCY_BUCKETS
+)
+
+OLLAMA_TOKENS_PER_SECOND = Histogram(
+    "healmind_ollama_tokens_per_second",
+    "Ollama completion throughput as reported by eval_count / eval_duration",
+    buckets=(1, 2, 5, 10, 15, 20, 30, 40, 60, 80, 120, 200)
+)
+
+OLLAMA_TOKENS = Counter(
+    "healmind_ollama_tokens_total",
+    "Tokens processed by Ollama",
+    ["kind"]
+)
+
+OLLAMA_RETRIES = Counter(
+    "healmind_ollama_retries_total",
+    "Ollama generate attempts that were retried"
+)
+
+CLIENT_DISCONNECTS = Counter(
+    "healmind_client_disconnects_total",
+    "Requests whose work was cancelled because the client disconnected first",
+    ["route"]
+)
+
+IN_FLIGHT_GENERATIONS = Gauge(
+    "healmind_in_flight_generations",
+    "Chat and voice generations currently running; shutdown waits for these to finish",
+    multiprocess_mode="livesum"
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "healmind_event_loop_lag_seconds",
+    "Delay between when the event loop heartbeat was due and when it ran",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "healmind_db_pool_connections",
+    "Database connection pool usage",
+    ["state"],
+    multiprocess_mode="livesum"
+)
+
+_instrumented_pools = []
+
+@contextmanager
+def observe_stage(operation: str, stage: str):
+    """
+    Time a block of code into STAGE_LATENCY.
+
+    Example:
+        with observe_stage("chat_message", "llm"):
+            await ollama_service.generate_response(prompt)
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(operation, stage).observe(time.perf_counter() - started)
+
+def instrument_db_pool(engine) -> None:
+    """Track checked-out/idle/overflow connection counts of the engine's pool."""
+    if hasattr(engine.pool, "checkedout"):
+        _instrumented_pools.append(engine.pool)
+
+def update_db_pool_metrics() -> None:
+    """
+    Refresh the pool gauges.
+
+    Called after every request rather than at scrape time so the values also
+    work in multiprocess mode, where each worker writes its own gauge file.
+    """
+    checked_out = idle = overflow = size = 0
+    for pool in _instrumented_pools:
+        checked_out += pool.checkedout()
+        idle += pool.checkedin()
+        overflow += max(pool.overflow(), 0)
+        size += pool.size()
+    DB_POOL_CONNECTIONS.labels("checked_out").set(checked_out)
+    DB_POOL_CONNECTIONS.labels("idle").set(idle)
+    DB_POOL_CONNECTIONS.labels("overflow").set(overflow)
+    DB_POOL_CONNECTIONS.labels("size").set(size)
+
+def render_metrics() -> bytes:
+    """
+    Render the metrics of this process, or of every worker when
+    PROMETHEUS_MULTIPROC_DIR is set.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
@@ -4,7 +4,9 @@ import os
 import logging
 from typing import Optional
 import hashlib
+import hmac
 import time
+from services.usage import current_usage, usage_meter, UsageQuotaExceeded
 
 logger = logging.getLogger(__name__)
 
@@ -40,10 +42,22 @@ class RateLimiter:
 
 rate_limiter = RateLimiter()
 
-def verify_api_key(api_key: Optional[str] = Security(api_key_header)) -> str:
-    """
-    Verify the API key and check rate limits.
-    """
+def _meter_api_key(hashed_key: str, check_quota: bool = True) -> None:
+    """Enforce the key's daily usage quota and attribute this request's usage to it."""
+    if check_quota:
+        try:
+            usage_meter.check_quota(hashed_key)
+        except UsageQuotaExceeded as e:
+            logger.warning("Usage quota exceeded for API key hash: %s...", hashed_key[:8])
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=str(e)
+            )
+    usage = current_usage()
+    if usage is not None:
+        usage.api_key_hash = hashed_key
+
+def _verify_api_key(api_key: Optional[str], check_quota: bool) -> str:
     if not api_key:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -57,7 +71,7 @@ def verify_api_key(api_key: Optional[str] = Security(api_key_header)) -> str:
     hashed_key = hashlib.sha256(api_key.encode()).hexdigest()
     
     if hashed_key not in valid_keys:
-        logger.warning(f"Invalid API key attempt: {api_key[:8]}...")
+        logger.warning("Invalid API key attempt: %s...", api_key[:8])
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key"
@@ -65,15 +79,52 @@ def verify_api_key(api_key: Optional[str] = Security(api_key_header)) -> str:
 
     # Check rate limits
     if rate_limiter.is_rate_limited(hashed_key):
-        logger.warning(f"Rate limit exceeded for API key: {api_key[:8]}...")
+        logger.warning("Rate limit exceeded for API key: %s...", api_key[:8])
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Rate limit exceeded"
         )
 
+    _meter_api_key(hashed_key, check_quota)
     return api_key
 
+def verify_api_key(api_key: Optional[str] = Security(api_key_header)) -> str:
+    """
+    Verify the API key and check rate limits and the daily usage quota.
+    """
+    return _verify_api_key(api_key, check_quota=True)
+
+def verify_api_key_without_quota(api_key: Optional[str] = Security(api_key_header)) -> str:
+    """
+    Like verify_api_key, but lets a key that used up its quota through (e.g. to read its usage).
+    """
+    return _verify_api_key(api_key, check_quota=False)
+
 async def verify_api_key_demo(request: Request):
     auth = request.headers.get("Authorization")
     if not auth or auth != f"Bearer {DEMO_KEY}":
-        raise HTTPException(status_code=401, detail="Unauthorized") 
\ No newline at end of file
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    _meter_api_key(hashlib.sha256(DEMO_KEY.encode()).hexdigest())
+
+ADMIN_KEY_NAME = "X-Admin-Key"
+admin_key_header = APIKeyHeader(name=ADMIN_KEY_NAME, auto_error=False)
+
+def is_admin_key(api_key: Optional[str]) -> bool:
+    """Check a key against ADMIN_API_KEYS (comma-separated SHA-256 hashes, like API_KEYS)."""
+    if not api_key:
+        return False
+    hashed_key = hashlib.sha256(api_key.encode()).hexdigest()
+    return any(hmac.compare_digest(hashed_key, key) for key in os.getenv("ADMIN_API_KEYS", "").split(",") if key)
+
+def verify_admin_key(api_key: Optional[str] = Security(admin_key_header)) -> str:
+    """
+    Gate operator endpoints (profiling, memory snapshots) behind an admin key.
+    """
+    if not is_admin_key(api_key):
+        if api_key:
+            logger.warning("Invalid admin key attempt: %s...", api_key[:8])
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin key required"
+        )
+    return api_key
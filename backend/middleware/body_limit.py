@@ -0,0 +1,64 @@
+from typing import Dict
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+class RequestBodyTooLarge(HTTPException):
+    """Raised mid-body; an HTTPException so body parsers re-raise it instead of reporting a 400"""
+
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"Request body exceeds {limit} bytes")
+
+class BodySizeLimitMiddleware:
+    """
+    Reject request bodies above a per-path byte limit before they are parsed.
+
+    A declared Content-Length over the limit is refused without reading the
+    body; chunked bodies are counted as they arrive and cut off at the limit,
+    so an oversized multipart upload is never spooled in full.
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    def _limit(self, scope: Scope):
+        return self.limits.get(scope["path"]) if scope["type"] == "http" else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limit = self._limit(scope)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        too_large = JSONResponse({"detail": RequestBodyTooLarge(limit).detail}, status_code=413)
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await too_large(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def receive_wrapper() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise RequestBodyTooLarge(limit)
+            return message
+
+        async def send_wrapper(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except RequestBodyTooLarge:
+            if response_started:
+                raise
+            await too_large(scope, receive, send)
@@ -0,0 +1,50 @@
+import random
+import logging
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from logging_config import request_id_var
+from middleware.auth import ADMIN_KEY_NAME, is_admin_key
+from profiling import profiler, save_profile, PROFILE_HEADER, PROFILE_ID_HEADER
+
+logger = logging.getLogger(__name__)
+
+class ProfilingMiddleware:
+    """
+    Profile a share of requests with the sampling profiler.
+
+    A request is profiled when it sends `X-Profile: 1` together with a valid
+    X-Admin-Key, or at random at `sample_rate`. The profile is stored under the
+    request id, which is returned in X-Profile-Id.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = 0.0):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    def _should_profile(self, scope: Scope) -> bool:
+        headers = Headers(scope=scope)
+        if headers.get(PROFILE_HEADER) == "1" and is_admin_key(headers.get(ADMIN_KEY_NAME)):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = profiler.begin(scope["method"], scope["path"], request_id_var.get())
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = profile.profile_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.end(profile)
+            try:
+                await run_in_threadpool(save_profile, profile)
+            except Exception as e:
+                logger.warning("Failed to store profile %s: %s", profile.profile_id, e)
@@ -0,0 +1,40 @@
+import time
+from starlette.types import ASGIApp, Receive, Scope, Send
+from metrics import REQUEST_LATENCY, update_db_pool_metrics
+
+class PrometheusMiddleware:
+    """
+    Record per-route request latency.
+
+    Implemented as a plain ASGI middleware so streaming responses are timed
+    until their last chunk is sent. Routes are labelled by their path template
+    (e.g. /api/chat/sessions/{session_id}) to keep label cardinality bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                getattr(route, "path_format", getattr(route, "path", "unmatched")),
+                str(status_code)
+            ).observe(time.perf_counter() - started)
+            update_db_pool_metrics()
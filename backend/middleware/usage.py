@@ -0,0 +1,28 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+from services.usage import usage_scope, usage_meter
+
+class UsageMiddleware:
+    """
+    Meter model and audio usage per API key and route.
+
+    Opens a usage scope for each request; the auth dependency stamps it with
+    the caller's hashed key and the Ollama/voice services add tokens and
+    audio seconds. When the response is done the totals go to the in-memory
+    meter, which writes them in batches.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with usage_scope() as usage:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                route = scope.get("route")
+                usage.route = getattr(route, "path_format", None)
+                usage_meter.add(usage)
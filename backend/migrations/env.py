@@ -19,8 +19,18 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# The deployed database comes from the environment, as it does for the app
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"].replace("%", "%%"))
+
 # Import your models and set target_metadata
 from models.chat import Base
+# Register the remaining tables on Base.metadata for autogenerate
+import models.status
+import models.analytics
+import models.embedding
+import models.job
+import models.usage
 
 target_metadata = Base.metadata
 
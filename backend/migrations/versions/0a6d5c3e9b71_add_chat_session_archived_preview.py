@@ -0,0 +1,29 @@
+"""Add chat_sessions.archived_preview
+
+Revision ID: 0a6d5c3e9b71
+Revises: f3b9c2e84a17
+Create Date: 2026-10-19 16:05:42.118390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6d5c3e9b71'
+down_revision: Union[str, None] = 'f3b9c2e84a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Sessions archived before this revision get their preview back when next rehydrated
+    op.add_column('chat_sessions', sa.Column('archived_preview', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chat_sessions', 'archived_preview')
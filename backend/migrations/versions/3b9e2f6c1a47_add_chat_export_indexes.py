@@ -0,0 +1,30 @@
+"""Add chat export indexes
+
+Revision ID: 3b9e2f6c1a47
+Revises: 5dc5bebfbe66
+Create Date: 2026-10-19 09:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e2f6c1a47'
+down_revision: Union[str, None] = '5dc5bebfbe66'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_chat_sessions_user_id', 'chat_sessions', ['user_id'], unique=False)
+    op.create_index('ix_chat_messages_session_id_timestamp', 'chat_messages', ['session_id', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chat_messages_session_id_timestamp', table_name='chat_messages')
+    op.drop_index('ix_chat_sessions_user_id', table_name='chat_sessions')
@@ -0,0 +1,38 @@
+"""Add user_daily_activity rollup table
+
+Revision ID: 4d2c8a61f7e9
+Revises: e5a3b7d91c26
+Create Date: 2026-10-19 16:02:44.190317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d2c8a61f7e9'
+down_revision: Union[str, None] = 'e5a3b7d91c26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_daily_activity',
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('wellness_type', sa.String(), nullable=False),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.Column('messages', sa.Integer(), nullable=False),
+    sa.Column('user_messages', sa.Integer(), nullable=False),
+    sa.Column('talk_seconds', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'day', 'wellness_type')
+    )
+    # Existing history is folded in with `python -m services.analytics --rebuild`
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_daily_activity')
@@ -0,0 +1,39 @@
+"""Add message_embeddings table
+
+Revision ID: 71b0c5e2d8a4
+Revises: a9e14f3b6c58
+Create Date: 2026-10-19 17:31:55.804126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '71b0c5e2d8a4'
+down_revision: Union[str, None] = 'a9e14f3b6c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('message_embeddings',
+    sa.Column('message_id', sa.String(), nullable=False),
+    sa.Column('session_id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('dim', sa.Integer(), nullable=False),
+    sa.Column('vector', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('message_id')
+    )
+    op.create_index('ix_message_embeddings_user_id', 'message_embeddings', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_message_embeddings_user_id', table_name='message_embeddings')
+    op.drop_table('message_embeddings')
@@ -0,0 +1,115 @@
+"""Partition chat_messages by month and add session archive columns
+
+Revision ID: 8f41c0d2e9b3
+Revises: 3b9e2f6c1a47
+Create Date: 2026-10-19 11:03:27.184902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f41c0d2e9b3'
+down_revision: Union[str, None] = '3b9e2f6c1a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chat_sessions', sa.Column('archived_at', sa.DateTime(), nullable=True))
+    op.add_column('chat_sessions', sa.Column('archive_key', sa.String(), nullable=True))
+
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Move the heap table aside so the partitioned table can take over its names
+    op.execute('ALTER TABLE chat_messages RENAME TO chat_messages_unpartitioned')
+    op.execute('ALTER TABLE chat_messages_unpartitioned RENAME CONSTRAINT chat_messages_pkey TO chat_messages_unpartitioned_pkey')
+    op.execute('ALTER INDEX ix_chat_messages_session_id_timestamp RENAME TO ix_chat_messages_unpartitioned_session_id_timestamp')
+
+    # The partition key has to be part of the primary key
+    op.execute("""
+        CREATE TABLE chat_messages (
+            message_id VARCHAR NOT NULL,
+            session_id VARCHAR REFERENCES chat_sessions (session_id),
+            role VARCHAR,
+            content TEXT,
+            "timestamp" TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT chat_messages_pkey PRIMARY KEY (message_id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+    """)
+    op.execute('CREATE INDEX ix_chat_messages_session_id_timestamp ON chat_messages (session_id, "timestamp")')
+    op.execute('CREATE TABLE chat_messages_default PARTITION OF chat_messages DEFAULT')
+
+    # One partition per month from the oldest message up to two months ahead;
+    # the archival job keeps creating future months after that
+    op.execute("""
+        DO $$
+        DECLARE
+            month_start date;
+            last_month date := date_trunc('month', now() + interval '2 months');
+        BEGIN
+            SELECT coalesce(date_trunc('month', min("timestamp")), date_trunc('month', now()))
+              INTO month_start
+              FROM chat_messages_unpartitioned;
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF chat_messages FOR VALUES FROM (%L) TO (%L)',
+                    'chat_messages_' || to_char(month_start, 'YYYY_MM'),
+                    month_start,
+                    (month_start + interval '1 month')::date
+                );
+                month_start := month_start + interval '1 month';
+            END LOOP;
+        END $$
+    """)
+
+    op.execute("""
+        INSERT INTO chat_messages (message_id, session_id, role, content, "timestamp")
+        SELECT message_id, session_id, role, content, coalesce("timestamp", now())
+          FROM chat_messages_unpartitioned
+    """)
+    op.execute('DROP TABLE chat_messages_unpartitioned')
+
+    # Inline lz4 compression for session metadata where the server supports it
+    op.execute("""
+        DO $$
+        BEGIN
+            IF current_setting('server_version_num')::int >= 140000 THEN
+                ALTER TABLE chat_sessions ALTER COLUMN session_metadata SET COMPRESSION lz4;
+            END IF;
+        EXCEPTION WHEN feature_not_supported THEN
+            NULL;
+        END $$
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE chat_messages RENAME TO chat_messages_partitioned')
+        op.execute('ALTER TABLE chat_messages_partitioned RENAME CONSTRAINT chat_messages_pkey TO chat_messages_partitioned_pkey')
+        op.execute('ALTER INDEX ix_chat_messages_session_id_timestamp RENAME TO ix_chat_messages_partitioned_session_id_timestamp')
+        op.create_table('chat_messages',
+        sa.Column('message_id', sa.String(), nullable=False),
+        sa.Column('session_id', sa.String(), nullable=True),
+        sa.Column('role', sa.String(), nullable=True),
+        sa.Column('content', sa.Text(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['session_id'], ['chat_sessions.session_id'], ),
+        sa.PrimaryKeyConstraint('message_id')
+        )
+        op.create_index('ix_chat_messages_session_id_timestamp', 'chat_messages', ['session_id', 'timestamp'], unique=False)
+        op.execute("""
+            INSERT INTO chat_messages (message_id, session_id, role, content, "timestamp")
+            SELECT message_id, session_id, role, content, "timestamp"
+              FROM chat_messages_partitioned
+        """)
+        op.execute('DROP TABLE chat_messages_partitioned CASCADE')
+
+    op.drop_column('chat_sessions', 'archive_key')
+    op.drop_column('chat_sessions', 'archived_at')
@@ -0,0 +1,73 @@
+"""Add full-text search index on chat_messages.content
+
+Revision ID: a9e14f3b6c58
+Revises: 4d2c8a61f7e9
+Create Date: 2026-10-19 16:48:10.527306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e14f3b6c58'
+down_revision: Union[str, None] = '4d2c8a61f7e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Generated on every partition; rewrites chat_messages once
+        op.execute("""
+            ALTER TABLE chat_messages ADD COLUMN content_tsv tsvector
+                GENERATED ALWAYS AS (to_tsvector('english', coalesce(content, ''))) STORED
+        """)
+        op.execute('CREATE INDEX ix_chat_messages_content_tsv ON chat_messages USING gin (content_tsv)')
+    elif dialect == 'sqlite':
+        # Rowid-aligned with chat_messages; `owner` scopes matches to the session's user
+        op.execute("""
+            CREATE VIRTUAL TABLE chat_messages_fts USING fts5(
+                content, owner, tokenize='porter unicode61'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER chat_messages_fts_insert AFTER INSERT ON chat_messages BEGIN
+                INSERT INTO chat_messages_fts (rowid, content, owner) VALUES (
+                    new.rowid, new.content,
+                    (SELECT 'u' || hex(user_id) FROM chat_sessions WHERE session_id = new.session_id)
+                );
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER chat_messages_fts_delete AFTER DELETE ON chat_messages BEGIN
+                DELETE FROM chat_messages_fts WHERE rowid = old.rowid;
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER chat_messages_fts_update AFTER UPDATE OF content ON chat_messages BEGIN
+                UPDATE chat_messages_fts SET content = new.content WHERE rowid = old.rowid;
+            END
+        """)
+        op.execute("""
+            INSERT INTO chat_messages_fts (rowid, content, owner)
+            SELECT m.rowid, m.content, (SELECT 'u' || hex(s.user_id) FROM chat_sessions s WHERE s.session_id = m.session_id)
+              FROM chat_messages m
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_chat_messages_content_tsv')
+        op.execute('ALTER TABLE chat_messages DROP COLUMN IF EXISTS content_tsv')
+    elif dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS chat_messages_fts_update')
+        op.execute('DROP TRIGGER IF EXISTS chat_messages_fts_delete')
+        op.execute('DROP TRIGGER IF EXISTS chat_messages_fts_insert')
+        op.execute('DROP TABLE IF EXISTS chat_messages_fts')
@@ -0,0 +1,37 @@
+"""Add status_check table
+
+Revision ID: c27d5a8e4f10
+Revises: 8f41c0d2e9b3
+Create Date: 2026-10-19 13:40:12.551873
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c27d5a8e4f10'
+down_revision: Union[str, None] = '8f41c0d2e9b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('status_check',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('client_name', sa.String(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_status_check_timestamp', 'status_check', ['timestamp'], unique=False)
+    op.create_index('ix_status_check_client_name_timestamp', 'status_check', ['client_name', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_status_check_client_name_timestamp', table_name='status_check')
+    op.drop_index('ix_status_check_timestamp', table_name='status_check')
+    op.drop_table('status_check')
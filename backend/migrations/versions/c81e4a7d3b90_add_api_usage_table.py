@@ -0,0 +1,40 @@
+"""Add api_usage table
+
+Revision ID: c81e4a7d3b90
+Revises: b6f3d0a9e215
+Create Date: 2026-10-19 19:02:11.518334
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81e4a7d3b90'
+down_revision: Union[str, None] = 'b6f3d0a9e215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('api_usage',
+    sa.Column('api_key_hash', sa.String(length=64), nullable=False),
+    sa.Column('route', sa.String(), nullable=False),
+    sa.Column('period_start', sa.DateTime(), nullable=False),
+    sa.Column('requests', sa.Integer(), nullable=False),
+    sa.Column('prompt_tokens', sa.BigInteger(), nullable=False),
+    sa.Column('completion_tokens', sa.BigInteger(), nullable=False),
+    sa.Column('stt_seconds', sa.Float(), nullable=False),
+    sa.Column('tts_seconds', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('api_key_hash', 'route', 'period_start')
+    )
+    op.create_index('ix_api_usage_period_start', 'api_usage', ['period_start'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_api_usage_period_start', table_name='api_usage')
+    op.drop_table('api_usage')
@@ -0,0 +1,36 @@
+"""Add chat_sessions.last_message_at
+
+Revision ID: e5a3b7d91c26
+Revises: c27d5a8e4f10
+Create Date: 2026-10-19 15:21:08.362915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a3b7d91c26'
+down_revision: Union[str, None] = 'c27d5a8e4f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chat_sessions', sa.Column('last_message_at', sa.DateTime(), nullable=True))
+    op.execute("""
+        UPDATE chat_sessions
+           SET last_message_at = (
+               SELECT max(chat_messages."timestamp")
+                 FROM chat_messages
+                WHERE chat_messages.session_id = chat_sessions.session_id
+           )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chat_sessions', 'last_message_at')
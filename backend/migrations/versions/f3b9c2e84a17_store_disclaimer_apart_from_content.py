@@ -0,0 +1,53 @@
+"""Store the reply disclaimer as a template id instead of in content
+
+Revision ID: f3b9c2e84a17
+Revises: c81e4a7d3b90
+Create Date: 2026-10-19 20:14:37.902211
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9c2e84a17'
+down_revision: Union[str, None] = 'c81e4a7d3b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of disclaimers.DISCLAIMERS as it was appended to stored replies
+DISCLAIMERS = {
+    "wellness": (
+        "\n\n\n---\n*Note: HealMind AI is a wellness and self-improvement tool designed to support your "
+        "personal growth and stress management. It is not a substitute for professional medical or mental "
+        "health care. If you are experiencing mental health concerns, please consult with a qualified "
+        "healthcare provider.*\n"
+    ),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chat_messages', sa.Column('disclaimer', sa.String(length=32), nullable=True))
+    for template, text in DISCLAIMERS.items():
+        op.get_bind().execute(sa.text("""
+            UPDATE chat_messages
+               SET content = substr(content, 1, length(content) - :length),
+                   disclaimer = :template
+             WHERE role = 'assistant'
+               AND length(content) >= :length
+               AND substr(content, length(content) - :length + 1) = :text
+        """), {"template": template, "text": text, "length": len(text)})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for template, text in DISCLAIMERS.items():
+        op.get_bind().execute(sa.text("""
+            UPDATE chat_messages
+               SET content = content || :text
+             WHERE disclaimer = :template
+        """), {"template": template, "text": text})
+    op.drop_column('chat_messages', 'disclaimer')
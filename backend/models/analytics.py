@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Date, Integer, Float
+from database import Base
+
+class UserDailyActivity(Base):
+    """
+    Per-user, per-day, per-wellness-type activity rollup.
+
+    Maintained incrementally as chat messages are flushed (see
+    services.analytics), so dashboards read one row per day and type instead
+    of whole session histories.
+    """
+    __tablename__ = "user_daily_activity"
+
+    user_id = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    wellness_type = Column(String, primary_key=True)
+    # Sessions with at least one message that day
+    sessions = Column(Integer, nullable=False, default=0)
+    messages = Column(Integer, nullable=False, default=0)
+    user_messages = Column(Integer, nullable=False, default=0)
+    # Sum of gaps between consecutive messages shorter than the idle cutoff
+    talk_seconds = Column(Float, nullable=False, default=0.0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -9,16 +9,34 @@ class ChatSession(Base):
 
     session_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     created_at = Column(DateTime, default=datetime.utcnow)
-    user_id = Column(String, nullable=True)
+    user_id = Column(String, nullable=True, index=True)
     session_metadata = Column(JSON, default={})
+    # Set once the session's messages have been moved to archive storage
+    archived_at = Column(DateTime, nullable=True)
+    archive_key = Column(String, nullable=True)
+    # Last message while the messages are archived, so session lists keep their preview
+    archived_preview = Column(Text, nullable=True)
+    # Time of the newest message; cache validator for history and session lists
+    last_message_at = Column(DateTime, nullable=True)
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Keyset pagination for history/export walks (session_id, timestamp, message_id)
+        Index("ix_chat_messages_session_id_timestamp", "session_id", "timestamp"),
+    )
 
     message_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     session_id = Column(String, ForeignKey("chat_sessions.session_id"))
     role = Column(String)  # 'user' or 'assistant'
     content = Column(Text)
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    session = relationship("ChatSession", back_populates="messages") 
\ No newline at end of file
+    # Id of the disclaimer template shown under this reply (see disclaimers.py); kept out of content
+    disclaimer = Column(String(32), nullable=True)
+    # Partition key of chat_messages on PostgreSQL, so it can never be NULL
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+    session = relationship("ChatSession", back_populates="messages") 
+
+# Registers the flush hook that keeps analytics rollups and last_message_at current.
+# Imported here, below the models it uses, so every writer of messages gets it, not only the chat router
+import services.analytics
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, DateTime, Integer, LargeBinary
+from datetime import datetime
+from database import Base
+
+class MessageEmbedding(Base):
+    """Embedding of one chat message, stored as raw little-endian float32 bytes."""
+    __tablename__ = "message_embeddings"
+
+    # chat_messages is partitioned with a (message_id, timestamp) key, so no foreign key here
+    message_id = Column(String, primary_key=True)
+    session_id = Column(String, nullable=False)
+    # Denormalised so a user's vectors load with one index scan
+    user_id = Column(String, nullable=False, index=True)
+    model = Column(String, nullable=False)
+    dim = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, DateTime, Integer, Text, JSON, Index
+from datetime import datetime
+import uuid
+from database import Base
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Next runnable job: queued, by priority then age
+        Index("ix_jobs_status_priority_created_at", "status", "priority", "created_at"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, default={})
+    # queued -> running -> succeeded | failed (back to queued between retries)
+    status = Column(String, nullable=False, default="queued")
+    # Lower runs first
+    priority = Column(Integer, nullable=False, default=100)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Not picked up before this time (retry backoff)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
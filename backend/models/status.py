@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, DateTime, Index
+from datetime import datetime
+import uuid
+from database import Base
+
+class StatusCheck(Base):
+    __tablename__ = "status_check"
+    __table_args__ = (
+        # Latest heartbeat per client
+        Index("ix_status_check_client_name_timestamp", "client_name", "timestamp"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    client_name = Column(String, nullable=False)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
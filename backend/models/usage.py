@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger, Float, Index
+from database import Base
+
+class ApiUsage(Base):
+    """
+    Model and audio usage per API key, route and hour.
+
+    Accumulated in memory by services.usage and added to these rows in
+    batches, so requests never write here themselves.
+    """
+    __tablename__ = "api_usage"
+    __table_args__ = (
+        # Usage reports over a time range, across keys and routes
+        Index("ix_api_usage_period_start", "period_start"),
+    )
+
+    # SHA-256 of the API key, as listed in API_KEYS
+    api_key_hash = Column(String(64), primary_key=True)
+    route = Column(String, primary_key=True)
+    # Start of the UTC hour the usage falls in
+    period_start = Column(DateTime, primary_key=True)
+    requests = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    # Seconds of audio transcribed (STT) and synthesised (TTS)
+    stt_seconds = Column(Float, nullable=False, default=0.0)
+    tts_seconds = Column(Float, nullable=False, default=0.0)
@@ -0,0 +1,387 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+import tempfile
+import threading
+import tracemalloc
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from metrics import EVENT_LOOP_LAG
+
+logger = logging.getLogger(__name__)
+
+# Share of requests profiled without being asked to; keep low in production
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+# Shared by the workers of a host, so a profile can be fetched from any of them
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "healmind-profiles")))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+# Log the blocking stack when the event loop stalls this long (0 disables)
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", "0.25"))
+# Trace allocations from startup with this many frames (0: start on demand via the admin API)
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "0"))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+MAX_STACK_DEPTH = 64
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROFILE_ID = re.compile(r"[A-Za-z0-9._-]{1,128}")
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(BACKEND_DIR + os.sep):
+        return os.path.relpath(filename, BACKEND_DIR)
+    parts = Path(filename).parts
+    if "site-packages" in parts:
+        return "/".join(parts[parts.index("site-packages") + 1:])
+    return "/".join(parts[-2:])
+
+def _label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+def _stack(frame) -> Tuple[str, ...]:
+    """Labels of `frame` and its callers, outermost first, without the event loop's own frames."""
+    frames = []
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        # Everything above the callback the loop is running is loop machinery
+        if frame.f_code.co_name == "_run" and frame.f_code.co_filename.endswith(os.path.join("asyncio", "events.py")):
+            break
+        frames.append(frame)
+        frame = frame.f_back
+    return tuple(_label(f) for f in reversed(frames))
+
+def _running_task(loop) -> Optional[asyncio.Task]:
+    # Read from another thread; at worst the task is a sample stale, which is fine for sampling
+    return asyncio.tasks._current_tasks.get(loop)
+
+def _app_frame(frame) -> Optional[str]:
+    """Innermost frame from this codebase, the usual culprit behind a stall."""
+    innermost = frame
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(BACKEND_DIR + os.sep) and "site-packages" not in filename:
+            return _label(frame)
+        frame = frame.f_back
+    return _label(innermost) if innermost is not None else None
+
+@dataclass
+class RequestProfile:
+    """Stack samples collected while one request's task held the event loop."""
+    profile_id: str
+    method: str
+    path: str
+    interval: float
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    samples: Counter = field(default_factory=Counter)
+    wall_seconds: float = 0.0
+    _started: float = field(default_factory=time.perf_counter)
+
+    def to_dict(self, top: int = 25) -> Dict[str, Any]:
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.samples.items():
+            if stack:
+                self_counts[stack[-1]] += count
+            for label in set(stack):
+                total_counts[label] += count
+        sampled = sum(self.samples.values())
+        return {
+            "profile_id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at.isoformat(),
+            "wall_ms": round(self.wall_seconds * 1000, 2),
+            "interval_ms": self.interval * 1000,
+            "samples": sampled,
+            # Time the request ran on the loop; the rest of wall_ms it was awaiting I/O or threads
+            "on_loop_ms": round(sampled * self.interval * 1000, 2),
+            "top": [
+                {"function": label, "self": self_counts[label], "total": count}
+                for label, count in total_counts.most_common(top)
+            ],
+            # Collapsed stacks, e.g. for flamegraph.pl or speedscope
+            "folded": [f"{';'.join(stack)} {count}" for stack, count in self.samples.most_common()],
+        }
+
+class SamplingProfiler:
+    """
+    Statistical profiler for selected requests.
+
+    A sampler thread wakes every `interval` while at least one profiled
+    request is in flight, reads the event loop thread's stack and charges it
+    to the request whose task is running. It sleeps otherwise, so leaving
+    profiling enabled at a low sample rate costs nothing between profiles.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self._active: Dict[asyncio.Task, RequestProfile] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop = None
+        self._loop_thread_id: Optional[int] = None
+
+    def begin(self, method: str, path: str, request_id: str) -> RequestProfile:
+        """Start profiling the calling task."""
+        if not _PROFILE_ID.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        profile = RequestProfile(profile_id=request_id, method=method, path=path, interval=self.interval)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+            self._active[asyncio.current_task()] = profile
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._wake.set()
+        return profile
+
+    def adopt(self, task: asyncio.Task) -> None:
+        """
+        Charge `task` to the calling task's profile, if it has one.
+
+        For work a profiled request runs in a child task and awaits, such as
+        the generation wrapped by cancel_on_disconnect().
+        """
+        if not self._active:
+            return
+        with self._lock:
+            profile = self._active.get(asyncio.current_task())
+            if profile is None:
+                return
+            self._active[task] = profile
+        task.add_done_callback(self._release)
+
+    def _release(self, task: asyncio.Task) -> None:
+        with self._lock:
+            self._active.pop(task, None)
+            if not self._active:
+                self._wake.clear()
+
+    def end(self, profile: RequestProfile) -> RequestProfile:
+        with self._lock:
+            self._active = {task: p for task, p in self._active.items() if p is not profile}
+            if not self._active:
+                self._wake.clear()
+        profile.wall_seconds = time.perf_counter() - profile._started
+        return profile
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            task = _running_task(self._loop)
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if task is None or frame is None or task not in self._active:
+                continue
+            stack = _stack(frame)
+            # Under the lock, so a sample never lands in a profile that end() already returned
+            with self._lock:
+                profile = self._active.get(task)
+                if profile is not None:
+                    profile.samples[stack] += 1
+
+profiler = SamplingProfiler()
+
+def save_profile(profile: RequestProfile) -> None:
+    """Write a finished profile to PROFILE_DIR, keeping the newest PROFILE_KEEP."""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    path = PROFILE_DIR / f"{profile.profile_id}.json"
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(profile.to_dict()))
+    os.replace(tmp_path, path)
+
+    files = sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in files[PROFILE_KEEP:]:
+        stale.unlink(missing_ok=True)
+
+def list_profiles(limit: int = 50) -> List[Dict[str, Any]]:
+    """Summaries of the newest stored profiles."""
+    if not PROFILE_DIR.exists():
+        return []
+    files = sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    summaries = []
+    for path in files[:limit]:
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        summaries.append({key: data[key] for key in ("profile_id", "method", "path", "started_at", "wall_ms", "on_loop_ms", "samples")})
+    return summaries
+
+def load_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    if not _PROFILE_ID.fullmatch(profile_id):
+        return None
+    path = PROFILE_DIR / f"{profile_id}.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+class TracingNotStarted(Exception):
+    """Raised when a tracemalloc operation needs tracing (or a baseline) that is not there"""
+    pass
+
+def _stat_dict(stat, with_diff: bool = False) -> Dict[str, Any]:
+    frame = stat.traceback[0]
+    entry = {
+        "location": f"{_short_path(frame.filename)}:{frame.lineno}",
+        "size_bytes": stat.size,
+        "count": stat.count,
+    }
+    if with_diff:
+        entry["size_diff_bytes"] = stat.size_diff
+        entry["count_diff"] = stat.count_diff
+    if len(stat.traceback) > 1:
+        entry["traceback"] = [f"{_short_path(f.filename)}:{f.lineno}" for f in stat.traceback]
+    return entry
+
+class MemoryTracer:
+    """tracemalloc snapshots of this worker, with a stored baseline to diff against."""
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._baseline_taken_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def start(self, frames: int) -> None:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        tracemalloc.start(frames)
+        with self._lock:
+            self._baseline = None
+            self._baseline_taken_at = None
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        with self._lock:
+            self._baseline = None
+            self._baseline_taken_at = None
+
+    def status(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "pid": os.getpid(),
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "baseline_taken_at": self._baseline_taken_at.isoformat() if self._baseline_taken_at else None,
+        }
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise TracingNotStarted("tracemalloc is not running in this worker")
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def set_baseline(self) -> Dict[str, Any]:
+        snapshot = self._snapshot()
+        with self._lock:
+            self._baseline = snapshot
+            self._baseline_taken_at = datetime.utcnow()
+        return self.status()
+
+    def top(self, key_type: str = "lineno", limit: int = 20) -> List[Dict[str, Any]]:
+        """Largest live allocations right now."""
+        return [_stat_dict(stat) for stat in self._snapshot().statistics(key_type)[:limit]]
+
+    def diff(self, key_type: str = "lineno", limit: int = 20) -> List[Dict[str, Any]]:
+        """Allocations that grew the most since the baseline."""
+        with self._lock:
+            baseline = self._baseline
+        if baseline is None:
+            raise TracingNotStarted("No baseline snapshot; take one first")
+        stats = self._snapshot().compare_to(baseline, key_type)
+        return [_stat_dict(stat, with_diff=True) for stat in stats[:limit]]
+
+memory_tracer = MemoryTracer()
+
+class LoopWatchdog:
+    """
+    Detect event loop stalls and log what caused them.
+
+    A heartbeat task records loop lag into EVENT_LOOP_LAG. A watchdog thread
+    notices when the heartbeat stops; while the loop is still stuck, it
+    captures the loop thread's stack and the running task, so the log names
+    the coroutine that blocked instead of the one that happened to run next.
+    """
+
+    def __init__(self, threshold: float = LOOP_LAG_THRESHOLD, history: int = 20):
+        self.threshold = threshold
+        self.interval = min(threshold / 2, 0.5) if threshold > 0 else 0
+        self.stalls = deque(maxlen=history)
+        self._beat = time.monotonic()
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop = None
+        self._loop_thread_id: Optional[int] = None
+
+    def start(self) -> None:
+        if self._task is not None or self.threshold <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._beat = time.monotonic()
+            EVENT_LOOP_LAG.observe(max(self._beat - started - self.interval, 0.0))
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            task = _running_task(self._loop)
+            stack = _stack(frame) if frame is not None else ()
+            stall = {
+                "detected_at": datetime.utcnow().isoformat(),
+                "blocked_ms": round(blocked * 1000, 1),
+                "task": task.get_name() if task else None,
+                "coroutine": getattr(task.get_coro(), "__qualname__", None) if task else None,
+                "blocking_frame": _app_frame(frame),
+                "stack": list(stack),
+            }
+            self.stalls.append(stall)
+            logger.warning(
+                "Event loop blocked for at least %.0f ms by %s in %s",
+                stall["blocked_ms"], stall["coroutine"], stall["blocking_frame"],
+                extra={"stack": stall["stack"]}
+            )
+
+loop_watchdog = LoopWatchdog()
@@ -0,0 +1,16 @@
+import os
+from typing import Iterable, Sequence
+from fastapi.responses import ORJSONResponse
+
+# Opt-in: serialise large trusted query results straight to JSON bytes
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+
+def rows_response(rows: Iterable[Sequence], fields: Sequence[str]) -> ORJSONResponse:
+    """
+    Encode column tuples from a trusted query as a JSON array of objects.
+
+    Skips building Pydantic models and FastAPI's response_model validation and
+    jsonable_encoder pass; orjson encodes datetimes natively in the same ISO
+    8601 format Pydantic produces.
+    """
+    return ORJSONResponse([dict(zip(fields, row)) for row in rows])
@@ -0,0 +1,110 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+from middleware.auth import verify_admin_key
+from routers.usage import MAX_USAGE_DAYS, RouteUsageResponse, usage_by_route, usage_window
+from database import get_read_db
+from profiling import (
+    list_profiles, load_profile, memory_tracer, loop_watchdog, TracingNotStarted
+)
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(verify_admin_key)])
+
+# tracemalloc statistics can be grouped per line, per file or per full traceback
+GroupBy = Literal["lineno", "filename", "traceback"]
+
+@router.get("/profiles")
+async def get_profiles(limit: int = Query(50, ge=1, le=500)):
+    """
+    Newest request profiles, from requests sent with `X-Profile: 1` or picked by PROFILE_SAMPLE_RATE.
+    """
+    return await run_in_threadpool(list_profiles, limit)
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: Literal["json", "folded"] = "json"):
+    """
+    One request profile; `format=folded` returns collapsed stacks for flame graph tools.
+    """
+    profile = await run_in_threadpool(load_profile, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        return PlainTextResponse("\n".join(profile["folded"]) + "\n")
+    return profile
+
+@router.get("/tracemalloc")
+async def tracemalloc_status():
+    """
+    Whether this worker traces allocations, and how much memory is traced.
+    """
+    return memory_tracer.status()
+
+@router.post("/tracemalloc/start")
+async def start_tracemalloc(frames: int = Query(10, ge=1, le=100)):
+    """
+    Start tracing allocations in this worker; it slows allocation-heavy code, so stop it when done.
+    """
+    memory_tracer.start(frames)
+    return memory_tracer.status()
+
+@router.post("/tracemalloc/stop")
+async def stop_tracemalloc():
+    memory_tracer.stop()
+    return memory_tracer.status()
+
+@router.post("/tracemalloc/snapshot")
+async def take_baseline():
+    """
+    Store a baseline snapshot for /tracemalloc/diff.
+    """
+    try:
+        return await run_in_threadpool(memory_tracer.set_baseline)
+    except TracingNotStarted as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/tracemalloc/top")
+async def top_allocations(limit: int = Query(20, ge=1, le=200), group_by: GroupBy = "lineno"):
+    """
+    Largest live allocations in this worker.
+    """
+    try:
+        stats = await run_in_threadpool(memory_tracer.top, group_by, limit)
+    except TracingNotStarted as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {**memory_tracer.status(), "allocations": stats}
+
+@router.get("/tracemalloc/diff")
+async def diff_allocations(limit: int = Query(20, ge=1, le=200), group_by: GroupBy = "lineno"):
+    """
+    Allocations that grew the most since the baseline snapshot.
+    """
+    try:
+        stats = await run_in_threadpool(memory_tracer.diff, group_by, limit)
+    except TracingNotStarted as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {**memory_tracer.status(), "allocations": stats}
+
+@router.get("/event-loop")
+async def event_loop_stalls():
+    """
+    Recent event loop stalls in this worker, with the stack that blocked.
+    """
+    return {
+        "pid": os.getpid(),
+        "threshold_ms": loop_watchdog.threshold * 1000,
+        "stalls": list(loop_watchdog.stalls),
+    }
+
+@router.get("/usage", response_model=List[RouteUsageResponse])
+async def get_usage_by_key(
+    days: int = Query(7, ge=1, le=MAX_USAGE_DAYS),
+    api_key_hash: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Token and audio usage per API key and route over the last `days` days.
+    """
+    return usage_by_route(db, usage_window(days), api_key_hash)
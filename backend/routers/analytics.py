@@ -0,0 +1,149 @@
+from fastapi import APIRouter, Depends, HTTPException, Security, Request, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from typing import Optional, List, Dict
+from datetime import date, datetime, timedelta
+from middleware.auth import verify_api_key
+from models.analytics import UserDailyActivity
+from database import get_read_db
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+MAX_ANALYTICS_DAYS = 366
+
+class DailyActivityResponse(BaseModel):
+    day: date
+    sessions: int
+    messages: int
+    user_messages: int
+    talk_minutes: float
+    wellness_types: Dict[str, int]
+
+class ActivitySummaryResponse(BaseModel):
+    user_id: str
+    start: date
+    end: date
+    active_days: int
+    sessions: int
+    messages: int
+    user_messages: int
+    talk_minutes: float
+    avg_session_minutes: float
+    most_used_wellness_type: Optional[str]
+    wellness_types: Dict[str, int]
+    current_streak: int
+
+def _resolve_user(request: Request, user_id: Optional[str]) -> str:
+    user_id = user_id or request.headers.get("X-User-Email")
+    if not user_id:
+        raise HTTPException(status_code=400, detail="user_id or X-User-Email header is required")
+    return user_id
+
+def _window(days: int):
+    end = datetime.utcnow().date()
+    return end - timedelta(days=days - 1), end
+
+def _daily_rows(db: Session, user_id: str, start: date, end: date) -> List[UserDailyActivity]:
+    # Primary-key range scan: at most days x wellness types rows
+    return db.query(UserDailyActivity).filter(
+        UserDailyActivity.user_id == user_id,
+        UserDailyActivity.day >= start,
+        UserDailyActivity.day <= end
+    ).order_by(UserDailyActivity.day).all()
+
+@router.get("/daily", response_model=List[DailyActivityResponse])
+async def get_daily_activity(
+    request: Request,
+    user_id: Optional[str] = None,
+    days: int = Query(30, ge=1, le=MAX_ANALYTICS_DAYS),
+    db: Session = Depends(get_read_db),
+    api_key: str = Security(verify_api_key)
+):
+    """
+    Per-day wellness activity for a user over the last `days` days (UTC).
+
+    Days without activity are omitted. `wellness_types` maps each type to
+    the number of sessions of that type active on the day.
+    """
+    user_id = _resolve_user(request, user_id)
+    start, end = _window(days)
+
+    result: Dict[date, DailyActivityResponse] = {}
+    for row in _daily_rows(db, user_id, start, end):
+        day = result.setdefault(row.day, DailyActivityResponse(
+            day=row.day, sessions=0, messages=0, user_messages=0, talk_minutes=0.0, wellness_types={}
+        ))
+        day.sessions += row.sessions
+        day.messages += row.messages
+        day.user_messages += row.user_messages
+        day.talk_minutes += row.talk_seconds / 60
+        day.wellness_types[row.wellness_type] = row.sessions
+    for day in result.values():
+        day.talk_minutes = round(day.talk_minutes, 1)
+    return list(result.values())
+
+@router.get("/summary", response_model=ActivitySummaryResponse)
+async def get_activity_summary(
+    request: Request,
+    user_id: Optional[str] = None,
+    days: int = Query(30, ge=1, le=MAX_ANALYTICS_DAYS),
+    db: Session = Depends(get_read_db),
+    api_key: str = Security(verify_api_key)
+):
+    """
+    Totals for a user over the last `days` days: activity, talk time,
+    preferred wellness type and the current streak of active days.
+
+    `sessions` counts session-days, so a session continued on a later day is
+    counted once per day it was active.
+    """
+    user_id = _resolve_user(request, user_id)
+    start, end = _window(days)
+
+    rows = db.query(
+        UserDailyActivity.day,
+        UserDailyActivity.wellness_type,
+        func.sum(UserDailyActivity.sessions),
+        func.sum(UserDailyActivity.messages),
+        func.sum(UserDailyActivity.user_messages),
+        func.sum(UserDailyActivity.talk_seconds)
+    ).filter(
+        UserDailyActivity.user_id == user_id,
+        UserDailyActivity.day >= start,
+        UserDailyActivity.day <= end
+    ).group_by(UserDailyActivity.day, UserDailyActivity.wellness_type).all()
+
+    sessions = messages = user_messages = 0
+    talk_seconds = 0.0
+    wellness_types: Dict[str, int] = {}
+    active_days = set()
+    for day, kind, day_sessions, day_messages, day_user_messages, day_talk_seconds in rows:
+        active_days.add(day)
+        sessions += day_sessions
+        messages += day_messages
+        user_messages += day_user_messages
+        talk_seconds += day_talk_seconds
+        wellness_types[kind] = wellness_types.get(kind, 0) + day_sessions
+
+    # Consecutive active days ending today (or yesterday, if today has no activity yet)
+    streak = 0
+    cursor = end if end in active_days else end - timedelta(days=1)
+    while cursor in active_days:
+        streak += 1
+        cursor -= timedelta(days=1)
+
+    return ActivitySummaryResponse(
+        user_id=user_id,
+        start=start,
+        end=end,
+        active_days=len(active_days),
+        sessions=sessions,
+        messages=messages,
+        user_messages=user_messages,
+        talk_minutes=round(talk_seconds / 60, 1),
+        avg_session_minutes=round(talk_seconds / 60 / sessions, 1) if sessions else 0.0,
+        most_used_wellness_type=max(wellness_types, key=wellness_types.get) if wellness_types else None,
+        wellness_types=wellness_types,
+        current_streak=streak
+    )
@@ -1,14 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Security, Request, Response, Query
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from sqlalchemy import select, tuple_, func
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Iterator
 import logging
 from datetime import datetime
 import uuid
+import csv
+import io
+import json
 from external_integrations.ollama_service import OllamaService, OllamaServiceError
 from middleware.auth import verify_api_key
 from models.chat import ChatMessage, ChatSession
-from database import get_db
+from database import SessionLocal, get_db, get_read_db, mark_written
+from services import archive, search, embeddings, summaries, jobs, idempotency
+from services.idempotency import idempotent_turns
+from metrics import observe_stage
+from responses import FAST_JSON_RESPONSES, rows_response
+from routers.jobs import accepted
+from disconnect import cancel_on_disconnect, ClientDisconnected
+from drain import in_flight, ServerDraining
+from http_cache import make_etag, is_not_modified, not_modified, set_validators
+import disclaimers
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 logger = logging.getLogger(__name__)
@@ -20,6 +34,8 @@ class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=2000)
     session_id: Optional[str] = None
     context: Optional[list] = None
+    # Stored as session_metadata when the message starts a new session (e.g. {"therapy": "..."})
+    metadata: Optional[dict] = None
 
 class ChatResponse(BaseModel):
     response: str
@@ -32,11 +48,24 @@ class MessageResponse(BaseModel):
     content: str
     timestamp: datetime
 
-# Wellness disclaimer to be included in AI responses
-WELLNESS_DISCLAIMER = """
-\n\n---
-*Note: HealMind AI is a wellness and self-improvement tool designed to support your personal growth and stress management. It is not a substitute for professional medical or mental health care. If you are experiencing mental health concerns, please consult with a qualified healthcare provider.*
-"""
+MESSAGE_FIELDS = ("message_id", "role", "content", "timestamp")
+
+MAX_SEARCH_PAGE_SIZE = 50
+
+class SearchResult(BaseModel):
+    message_id: str
+    session_id: str
+    role: str
+    timestamp: datetime
+    score: float
+    # HTML-escaped excerpt with matches wrapped in <mark></mark>
+    snippet: str
+
+def _ensure_hot(db: Session, session: ChatSession) -> None:
+    """Restore an archived session's messages before they are read or appended to."""
+    if session.archived_at is not None:
+        archive.rehydrate_session(db, session)
+        mark_written(session.session_id, session.user_id)
 
 @router.post("/message", response_model=ChatResponse)
 async def chat_message(
@@ -47,18 +76,50 @@ async def chat_message(
 ):
     """
     Process a chat message and return AI response for wellness support.
+
+    With an `Idempotency-Key` header the turn runs once: a retry waits for
+    the running turn or gets its stored response.
+    """
+    user_email = fastapi_request.headers.get("X-User-Email")
+    key = idempotency.request_key(fastapi_request)
+    if key is None:
+        return await _chat_turn(request, db, user_email, cancel_with=fastapi_request)
+
+    async def turn() -> idempotency.StoredResponse:
+        # Keeps running if the client goes away, so it needs a session of its own
+        with SessionLocal() as turn_db:
+            return idempotency.StoredResponse.from_content(await _chat_turn(request, turn_db, user_email))
+
+    return await idempotent_turns.run(fastapi_request, key, idempotency.fingerprint(request), turn)
+
+async def _chat_turn(
+    request: ChatRequest,
+    db: Session,
+    user_email: Optional[str],
+    cancel_with: Optional[Request] = None
+) -> ChatResponse:
+    """
+    Store the user message, generate the reply and store it.
+
+    With `cancel_with`, the generation is abandoned if that request's client
+    goes away, so nothing is persisted.
     """
+    # Refuse before creating the session, so retries sent during a deploy leave no empty sessions
+    if in_flight.draining:
+        raise ServerDraining()
     try:
         # Get or create session
-        session_id = request.session_id or str(uuid.uuid4())
-        session = db.query(ChatSession).filter(ChatSession.session_id == session_id).first()
-        
-        if not session:
-            user_email = fastapi_request.headers.get("X-User-Email")
-            session = ChatSession(session_id=session_id, user_id=user_email)
-            db.add(session)
-            db.commit()
-            db.refresh(session)
+        with observe_stage("chat_message", "db_lookup"):
+            session_id = request.session_id or str(uuid.uuid4())
+            session = db.query(ChatSession).filter(ChatSession.session_id == session_id).first()
+            
+            if not session:
+                session = ChatSession(session_id=session_id, user_id=user_email, session_metadata=request.metadata or {})
+                db.add(session)
+                db.commit()
+                db.refresh(session)
+            else:
+                _ensure_hot(db, session)
 
         # Create user message
         user_message = ChatMessage(
@@ -68,102 +129,234 @@ async def chat_message(
         )
         db.add(user_message)
 
+        # Recall relevant turns from the user's earlier sessions
+        recalled, query_vector = [], None
+        user_id = session.user_id
+        if embeddings.EMBEDDINGS_ENABLED and user_id:
+            with observe_stage("chat_message", "recall"):
+                try:
+                    recalled, query_vector = await embeddings.recall(db, user_id, request.message, exclude_session_id=session_id)
+                except Exception as e:
+                    # Recall only improves the prompt; never fail the chat because of it
+                    logger.warning("Embedding recall failed: %s", e)
+
         # Build prompt with wellness-focused context
-        if request.context:
-            # context is a list of {role, content}
-            history = "\n".join([f"{m['role']}: {m['content']}" for m in request.context])
-            prompt = f"This is a wellness and self-improvement conversation between a user and an AI wellness companion. The AI provides guidance for personal growth, stress management, and mindfulness. It does not provide medical advice, diagnosis, or treatment.\n{history}\nAI:"
-        else:
-            prompt = f"This is a wellness and self-improvement conversation. The AI provides guidance for personal growth, stress management, and mindfulness. It does not provide medical advice, diagnosis, or treatment.\n\nUser: {request.message}\nAI:"
-
-        # Generate AI response
-        ai_response = await ollama_service.generate_response(
-            prompt=prompt,
-            context=None
-        )
+        with observe_stage("chat_message", "prompt_build"):
+            memory = ""
+            if recalled:
+                memory = f"Relevant moments from the user's earlier sessions:\n{embeddings.format_recalled(recalled)}\n"
+            if request.context:
+                # context is a list of {role, content}, replies as displayed (with disclaimers)
+                history = "\n".join([f"{m['role']}: {m['content']}" for m in disclaimers.strip_context(request.context)])
+                prompt = f"This is a wellness and self-improvement conversation between a user and an AI wellness companion. The AI provides guidance for personal growth, stress management, and mindfulness. It does not provide medical advice, diagnosis, or treatment.\n{memory}{history}\nAI:"
+            else:
+                prompt = f"This is a wellness and self-improvement conversation. The AI provides guidance for personal growth, stress management, and mindfulness. It does not provide medical advice, diagnosis, or treatment.\n{memory}\nUser: {request.message}\nAI:"
+
+        # Generate AI response; tracked so a deploy lets it finish before the worker exits
+        with observe_stage("chat_message", "llm"):
+            generation = in_flight.run(ollama_service.generate_response(
+                prompt=prompt,
+                context=None
+            ))
+            if cancel_with is not None:
+                generation = cancel_on_disconnect(cancel_with, generation)
+            ai_response = await generation
 
-        # Add wellness disclaimer to response (only for longer responses)
+        # The disclaimer is stored as a template id and only rendered into responses
         response_text = ai_response.response
-        if len(response_text) > 100:  # Only add disclaimer for substantial responses
-            response_text += WELLNESS_DISCLAIMER
+        disclaimer = disclaimers.disclaimer_for(response_text)
 
         # Create AI message
-        ai_message = ChatMessage(
-            session_id=session_id,
-            role="assistant",
-            content=response_text
-        )
-        db.add(ai_message)
-        db.commit()
+        with observe_stage("chat_message", "persistence"):
+            ai_message = ChatMessage(
+                session_id=session_id,
+                role="assistant",
+                content=response_text,
+                disclaimer=disclaimer
+            )
+            db.add(ai_message)
+            db.flush()
+            written = [(user_message, query_vector), (ai_message, None)]
+            pending = [
+                embeddings.PendingEmbedding(message.message_id, session_id, user_id, message.content, vector)
+                for message, vector in written
+            ] if embeddings.EMBEDDINGS_ENABLED and user_id else []
+            db.commit()
+        mark_written(session_id, user_id)
+        for item in pending:
+            embeddings.embedding_writer.submit(item)
 
         return ChatResponse(
-            response=response_text,
+            response=disclaimers.render(response_text, disclaimer),
             session_id=session_id,
             created_at=datetime.utcnow()
         )
 
+    except (ClientDisconnected, ServerDraining):
+        raise
     except OllamaServiceError as e:
-        logger.error(f"Ollama service error: {str(e)}")
+        logger.error("Ollama service error: %s", e)
         raise HTTPException(status_code=503, detail="AI service temporarily unavailable")
     except Exception as e:
-        logger.error(f"Unexpected error in chat endpoint: {str(e)}")
+        logger.exception("Unexpected error in chat endpoint: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/sessions/{session_id}", response_model=List[MessageResponse])
 async def get_chat_history(
     session_id: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     api_key: str = Security(verify_api_key)
 ):
     """
     Retrieve chat history for a specific wellness session.
+
+    Answers `304 Not Modified` from the session row alone when the client's
+    ETag still matches, without loading (or rehydrating) any messages.
     """
     session = db.query(ChatSession).filter(ChatSession.session_id == session_id).first()
     if not session:
         raise HTTPException(status_code=404, detail="Wellness session not found")
+
+    etag = make_etag("history", session.session_id, session.last_message_at)
+    if is_not_modified(request, etag, session.last_message_at):
+        return not_modified(etag, session.last_message_at)
+    _ensure_hot(db, session)
+
+    if FAST_JSON_RESPONSES:
+        rows = db.query(
+            ChatMessage.message_id,
+            ChatMessage.role,
+            ChatMessage.content,
+            ChatMessage.timestamp,
+            ChatMessage.disclaimer
+        ).filter(
+            ChatMessage.session_id == session_id
+        ).order_by(ChatMessage.timestamp).all()
+        rows = [
+            (message_id, role, disclaimers.render(content, disclaimer), timestamp)
+            for message_id, role, content, timestamp, disclaimer in rows
+        ]
+        return set_validators(rows_response(rows, MESSAGE_FIELDS), etag, session.last_message_at)
     
     messages = db.query(ChatMessage).filter(
         ChatMessage.session_id == session_id
     ).order_by(ChatMessage.timestamp).all()
     
+    set_validators(response, etag, session.last_message_at)
     return [
         MessageResponse(
             message_id=msg.message_id,
             role=msg.role,
-            content=msg.content,
+            content=disclaimers.render(msg.content, msg.disclaimer),
             timestamp=msg.timestamp
         )
         for msg in messages
     ]
 
+@router.get("/search", response_model=List[SearchResult])
+async def search_messages(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    user_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=1000),
+    db: Session = Depends(get_read_db),
+    api_key: str = Security(verify_api_key)
+):
+    """
+    Full-text search over a user's wellness sessions, best match first.
+
+    The user defaults to the `X-User-Email` header. When more results are
+    available the `X-Next-Offset` response header holds the next `offset`.
+    Messages of archived sessions are not indexed until they are read again.
+    """
+    user_id = user_id or request.headers.get("X-User-Email")
+    if not user_id:
+        raise HTTPException(status_code=400, detail="user_id or X-User-Email header is required")
+
+    rows = search.search_messages(db, user_id, q, limit=limit + 1, offset=offset)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Offset"] = str(offset + limit)
+
+    return [
+        SearchResult(
+            message_id=row.message_id,
+            session_id=row.session_id,
+            role=row.role,
+            timestamp=row.timestamp,
+            score=row.score,
+            snippet=search.highlight(row.snippet)
+        )
+        for row in rows
+    ]
+
 @router.get("/copilot-summary/{session_id}")
-async def copilot_summary(session_id: str, db: Session = Depends(get_db), api_key: str = Security(verify_api_key)):
+async def copilot_summary(
+    session_id: str,
+    background: bool = False,
+    db: Session = Depends(get_read_db),
+    api_key: str = Security(verify_api_key)
+):
     """
     Generate a live summary and insights for a wellness session using AI.
+
+    A summary stored since the last message is returned without calling the
+    model. With `background=true` the summary is generated by a job instead:
+    the response is `202 Accepted` with the job to poll at `/api/jobs/{id}`.
     """
-    messages = db.query(ChatMessage).filter(ChatMessage.session_id == session_id).order_by(ChatMessage.timestamp).all()
-    if not messages:
+    session = db.query(ChatSession).filter(ChatSession.session_id == session_id).first()
+    if not session:
         raise HTTPException(status_code=404, detail="No messages found for this session")
-    chat_text = "\n".join([f"{m.role}: {m.content}" for m in messages])
-    prompt = (
-        "You are an expert wellness copilot. Summarize this wellness session in 2-3 sentences and provide 2 actionable insights for the user's personal growth and stress management.\n"
-        f"Session transcript:\n{chat_text}\n"
-        "Summary and insights:"
-    )
-    ai_response = await ollama_service.generate_response(prompt)
-    return {"summary": ai_response.response}
+    summary = summaries.cached_summary(session)
+    if summary is not None:
+        return {"summary": summary}
+
+    if background:
+        job = await jobs.enqueue(db, "copilot_summary", {"session_id": session_id}, priority=50)
+        return accepted(job)
+
+    _ensure_hot(db, session)
+    summary = await summaries.summarize_session(db, session)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No messages found for this session")
+    return {"summary": summary}
 
 @router.get("/sessions")
-async def list_sessions(db: Session = Depends(get_db), api_key: str = Security(verify_api_key)):
+async def list_sessions(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    api_key: str = Security(verify_api_key)
+):
     """
     List all wellness sessions for the user, with summary and metadata.
+
+    The ETag is an aggregate over chat_sessions only (session count, newest
+    session, newest message, archived count), so unchanged lists are
+    answered with `304 Not Modified` before any per-session query runs.
     """
+    validator = db.query(
+        func.count(ChatSession.session_id),
+        func.max(ChatSession.created_at),
+        func.max(ChatSession.last_message_at),
+        func.count(ChatSession.archived_at)
+    ).one()
+    last_modified = max((ts for ts in validator[1:3] if ts is not None), default=None)
+    etag = make_etag("sessions", *validator)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
     sessions = db.query(ChatSession).order_by(ChatSession.created_at.desc()).all()
     result = []
     for s in sessions:
         # Get last message for summary
         last_msg = db.query(ChatMessage).filter(ChatMessage.session_id == s.session_id).order_by(ChatMessage.timestamp.desc()).first()
-        summary = last_msg.content if last_msg else ''
+        # Archived sessions have no hot messages; their preview was kept on the session row
+        summary = last_msg.content if last_msg else (s.archived_preview or '')
         result.append({
             "session_id": s.session_id,
             "created_at": s.created_at,
@@ -171,4 +364,146 @@ async def list_sessions(db: Session = Depends(get_db), api_key: str = Security(v
             "wellness_type": s.session_metadata.get("therapy") if s.session_metadata else None,
             "user_id": s.user_id
         })
-    return result 
\ No newline at end of file
+    if FAST_JSON_RESPONSES:
+        return set_validators(ORJSONResponse(result), etag, last_modified)
+    set_validators(response, etag, last_modified)
+    return result
+
+# Rows fetched per server-side cursor round trip while exporting
+EXPORT_BATCH_SIZE = 500
+EXPORT_COLUMNS = ["message_id", "session_id", "role", "content", "timestamp"]
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _export_statement(db: Session, since: Optional[datetime], cursor: Optional[str]):
+    """
+    Build the ordered column select shared by the export endpoints.
+
+    `cursor` is the message_id of the last message the client already has;
+    rows are walked in (timestamp, message_id) order so it is stable even when
+    several messages share a timestamp.
+    """
+    stmt = select(
+        ChatMessage.message_id,
+        ChatMessage.session_id,
+        ChatMessage.role,
+        ChatMessage.content,
+        ChatMessage.timestamp,
+        ChatMessage.disclaimer
+    ).order_by(ChatMessage.timestamp, ChatMessage.message_id)
+
+    if since:
+        stmt = stmt.where(ChatMessage.timestamp > since)
+    if cursor:
+        cursor_timestamp = db.query(ChatMessage.timestamp).filter(ChatMessage.message_id == cursor).scalar()
+        if cursor_timestamp is None:
+            raise HTTPException(status_code=400, detail="Unknown export cursor")
+        stmt = stmt.where(
+            tuple_(ChatMessage.timestamp, ChatMessage.message_id) > tuple_(cursor_timestamp, cursor)
+        )
+    return stmt
+
+def _drain(buffer: io.StringIO) -> str:
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return chunk
+
+def _stream_export(stmt, fmt: str, bind) -> Iterator[str]:
+    """
+    Stream an export statement in batches through a server-side cursor.
+
+    The generator owns its own database session on `bind` so the connection
+    stays open for as long as the response body is being sent.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(EXPORT_COLUMNS)
+        yield _drain(buffer)
+
+    db = Session(bind=bind)
+    try:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for rows in result.partitions():
+            for row in rows:
+                timestamp = row.timestamp.isoformat() if row.timestamp else None
+                content = disclaimers.render(row.content, row.disclaimer)
+                if fmt == "csv":
+                    writer.writerow([row.message_id, row.session_id, row.role, content, timestamp or ""])
+                else:
+                    buffer.write(json.dumps({
+                        "message_id": row.message_id,
+                        "session_id": row.session_id,
+                        "role": row.role,
+                        "content": content,
+                        "timestamp": timestamp
+                    }))
+                    buffer.write("\n")
+            yield _drain(buffer)
+    finally:
+        db.close()
+
+def _export_response(db: Session, stmt, fmt: str, filename: str) -> StreamingResponse:
+    # Stream from the same database the request session reads from (the primary after a rehydrate)
+    return StreamingResponse(
+        _stream_export(stmt, fmt, db.get_bind(clause=stmt)),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
+
+@router.get("/sessions/{session_id}/export")
+async def export_session(
+    session_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    api_key: str = Security(verify_api_key)
+):
+    """
+    Stream the messages of one wellness session as NDJSON or CSV.
+
+    Pass `since` (timestamp) or `cursor` (last message_id received) to fetch
+    only messages written after it.
+    """
+    session = db.query(ChatSession).filter(ChatSession.session_id == session_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Wellness session not found")
+    _ensure_hot(db, session)
+
+    stmt = _export_statement(db, since, cursor).where(ChatMessage.session_id == session_id)
+    return _export_response(db, stmt, format, f"session-{session_id}")
+
+@router.get("/export")
+async def export_user_sessions(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    api_key: str = Security(verify_api_key)
+):
+    """
+    Stream the messages of every wellness session of a user as NDJSON or CSV.
+
+    The user defaults to the `X-User-Email` header, matching how sessions are
+    attributed when they are created.
+    """
+    user_id = user_id or request.headers.get("X-User-Email")
+    if not user_id:
+        raise HTTPException(status_code=400, detail="user_id or X-User-Email header is required")
+
+    archived_sessions = db.query(ChatSession).filter(
+        ChatSession.user_id == user_id,
+        ChatSession.archived_at.isnot(None)
+    ).all()
+    for session in archived_sessions:
+        _ensure_hot(db, session)
+
+    user_sessions = select(ChatSession.session_id).where(ChatSession.user_id == user_id)
+    stmt = _export_statement(db, since, cursor).where(ChatMessage.session_id.in_(user_sessions))
+    return _export_response(db, stmt, format, "wellness-sessions")
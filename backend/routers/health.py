@@ -0,0 +1,55 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+import asyncio
+import logging
+from external_integrations.ollama_service import OllamaService
+from database import engine, read_engine
+from drain import in_flight
+
+router = APIRouter(tags=["health"])
+logger = logging.getLogger(__name__)
+
+ollama_service = OllamaService()
+
+# Upper bound for each dependency check so a hung backend fails the probe quickly
+READINESS_TIMEOUT = 2.0
+
+def _check_database(bind) -> bool:
+    with bind.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    return True
+
+@router.get("/healthz")
+async def healthz():
+    """
+    Liveness probe: the worker process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz():
+    """
+    Readiness probe: the database (and read replica, if configured) and the
+    Ollama model backend are reachable, and the worker is not shutting down.
+    """
+    if in_flight.draining:
+        return JSONResponse({"status": "draining", "checks": {}}, status_code=503)
+    checks = {}
+    databases = {"database": engine}
+    if read_engine is not None:
+        databases["read_replica"] = read_engine
+    for name, bind in databases.items():
+        try:
+            checks[name] = await asyncio.wait_for(run_in_threadpool(_check_database, bind), READINESS_TIMEOUT)
+        except Exception as e:
+            logger.warning("Readiness check failed for %s: %s", name, e)
+            checks[name] = False
+    checks["ollama"] = await ollama_service.ping(timeout=READINESS_TIMEOUT)
+
+    ready = all(checks.values())
+    return JSONResponse(
+        {"status": "ready" if ready else "unavailable", "checks": checks},
+        status_code=200 if ready else 503
+    )
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, HTTPException, Security
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+from datetime import datetime
+from middleware.auth import verify_api_key
+from models.job import Job
+from services import jobs
+from database import get_db
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+class JobCreate(BaseModel):
+    kind: str
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    priority: int = Field(jobs.DEFAULT_PRIORITY, ge=0, le=1000)
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+def job_response(job: Job) -> JobResponse:
+    return JobResponse(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        priority=job.priority,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        result=job.result,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
+
+def accepted(job: Job) -> JSONResponse:
+    """202 response pointing the client at the job's status endpoint."""
+    return JSONResponse(
+        jsonable_encoder(job_response(job)),
+        status_code=202,
+        headers={"Location": f"/api/jobs/{job.id}"}
+    )
+
+@router.post("", response_model=JobResponse, status_code=202)
+async def create_job(
+    input: JobCreate,
+    db: Session = Depends(get_db),
+    api_key: str = Security(verify_api_key)
+):
+    """
+    Queue a background job. Lower `priority` values run first.
+    """
+    try:
+        job = await jobs.enqueue(db, input.kind, input.payload, priority=input.priority)
+    except jobs.UnknownJobKind:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind; expected one of {jobs.job_kinds()}")
+    return accepted(job)
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    api_key: str = Security(verify_api_key)
+):
+    """
+    Poll a job's status; `result` is set once it has succeeded.
+    """
+    job = db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
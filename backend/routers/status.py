@@ -0,0 +1,109 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime, timedelta
+import uuid
+from models.status import StatusCheck
+from services.status_ingest import status_writer, StatusIngestOverloaded
+from database import get_db
+
+router = APIRouter(prefix="/status", tags=["status"])
+
+# Reads without an explicit `since` only look this far back
+DEFAULT_STATUS_WINDOW = timedelta(hours=24)
+MAX_STATUS_PAGE_SIZE = 1000
+
+class StatusCheckResponse(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    client_name: str
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+class StatusCheckCreate(BaseModel):
+    client_name: str = Field(..., min_length=1, max_length=200)
+
+class ClientStatusResponse(BaseModel):
+    client_name: str
+    last_seen: datetime
+    heartbeats: int
+
+def _encode_cursor(check) -> str:
+    return f"{check.timestamp.isoformat()}|{check.id}"
+
+def _decode_cursor(cursor: str):
+    try:
+        timestamp, check_id = cursor.split("|", 1)
+        return datetime.fromisoformat(timestamp), check_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid status cursor")
+
+@router.post("", response_model=StatusCheckResponse)
+async def create_status_check(input: StatusCheckCreate):
+    """
+    Record a heartbeat. The row is queued and written in the next batch.
+    """
+    status_obj = StatusCheckResponse(client_name=input.client_name)
+    try:
+        status_writer.submit(status_obj.model_dump())
+    except StatusIngestOverloaded:
+        raise HTTPException(status_code=503, detail="Status ingestion is overloaded", headers={"Retry-After": "1"})
+    return status_obj
+
+@router.get("", response_model=List[StatusCheckResponse])
+async def get_status_checks(
+    response: Response,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    client_name: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_STATUS_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    List heartbeats newest first within a time window (default: last 24 hours).
+
+    When more rows are available the `X-Next-Cursor` response header holds the
+    value to pass as `cursor` for the next page.
+    """
+    since = since or datetime.utcnow() - DEFAULT_STATUS_WINDOW
+    query = db.query(StatusCheck).filter(StatusCheck.timestamp >= since)
+    if until:
+        query = query.filter(StatusCheck.timestamp < until)
+    if client_name:
+        query = query.filter(StatusCheck.client_name == client_name)
+    if cursor:
+        query = query.filter(tuple_(StatusCheck.timestamp, StatusCheck.id) < tuple_(*_decode_cursor(cursor)))
+
+    checks = query.order_by(StatusCheck.timestamp.desc(), StatusCheck.id.desc()).limit(limit + 1).all()
+    if len(checks) > limit:
+        checks = checks[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(checks[-1])
+
+    return [
+        StatusCheckResponse(id=check.id, client_name=check.client_name, timestamp=check.timestamp)
+        for check in checks
+    ]
+
+@router.get("/latest", response_model=List[ClientStatusResponse])
+async def get_latest_status(
+    since: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Latest heartbeat and heartbeat count per client within a time window
+    (default: last 24 hours).
+    """
+    since = since or datetime.utcnow() - DEFAULT_STATUS_WINDOW
+    rows = db.query(
+        StatusCheck.client_name,
+        func.max(StatusCheck.timestamp).label("last_seen"),
+        func.count(StatusCheck.id).label("heartbeats")
+    ).filter(
+        StatusCheck.timestamp >= since
+    ).group_by(StatusCheck.client_name).order_by(StatusCheck.client_name).all()
+
+    return [
+        ClientStatusResponse(client_name=row.client_name, last_seen=row.last_seen, heartbeats=row.heartbeats)
+        for row in rows
+    ]
@@ -0,0 +1,118 @@
+import hashlib
+from fastapi import APIRouter, Depends, Security, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import date, datetime, timedelta
+from middleware.auth import verify_api_key_without_quota
+from models.usage import ApiUsage
+from services.usage import usage_meter, USAGE_DAILY_TOKEN_QUOTA, USAGE_DAILY_AUDIO_SECONDS_QUOTA
+from database import get_read_db
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+MAX_USAGE_DAYS = 366
+
+class UsageTotals(BaseModel):
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    stt_seconds: float = 0.0
+    tts_seconds: float = 0.0
+
+class DailyUsageResponse(UsageTotals):
+    day: date
+
+class RouteUsageResponse(UsageTotals):
+    api_key_hash: str
+    route: str
+
+class QuotaResponse(BaseModel):
+    daily_tokens: Optional[int]
+    daily_audio_seconds: Optional[float]
+    tokens_used_today: int
+    audio_seconds_used_today: float
+
+class UsageResponse(BaseModel):
+    api_key_hash: str
+    start: date
+    end: date
+    quota: QuotaResponse
+    daily: List[DailyUsageResponse]
+
+def usage_window(days: int) -> datetime:
+    """Start of the first UTC day in a `days`-day window ending today."""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days - 1)
+
+def usage_by_route(db: Session, start: datetime, api_key_hash: Optional[str] = None) -> List[RouteUsageResponse]:
+    """Usage since `start` summed per key and route, heaviest token users first."""
+    tokens = func.sum(ApiUsage.prompt_tokens + ApiUsage.completion_tokens)
+    query = db.query(
+        ApiUsage.api_key_hash,
+        ApiUsage.route,
+        func.sum(ApiUsage.requests),
+        func.sum(ApiUsage.prompt_tokens),
+        func.sum(ApiUsage.completion_tokens),
+        func.sum(ApiUsage.stt_seconds),
+        func.sum(ApiUsage.tts_seconds)
+    ).filter(ApiUsage.period_start >= start)
+    if api_key_hash:
+        query = query.filter(ApiUsage.api_key_hash == api_key_hash)
+    rows = query.group_by(ApiUsage.api_key_hash, ApiUsage.route).order_by(tokens.desc()).all()
+    return [
+        RouteUsageResponse(
+            api_key_hash=key_hash,
+            route=route,
+            requests=requests or 0,
+            prompt_tokens=prompt_tokens or 0,
+            completion_tokens=completion_tokens or 0,
+            stt_seconds=stt_seconds or 0.0,
+            tts_seconds=tts_seconds or 0.0
+        )
+        for key_hash, route, requests, prompt_tokens, completion_tokens, stt_seconds, tts_seconds in rows
+    ]
+
+@router.get("", response_model=UsageResponse)
+async def get_usage(
+    days: int = Query(7, ge=1, le=MAX_USAGE_DAYS),
+    db: Session = Depends(get_read_db),
+    api_key: str = Security(verify_api_key_without_quota)
+):
+    """
+    Daily token and audio usage of the calling API key, with its quota.
+
+    Flushed usage lags by up to USAGE_FLUSH_INTERVAL seconds.
+    """
+    api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+    start = usage_window(days)
+    # At most 24 rows per route per day, summed per day here so the query stays portable
+    rows = db.query(ApiUsage).filter(
+        ApiUsage.api_key_hash == api_key_hash,
+        ApiUsage.period_start >= start
+    ).all()
+
+    daily = {}
+    for row in rows:
+        day = row.period_start.date()
+        totals = daily.setdefault(day, DailyUsageResponse(day=day))
+        totals.requests += row.requests
+        totals.prompt_tokens += row.prompt_tokens
+        totals.completion_tokens += row.completion_tokens
+        totals.stt_seconds += row.stt_seconds
+        totals.tts_seconds += row.tts_seconds
+
+    tokens_today, audio_today = usage_meter.usage_today(api_key_hash)
+    return UsageResponse(
+        api_key_hash=api_key_hash,
+        start=start.date(),
+        end=datetime.utcnow().date(),
+        quota=QuotaResponse(
+            daily_tokens=USAGE_DAILY_TOKEN_QUOTA or None,
+            daily_audio_seconds=USAGE_DAILY_AUDIO_SECONDS_QUOTA or None,
+            tokens_used_today=tokens_today,
+            audio_seconds_used_today=audio_today
+        ),
+        daily=[daily[day] for day in sorted(daily)]
+    )
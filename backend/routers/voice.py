@@ -1,41 +1,95 @@
-import traceback
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form, Request
 from fastapi.responses import StreamingResponse, JSONResponse
-from typing import Optional
+from typing import BinaryIO, Optional
 from pydantic import BaseModel
 from external_integrations.voice_service import VoiceService
 from middleware.auth import verify_api_key_demo
+from disconnect import cancel_on_disconnect, ClientDisconnected
+from drain import in_flight, ServerDraining
+import disclaimers
+from services.audio_upload import read_audio_upload, copy_audio, AudioRejected, SpooledReader
+from services import idempotency
+from services.idempotency import idempotent_turns
+from http_cache import make_etag, is_not_modified, not_modified, set_validators, LONG_LIVED
 import io
 import base64
 import json
+import logging
+from functools import lru_cache
 
 router = APIRouter(prefix="/voice", tags=["voice"])
-voice_service = VoiceService()
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=1)
+def get_voice_service() -> VoiceService:
+    """Create the voice service on first use instead of at import time."""
+    return VoiceService()
 
 class VoiceSettings(BaseModel):
     language: str = "en"
     voice_gender: str = "female"
     style: str = "calm"
 
-# Wellness disclaimer for voice responses
-VOICE_WELLNESS_DISCLAIMER = """
-Note: This is a wellness and self-improvement conversation. For medical concerns, please consult a healthcare provider.
-"""
-
 @router.post("/process")
 async def process_voice(
+    request: Request,
     audio: UploadFile = File(...),
     settings: str = Form(None),
     context: Optional[str] = Form(None),
-    api_key = Depends(verify_api_key_demo)
+    api_key = Depends(verify_api_key_demo),
+    voice_service: VoiceService = Depends(get_voice_service)
 ):
     """
     Process voice input and return AI response with TTS for wellness support.
+
+    With an `Idempotency-Key` header the turn runs once: a retry waits for
+    the running turn or gets its stored response.
+    """
+    # Validate before the catch-all below, so bad uploads get a 4xx and not a 500
+    try:
+        upload = await read_audio_upload(audio)
+    except AudioRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    key = idempotency.request_key(request)
+    if key is None:
+        return JSONResponse(await _voice_turn(voice_service, upload.file, upload.filename, settings, context, cancel_with=request))
+
+    # The turn keeps running if the client goes away, after the form's files are closed
+    audio_copy, audio_digest = await copy_audio(upload)
+    started = False
+
+    async def turn() -> idempotency.StoredResponse:
+        nonlocal started
+        started = True
+        try:
+            return idempotency.StoredResponse.from_content(
+                await _voice_turn(voice_service, SpooledReader(audio_copy), upload.filename, settings, context)
+            )
+        finally:
+            audio_copy.close()
+
+    try:
+        return await idempotent_turns.run(request, key, idempotency.fingerprint(audio_digest, settings, context), turn)
+    finally:
+        if not started:
+            audio_copy.close()
+
+async def _voice_turn(
+    voice_service: VoiceService,
+    audio_file: BinaryIO,
+    filename: str,
+    settings: Optional[str],
+    context: Optional[str],
+    cancel_with: Optional[Request] = None
+) -> dict:
+    """
+    Transcribe, reply and synthesise one voice turn.
+
+    With `cancel_with`, a disconnect of that request's client cancels whichever
+    stage is running, so TTS is skipped for a turn nobody will hear.
     """
     try:
-        # Read audio file
-        audio_data = await audio.read()
-        
         # Parse settings JSON string
         settings_obj = VoiceSettings.parse_raw(settings) if settings else VoiceSettings()
         
@@ -43,42 +97,53 @@ async def process_voice(
         context_list = json.loads(context) if context else None
         
         # Process voice session with wellness focus
-        result = await voice_service.process_voice_session(
-            audio_data,
+        session = in_flight.run(voice_service.process_voice_session(
+            audio_file,
             language=settings_obj.language,
             voice_gender=settings_obj.voice_gender,
             style=settings_obj.style,
-            context=context_list
-        )
+            context=context_list,
+            filename=filename
+        ))
+        if cancel_with is not None:
+            session = cancel_on_disconnect(cancel_with, session)
+        result = await session
         
         # Add wellness disclaimer to AI response if it's substantial
         ai_response = result["ai_response"]
-        if len(ai_response) > 100:
-            ai_response += VOICE_WELLNESS_DISCLAIMER
+        ai_response = disclaimers.render(ai_response, disclaimers.disclaimer_for(ai_response, disclaimers.VOICE_WELLNESS))
         
         # Return audio response as streaming response
         audio_b64 = base64.b64encode(result["audio_response"]).decode("utf-8")
-        return JSONResponse({
+        return {
             "audio": audio_b64,
             "transcribed_text": result["transcribed_text"],
             "ai_response": ai_response
-        })
+        }
         
+    except (ClientDisconnected, ServerDraining):
+        raise
     except Exception as e:
-        print("Voice processing error:", e)
-        traceback.print_exc()
+        logger.exception("Voice processing error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _catalog_response(request: Request, catalog: dict) -> JSONResponse:
+    """Serve a static catalog with a content-hash ETag and long-lived caching."""
+    etag = make_etag(json.dumps(catalog, sort_keys=True))
+    if is_not_modified(request, etag):
+        return not_modified(etag, cache_control=LONG_LIVED)
+    return set_validators(JSONResponse(catalog), etag, cache_control=LONG_LIVED)
+
 @router.get("/supported-languages")
-async def get_supported_languages():
+async def get_supported_languages(request: Request, voice_service: VoiceService = Depends(get_voice_service)):
     """
     Get list of supported languages and their voices for wellness sessions.
     """
-    return voice_service.supported_languages
+    return _catalog_response(request, voice_service.supported_languages)
 
 @router.get("/voice-styles")
-async def get_voice_styles():
+async def get_voice_styles(request: Request, voice_service: VoiceService = Depends(get_voice_service)):
     """
     Get available voice styles and their parameters for wellness support.
     """
-    return voice_service.voice_styles 
\ No newline at end of file
+    return _catalog_response(request, voice_service.voice_styles) 
\ No newline at end of file
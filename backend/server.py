@@ -1,26 +1,52 @@
-from fastapi import FastAPI, APIRouter, Request
+from fastapi import FastAPI, APIRouter, Request, Response
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List
-import uuid
-from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from prometheus_client import CONTENT_TYPE_LATEST
 from external_integrations.ollama_service import OllamaService
+from middleware.prometheus import PrometheusMiddleware
+from middleware.request_id import RequestIdMiddleware
+from middleware.compression import CompressionMiddleware
+from middleware.body_limit import BodySizeLimitMiddleware
+from middleware.profiling import ProfilingMiddleware
+from middleware.usage import UsageMiddleware
+from logging_config import configure_logging
+from metrics import instrument_db_pool, render_metrics
+from disconnect import cancel_on_disconnect, ClientDisconnected, CLIENT_CLOSED_REQUEST
+from drain import in_flight, ServerDraining, DRAIN_RETRY_AFTER
 
 # Import our routers
-from routers import chat, voice
-from database import engine, Base
+from routers import chat, health, status, analytics, jobs, admin, usage
+from services.status_ingest import status_writer
+from services.search import ensure_search_schema
+from services.embeddings import EMBEDDINGS_ENABLED, embedding_writer
+from services.jobs import JOB_RUNNER_ENABLED, job_runner
+from services.usage import usage_meter
+from services.idempotency import idempotent_turns
+from profiling import PROFILE_SAMPLE_RATE, TRACEMALLOC_FRAMES, loop_watchdog, memory_tracer
+from database import engine, read_engine, Base
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Configure JSON logging through a background queue listener
+configure_logging()
+
+ollama_service = OllamaService()
+
+# Feature switches read once at import
+VOICE_ENABLED = os.getenv("VOICE_ENABLED", "true").lower() == "true"
+# Alembic owns the schema (entrypoint.sh runs it once per deploy); creating it here
+# from every worker would take DDL locks on hot tables and race the migrations.
+# On by default only for SQLite development databases.
+AUTO_CREATE_SCHEMA = os.getenv("AUTO_CREATE_SCHEMA", str(engine.dialect.name == "sqlite")).lower() == "true"
+# Room for multipart headers and the small form fields sent alongside an upload
+FORM_OVERHEAD_BYTES = 64 * 1024
 
 # Create the main app
 app = FastAPI(
@@ -57,16 +83,16 @@ api_router = APIRouter(prefix="/api")
 
 # Include our routers
 api_router.include_router(chat.router)
-api_router.include_router(voice.router)
-
-# Define Models
-class StatusCheck(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    client_name: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-
-class StatusCheckCreate(BaseModel):
-    client_name: str
+if VOICE_ENABLED:
+    # Voice routes are only registered (and their module only imported) when enabled
+    from routers import voice
+    api_router.include_router(voice.router)
+api_router.include_router(health.router)
+api_router.include_router(status.router)
+api_router.include_router(analytics.router)
+api_router.include_router(jobs.router)
+api_router.include_router(usage.router)
+api_router.include_router(admin.router)
 
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
@@ -78,33 +104,60 @@ async def root():
         "version": "1.0.0"
     }
 
-@api_router.post("/status", response_model=StatusCheck)
-async def create_status_check(input: StatusCheckCreate):
-    status_dict = input.dict()
-    status_obj = StatusCheck(**status_dict)
-    with Session(engine) as session:
-        session.add(status_obj)
-        session.commit()
-    return status_obj
-
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    with Session(engine) as session:
-        status_checks = session.execute("SELECT * FROM status_check").fetchall()
-    return [StatusCheck(**status_check) for status_check in status_checks]
-
 @app.post('/api/ollama-chat')
 async def ollama_chat(request: Request):
     data = await request.json()
     prompt = data.get('prompt', '')
     if not prompt:
         return {"reply": "No prompt provided."}
-    response = await ollama_service.generate_response(prompt=prompt)
+    if in_flight.draining:
+        raise ServerDraining()
+    response = await cancel_on_disconnect(request, in_flight.run(ollama_service.generate_response(prompt=prompt)))
     return {"reply": response.response}
 
+@app.exception_handler(ClientDisconnected)
+async def client_disconnected(request: Request, exc: ClientDisconnected):
+    # Nobody is listening; the status only shows up in access logs and metrics
+    return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+@app.exception_handler(ServerDraining)
+async def server_draining(request: Request, exc: ServerDraining):
+    # This worker is shutting down for a deploy; the retry lands on one that is not
+    return JSONResponse(
+        {"detail": "Server is restarting, please retry"},
+        status_code=503,
+        headers={"Retry-After": str(DRAIN_RETRY_AFTER), "Connection": "close"}
+    )
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Compress large responses when COMPRESSION_MIN_BYTES is set (0 disables)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "0"))
+if COMPRESSION_MIN_BYTES > 0:
+    app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
+
+# Refuse oversized voice uploads before the multipart parser spools them
+if VOICE_ENABLED:
+    from services.audio_upload import AUDIO_MAX_BYTES
+    app.add_middleware(BodySizeLimitMiddleware, limits={"/api/voice/process": AUDIO_MAX_BYTES + FORM_OVERHEAD_BYTES})
+
+# Record per-route latency and database pool usage
+app.add_middleware(PrometheusMiddleware)
+instrument_db_pool(engine)
+if read_engine is not None:
+    instrument_db_pool(read_engine)
+
+# Token and audio usage per API key, written in batches by usage_meter
+app.add_middleware(UsageMiddleware)
+
+# Sampled request profiles; admins can also ask for one with X-Profile: 1
+app.add_middleware(ProfilingMiddleware, sample_rate=PROFILE_SAMPLE_RATE)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -114,33 +167,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Tag every log record with the request it belongs to
+app.add_middleware(RequestIdMiddleware)
+
 logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting up HealMind AI Wellness API...")
+    if AUTO_CREATE_SCHEMA:
+        # Create database tables
+        Base.metadata.create_all(bind=engine)
+        ensure_search_schema(engine)
     try:
         # Test database connection
         with Session(engine) as session:
             session.execute(text("SELECT 1"))
         logger.info("Successfully connected to PostgreSQL")
     except Exception as e:
-        logger.error(f"Failed to connect to PostgreSQL: {str(e)}")
+        logger.error("Failed to connect to PostgreSQL: %s", e)
         raise
+    status_writer.start()
+    usage_meter.start()
+    if EMBEDDINGS_ENABLED:
+        embedding_writer.start()
+    if JOB_RUNNER_ENABLED:
+        job_runner.start()
+    loop_watchdog.start()
+    if TRACEMALLOC_FRAMES > 0:
+        memory_tracer.start(TRACEMALLOC_FRAMES)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down HealMind AI Wellness API...")
-    try:
-        # Close database connection
-        with Session(engine) as session:
-            session.close()
-        logger.info("Successfully closed PostgreSQL connection")
-    except Exception as e:
-        logger.error(f"Failed to close PostgreSQL connection: {str(e)}")
-        raise
+    # Normally already draining (see workers.py); covers servers started without that worker
+    in_flight.begin()
+    await in_flight.wait()
+    # Write heartbeats, embeddings and usage still waiting in their batch queues
+    await status_writer.stop()
+    await embedding_writer.stop()
+    await job_runner.stop()
+    # After the job runner, so usage from jobs cut short is still written
+    await usage_meter.stop()
+    await loop_watchdog.stop()
+    await idempotent_turns.close()
+    if VOICE_ENABLED:
+        await voice.get_voice_service().aclose()
+    # Close pooled connections now rather than leaving the database to time them out
+    engine.dispose()
+    if read_engine is not None:
+        read_engine.dispose()
+    logger.info("Closed database connection pools")
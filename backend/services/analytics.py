@@ -0,0 +1,171 @@
+import os
+import logging
+import argparse
+from collections import defaultdict
+from datetime import datetime, date
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event, inspect, select, update, delete, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from models.chat import ChatSession, ChatMessage
+from models.analytics import UserDailyActivity
+from database import SessionLocal
+from logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Gaps between consecutive messages longer than this do not count as talk time
+ANALYTICS_IDLE_GAP_SECONDS = float(os.getenv("ANALYTICS_IDLE_GAP_SECONDS", "1800"))
+UNSPECIFIED_WELLNESS_TYPE = "unspecified"
+COUNTERS = ("sessions", "messages", "user_messages", "talk_seconds")
+
+RollupKey = Tuple[str, date, str]
+Deltas = Dict[RollupKey, Dict[str, float]]
+
+def _new_deltas() -> Deltas:
+    return defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+def wellness_type(session: ChatSession) -> str:
+    metadata = session.session_metadata or {}
+    return metadata.get("therapy") or UNSPECIFIED_WELLNESS_TYPE
+
+def accumulate(deltas: Deltas, session: ChatSession, last_message_at: Optional[datetime], messages: Iterable) -> Optional[datetime]:
+    """
+    Fold a session's new messages, in timestamp order, into rollup deltas.
+
+    `last_message_at` is the session's newest message before these ones: the
+    first message on a new day counts the session as active that day, and
+    gaps up to ANALYTICS_IDLE_GAP_SECONDS count as talk time.
+
+    Returns:
+        Optional[datetime]: The session's new last_message_at
+    """
+    kind = wellness_type(session)
+    for message in messages:
+        timestamp = message.timestamp
+        if session.user_id:
+            counters = deltas[(session.user_id, timestamp.date(), kind)]
+            if last_message_at is None or last_message_at.date() < timestamp.date():
+                counters["sessions"] += 1
+            if last_message_at is not None:
+                gap = (timestamp - last_message_at).total_seconds()
+                if 0 < gap <= ANALYTICS_IDLE_GAP_SECONDS:
+                    counters["talk_seconds"] += gap
+            counters["messages"] += 1
+            if message.role == "user":
+                counters["user_messages"] += 1
+        if last_message_at is None or timestamp > last_message_at:
+            last_message_at = timestamp
+    return last_message_at
+
+def apply_deltas(connection, deltas: Deltas) -> None:
+    """Add rollup deltas to user_daily_activity, creating missing rows."""
+    table = UserDailyActivity.__table__
+    dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(connection.dialect.name)
+    for (user_id, day, kind), counters in deltas.items():
+        key = {"user_id": user_id, "day": day, "wellness_type": kind}
+        if dialect_insert is not None:
+            stmt = dialect_insert(table).values(**key, **counters)
+            connection.execute(stmt.on_conflict_do_update(
+                index_elements=list(key),
+                set_={name: table.c[name] + stmt.excluded[name] for name in COUNTERS}
+            ))
+            continue
+        result = connection.execute(
+            update(table)
+            .where(*(table.c[name] == value for name, value in key.items()))
+            .values({name: table.c[name] + value for name, value in counters.items()})
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(**key, **counters))
+
+@event.listens_for(Session, "after_flush")
+def _roll_up_new_messages(db: Session, flush_context) -> None:
+    """
+    Update the daily rollups and chat_sessions.last_message_at for every
+    ChatMessage inserted by this flush, in the same transaction.
+
+    Runs after the INSERTs so column defaults (timestamp) are populated.
+    Bulk Core inserts (archive rehydration) restore old messages and are
+    deliberately not counted again.
+    """
+    new_messages = [obj for obj in db.new if isinstance(obj, ChatMessage)]
+    if not new_messages:
+        return
+
+    pending_sessions = {obj.session_id: obj for obj in db.new if isinstance(obj, ChatSession)}
+    by_session: Dict[str, List[ChatMessage]] = defaultdict(list)
+    for message in new_messages:
+        by_session[message.session_id].append(message)
+
+    deltas = _new_deltas()
+    connection = db.connection()
+    for session_id, messages in by_session.items():
+        session = pending_sessions.get(session_id) or db.get(ChatSession, session_id)
+        if session is None:
+            continue
+        messages.sort(key=lambda m: (m.timestamp, inspect(m).insert_order))
+        last_message_at = accumulate(deltas, session, session.last_message_at, messages)
+        if last_message_at != session.last_message_at:
+            connection.execute(
+                update(ChatSession.__table__)
+                .where(ChatSession.__table__.c.session_id == session_id)
+                .values(last_message_at=last_message_at)
+            )
+            set_committed_value(session, "last_message_at", last_message_at)
+
+    apply_deltas(connection, deltas)
+
+def rebuild_user_activity(db: Session, user_id: Optional[str] = None) -> int:
+    """
+    Recompute rollups (and last_message_at) from the hot chat_messages table.
+
+    Used to backfill history written before the rollups existed. Messages of
+    archived sessions are not in chat_messages, so rebuild before archiving
+    or rehydrate those sessions first.
+
+    Returns:
+        int: Number of sessions processed
+    """
+    delete_stmt = delete(UserDailyActivity)
+    sessions_query = db.query(ChatSession).order_by(ChatSession.created_at)
+    if user_id:
+        delete_stmt = delete_stmt.where(UserDailyActivity.user_id == user_id)
+        sessions_query = sessions_query.filter(ChatSession.user_id == user_id)
+    db.execute(delete_stmt)
+
+    processed = 0
+    for session in sessions_query.all():
+        deltas = _new_deltas()
+        messages = db.execute(
+            select(ChatMessage.timestamp, ChatMessage.role)
+            .where(ChatMessage.session_id == session.session_id)
+            .order_by(ChatMessage.timestamp)
+        )
+        last_message_at = accumulate(deltas, session, None, messages)
+        if last_message_at is not None:
+            session.last_message_at = last_message_at
+        apply_deltas(db.connection(), deltas)
+        processed += 1
+    db.commit()
+    return processed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain wellness analytics rollups")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute rollups from chat_messages")
+    parser.add_argument("--user-id", default=None)
+    args = parser.parse_args()
+
+    configure_logging()
+    if not args.rebuild:
+        parser.error("nothing to do; pass --rebuild")
+    db = SessionLocal()
+    try:
+        processed = rebuild_user_activity(db, user_id=args.user_id)
+        logger.info("Rebuilt analytics rollups for %d sessions", processed)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
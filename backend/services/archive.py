@@ -0,0 +1,316 @@
+import os
+import json
+import logging
+import argparse
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple, List, Dict, Any
+import zstandard
+from sqlalchemy import select, delete, insert, exists, text
+from sqlalchemy.orm import Session
+from models.chat import ChatSession, ChatMessage
+from database import SessionLocal
+from logging_config import configure_logging
+from disclaimers import split_disclaimer
+
+logger = logging.getLogger(__name__)
+
+# Sessions without a message newer than this are moved to archive storage
+ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_COMPRESSION_LEVEL = 10
+
+class ArchiveStoreError(Exception):
+    """Custom exception for archive storage errors"""
+    pass
+
+class LocalArchiveStore:
+    """Archive objects stored as files under a local directory."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> bytes:
+        try:
+            return (self.root / key).read_bytes()
+        except FileNotFoundError:
+            raise ArchiveStoreError(f"Archive object not found: {key}")
+
+    def delete(self, key: str) -> None:
+        (self.root / key).unlink(missing_ok=True)
+
+class S3ArchiveStore:
+    """Archive objects stored in an S3-compatible bucket."""
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None):
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data)
+
+    def get(self, key: str) -> bytes:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        except self.client.exceptions.NoSuchKey:
+            raise ArchiveStoreError(f"Archive object not found: {key}")
+        return response["Body"].read()
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+@lru_cache(maxsize=1)
+def get_archive_store():
+    """
+    Build the archive store configured through ARCHIVE_BACKEND ("local" or "s3").
+    """
+    backend = os.getenv("ARCHIVE_BACKEND", "local")
+    if backend == "s3":
+        return S3ArchiveStore(
+            bucket=os.environ["ARCHIVE_S3_BUCKET"],
+            prefix=os.getenv("ARCHIVE_S3_PREFIX", "healmind-archive"),
+            endpoint_url=os.getenv("ARCHIVE_S3_ENDPOINT_URL")
+        )
+    return LocalArchiveStore(os.getenv("ARCHIVE_DIR", "archive"))
+
+def _archive_key(session: ChatSession) -> str:
+    created = session.created_at or datetime.utcnow()
+    return f"chat_sessions/{created:%Y/%m}/{session.session_id}.ndjson.zst"
+
+def _encode_line(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record) + "\n").encode("utf-8")
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+def _encode_session(db: Session, session: ChatSession) -> Tuple[bytes, int, Optional[datetime], Optional[str]]:
+    """
+    Compress a session header line plus one NDJSON line per message.
+
+    Messages are read through a server-side cursor and fed straight into the
+    compressor, so only the compressed payload is held in memory.
+
+    Returns:
+        Tuple: The payload, the message count, and the timestamp and content
+        of the last message
+    """
+    compressor = zstandard.ZstdCompressor(level=ARCHIVE_COMPRESSION_LEVEL).compressobj()
+    chunks = [compressor.compress(_encode_line({
+        "session_id": session.session_id,
+        "created_at": _timestamp(session.created_at),
+        "user_id": session.user_id,
+        "session_metadata": session.session_metadata
+    }))]
+
+    stmt = select(
+        ChatMessage.message_id,
+        ChatMessage.role,
+        ChatMessage.content,
+        ChatMessage.timestamp,
+        ChatMessage.disclaimer
+    ).where(
+        ChatMessage.session_id == session.session_id
+    ).order_by(ChatMessage.timestamp, ChatMessage.message_id)
+
+    count = 0
+    last_timestamp = None
+    last_content = None
+    result = db.execute(stmt.execution_options(yield_per=ARCHIVE_BATCH_SIZE))
+    for rows in result.partitions():
+        for row in rows:
+            chunks.append(compressor.compress(_encode_line({
+                "message_id": row.message_id,
+                "role": row.role,
+                "content": row.content,
+                "disclaimer": row.disclaimer,
+                "timestamp": _timestamp(row.timestamp)
+            })))
+            last_timestamp = row.timestamp
+            last_content = row.content
+            count += 1
+    chunks.append(compressor.flush())
+    return b"".join(chunks), count, last_timestamp, last_content
+
+def _decode_session(data: bytes) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    payload = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    lines = payload.decode("utf-8").splitlines()
+    header = json.loads(lines[0])
+    messages = []
+    for line in lines[1:]:
+        record = json.loads(line)
+        content, disclaimer = record["content"], record.get("disclaimer")
+        if "disclaimer" not in record and content:
+            # Archived before disclaimers were stored apart from the text
+            content, disclaimer = split_disclaimer(content)
+        messages.append({
+            "message_id": record["message_id"],
+            "session_id": header["session_id"],
+            "role": record["role"],
+            "content": content,
+            "disclaimer": disclaimer,
+            "timestamp": datetime.fromisoformat(record["timestamp"])
+        })
+    return header, messages
+
+def archive_session(db: Session, session: ChatSession, store=None) -> int:
+    """
+    Move the messages of one session to archive storage.
+
+    The archive object is written before any row is deleted. If a message
+    arrives while the session is being archived the delete is rolled back and
+    the session stays hot.
+
+    Returns:
+        int: Number of messages archived (0 if the session was skipped)
+    """
+    store = store or get_archive_store()
+    key = _archive_key(session)
+
+    data, count, last_timestamp, last_content = _encode_session(db, session)
+    store.put(key, data)
+
+    if count:
+        db.execute(
+            delete(ChatMessage).where(
+                ChatMessage.session_id == session.session_id,
+                ChatMessage.timestamp <= last_timestamp
+            )
+        )
+        still_active = db.query(
+            exists().where(ChatMessage.session_id == session.session_id)
+        ).scalar()
+        if still_active:
+            db.rollback()
+            store.delete(key)
+            logger.info("Skipped archiving active session %s", session.session_id)
+            return 0
+
+    session.archived_at = datetime.utcnow()
+    session.archive_key = key
+    session.archived_preview = last_content
+    db.commit()
+    return count
+
+def rehydrate_session(db: Session, session: ChatSession, store=None) -> int:
+    """
+    Restore an archived session's messages into chat_messages.
+
+    Returns:
+        int: Number of messages restored
+    """
+    store = store or get_archive_store()
+
+    # Serialise concurrent rehydrations of the same session
+    session = db.query(ChatSession).filter(
+        ChatSession.session_id == session.session_id
+    ).with_for_update().first()
+    if session.archived_at is None:
+        db.commit()
+        return 0
+
+    key = session.archive_key
+    _, messages = _decode_session(store.get(key))
+    if messages:
+        db.execute(insert(ChatMessage), messages)
+    session.archived_at = None
+    session.archive_key = None
+    session.archived_preview = None
+    db.commit()
+
+    try:
+        store.delete(key)
+    except Exception as e:
+        logger.warning("Failed to delete archive object %s: %s", key, e)
+
+    logger.info("Rehydrated %d messages for session %s", len(messages), session.session_id)
+    return len(messages)
+
+def ensure_message_partitions(db: Session, months_ahead: int = 2) -> None:
+    """
+    Create the monthly chat_messages partitions for the coming months.
+
+    Only applies to PostgreSQL, where chat_messages is range-partitioned on
+    timestamp; rows outside every partition land in chat_messages_default.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(months_ahead + 1):
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        db.execute(text(
+            f'CREATE TABLE IF NOT EXISTS chat_messages_{month_start:%Y_%m} '
+            f"PARTITION OF chat_messages FOR VALUES FROM ('{month_start:%Y-%m-%d}') TO ('{next_month:%Y-%m-%d}')"
+        ))
+        month_start = next_month
+    db.commit()
+
+def archive_cold_sessions(
+    db: Session,
+    store=None,
+    older_than_days: int = ARCHIVE_RETENTION_DAYS,
+    limit: Optional[int] = None
+) -> int:
+    """
+    Archive every session with no message newer than the retention window.
+
+    Returns:
+        int: Number of sessions archived
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    recent_activity = exists().where(
+        ChatMessage.session_id == ChatSession.session_id,
+        ChatMessage.timestamp >= cutoff
+    )
+    query = db.query(ChatSession).filter(
+        ChatSession.archived_at.is_(None),
+        ChatSession.created_at < cutoff,
+        ~recent_activity
+    ).order_by(ChatSession.created_at)
+    if limit:
+        query = query.limit(limit)
+
+    archived = 0
+    for session_id in [s.session_id for s in query.all()]:
+        session = db.get(ChatSession, session_id)
+        try:
+            archive_session(db, session, store)
+            if session.archived_at is not None:
+                archived += 1
+        except Exception as e:
+            db.rollback()
+            logger.error("Failed to archive session %s: %s", session_id, e)
+    return archived
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive cold wellness sessions")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_RETENTION_DAYS)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--months-ahead", type=int, default=2)
+    args = parser.parse_args()
+
+    configure_logging()
+    db = SessionLocal()
+    try:
+        ensure_message_partitions(db, months_ahead=args.months_ahead)
+        archived = archive_cold_sessions(db, older_than_days=args.older_than_days, limit=args.limit)
+        logger.info("Archived %d sessions", archived)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import io
+import os
+import struct
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Optional, Tuple
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+# Whisper rejects files above 25 MB, so larger uploads are refused up front
+AUDIO_MAX_BYTES = int(os.getenv("AUDIO_MAX_BYTES", str(25 * 1024 * 1024)))
+AUDIO_MAX_SECONDS = float(os.getenv("AUDIO_MAX_SECONDS", "300"))
+# Enough to sniff the container and walk a WAV header to its data chunk
+HEADER_BYTES = 4096
+# Copies spill to disk past the same size as Starlette's form spool
+SPOOL_MAX_BYTES = 1024 * 1024
+COPY_CHUNK_BYTES = 64 * 1024
+
+# MediaRecorder uploads are often labelled audio/wav whatever they contain, so
+# the content type is only used to reject clearly non-audio parts; the actual
+# format comes from the file's magic bytes
+ACCEPTED_CONTENT_TYPES = {"application/octet-stream", "video/webm", "video/mp4"}
+
+class AudioRejected(Exception):
+    """Raised when an upload is not acceptable voice input"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+class SpooledReader(io.RawIOBase):
+    """
+    Read-only view of a spooled upload.
+
+    It has no fileno(), so HTTP clients that size files with fstat() fall back
+    to seek()/tell() instead of forcing an in-memory spool onto disk.
+    """
+
+    def __init__(self, file: BinaryIO):
+        self._file = file
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def readinto(self, buffer) -> int:
+        data = self._file.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+@dataclass
+class AudioUpload:
+    """A validated upload; `file` is positioned at the start of the audio."""
+    file: BinaryIO
+    format: str
+    size: int
+    duration: Optional[float]
+
+    @property
+    def filename(self) -> str:
+        # Whisper infers the codec from the extension
+        return f"audio.{self.format}"
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """Identify the audio container from its first bytes."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[4:8] == b"ftyp":
+        return "m4a"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return None
+
+def wav_duration(head: bytes, size: int) -> Optional[float]:
+    """
+    Duration of a WAV file from its header.
+
+    Streamed WAVs often carry a placeholder data size, so the size of the
+    upload bounds the data chunk as well.
+    """
+    byte_rate = None
+    offset = 12
+    while offset + 8 <= len(head):
+        chunk_id, chunk_size = struct.unpack_from("<4sI", head, offset)
+        if chunk_id == b"fmt " and offset + 20 <= len(head):
+            byte_rate = struct.unpack_from("<I", head, offset + 16)[0]
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            data_size = min(chunk_size, size - offset - 8)
+            return data_size / byte_rate
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+def _check_content_type(content_type: Optional[str]) -> None:
+    media_type = (content_type or "application/octet-stream").split(";")[0].strip().lower()
+    if not media_type.startswith("audio/") and media_type not in ACCEPTED_CONTENT_TYPES:
+        raise AudioRejected(415, f"Unsupported content type {media_type!r}; upload an audio file")
+
+def inspect_audio(head: bytes, size: int, max_bytes: int = AUDIO_MAX_BYTES, max_seconds: float = AUDIO_MAX_SECONDS) -> Tuple[str, Optional[float]]:
+    """
+    Validate audio from its size and first HEADER_BYTES bytes.
+
+    Returns:
+        Tuple[str, Optional[float]]: Format and duration (None when the
+        container does not declare one cheaply)
+    """
+    if size == 0:
+        raise AudioRejected(422, "Audio upload is empty")
+    if size > max_bytes:
+        raise AudioRejected(413, f"Audio upload exceeds {max_bytes} bytes")
+
+    audio_format = sniff_format(head)
+    if audio_format is None:
+        raise AudioRejected(415, "Unrecognised audio format")
+
+    duration = wav_duration(head, size) if audio_format == "wav" else None
+    if audio_format == "wav" and duration is None:
+        raise AudioRejected(422, "Malformed WAV header")
+    if duration is not None and duration > max_seconds:
+        raise AudioRejected(413, f"Audio is {duration:.0f}s long; the limit is {max_seconds:.0f}s")
+    return audio_format, duration
+
+async def read_audio_upload(
+    upload: UploadFile,
+    max_bytes: int = AUDIO_MAX_BYTES,
+    max_seconds: float = AUDIO_MAX_SECONDS
+) -> AudioUpload:
+    """
+    Validate an uploaded audio part in place.
+
+    The form parser has already spooled the part (in memory up to 1 MB, on
+    disk beyond). Only the header is read here and the spooled file itself is
+    handed on, so the audio is never copied into a bytes object.
+
+    Raises:
+        AudioRejected: With 413, 415 or 422 for oversized, non-audio or malformed uploads
+    """
+    _check_content_type(upload.content_type)
+    size = upload.size
+    if size is None:
+        size = await run_in_threadpool(upload.file.seek, 0, os.SEEK_END)
+    await upload.seek(0)
+    head = await upload.read(HEADER_BYTES)
+    await upload.seek(0)
+    audio_format, duration = inspect_audio(head, size, max_bytes, max_seconds)
+    return AudioUpload(file=SpooledReader(upload.file), format=audio_format, size=size, duration=duration)
+
+def _copy_audio(source: BinaryIO) -> Tuple[BinaryIO, str]:
+    copy = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    digest = hashlib.sha256()
+    source.seek(0)
+    for chunk in iter(lambda: source.read(COPY_CHUNK_BYTES), b""):
+        digest.update(chunk)
+        copy.write(chunk)
+    source.seek(0)
+    copy.seek(0)
+    return copy, digest.hexdigest()
+
+async def copy_audio(upload: AudioUpload) -> Tuple[BinaryIO, str]:
+    """
+    Copy a validated upload into a spooled file owned by the caller, hashing it on the way.
+
+    The form's files are closed when the request ends; work that may outlive
+    the request reads the copy instead. The caller closes it.
+
+    Returns:
+        Tuple[BinaryIO, str]: The copy, positioned at the start, and the audio's SHA-256
+    """
+    return await run_in_threadpool(_copy_audio, upload.file)
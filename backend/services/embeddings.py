@@ -0,0 +1,387 @@
+import os
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from external_integrations.ollama_service import OllamaService
+from models.chat import ChatSession, ChatMessage
+from models.embedding import MessageEmbedding
+from database import SessionLocal
+from logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_ENABLED = os.getenv("EMBEDDINGS_ENABLED", "false").lower() == "true"
+# "numpy" (exact, brute force) or "hnsw" (approximate, needs hnswlib installed)
+EMBEDDINGS_INDEX = os.getenv("EMBEDDINGS_INDEX", "numpy")
+EMBEDDINGS_TOP_K = int(os.getenv("EMBEDDINGS_TOP_K", "4"))
+# Cosine similarity below which a past turn is not considered relevant
+EMBEDDINGS_MIN_SCORE = float(os.getenv("EMBEDDINGS_MIN_SCORE", "0.35"))
+# Per-user indexes kept in memory per worker, and how long before one is reloaded
+EMBEDDINGS_CACHE_USERS = int(os.getenv("EMBEDDINGS_CACHE_USERS", "256"))
+EMBEDDINGS_CACHE_TTL = float(os.getenv("EMBEDDINGS_CACHE_TTL", "300"))
+# Recalled turns are trimmed to this many characters each to keep prompts small
+RECALL_MAX_CHARS = 400
+
+ollama_service = OllamaService()
+
+def _numpy():
+    # Imported on first use so the API's cold start does not pay for NumPy
+    import numpy
+    return numpy
+
+def to_bytes(vector) -> bytes:
+    return _numpy().asarray(vector, dtype="<f4").tobytes()
+
+def from_bytes(data: bytes):
+    return _numpy().frombuffer(data, dtype="<f4")
+
+def _normalize(matrix):
+    np = _numpy()
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+class NumpyIndex:
+    """Exact cosine search over a contiguous float32 matrix."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.ids: List[str] = []
+        self._matrix = _numpy().empty((0, dim), dtype="float32")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, ids: List[str], vectors) -> None:
+        np = _numpy()
+        # ids first: a concurrent search only sees rows that already have an id
+        self.ids.extend(ids)
+        self._matrix = np.vstack([self._matrix, _normalize(np.asarray(vectors, dtype="float32"))])
+
+    def search(self, query, k: int) -> List[Tuple[str, float]]:
+        np = _numpy()
+        if not self.ids:
+            return []
+        scores = self._matrix @ _normalize(np.asarray(query, dtype="float32"))
+        k = min(k, len(self.ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top]
+
+class HnswIndex:
+    """Approximate cosine search with hnswlib, for users with very long histories."""
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        import hnswlib
+
+        self.dim = dim
+        self.ids: List[str] = []
+        self._index = hnswlib.Index(space="cosine", dim=dim)
+        self._index.init_index(max_elements=capacity, ef_construction=200, M=16)
+        self._index.set_ef(64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, ids: List[str], vectors) -> None:
+        start = len(self.ids)
+        needed = start + len(ids)
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, self._index.get_max_elements() * 2))
+        self.ids.extend(ids)
+        self._index.add_items(_numpy().asarray(vectors, dtype="float32"), list(range(start, needed)))
+
+    def search(self, query, k: int) -> List[Tuple[str, float]]:
+        if not self.ids:
+            return []
+        labels, distances = self._index.knn_query(_numpy().asarray(query, dtype="float32"), k=min(k, len(self.ids)))
+        return [(self.ids[label], 1.0 - float(distance)) for label, distance in zip(labels[0], distances[0])]
+
+def new_index(dim: int):
+    if EMBEDDINGS_INDEX == "hnsw":
+        try:
+            return HnswIndex(dim)
+        except ImportError:
+            logger.warning("EMBEDDINGS_INDEX=hnsw but hnswlib is not installed; using exact search")
+    return NumpyIndex(dim)
+
+class UserIndexCache:
+    """
+    LRU of per-user vector indexes, loaded from message_embeddings on first use.
+
+    Vectors written by this worker are appended in place; entries are
+    reloaded after EMBEDDINGS_CACHE_TTL to pick up other workers' writes.
+    """
+
+    def __init__(self, max_users: int, ttl: float):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+        # Loads run in the threadpool while appends run on the event loop
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, user_id: str):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        rows = db.execute(
+            select(MessageEmbedding.message_id, MessageEmbedding.vector).where(
+                MessageEmbedding.user_id == user_id,
+                MessageEmbedding.model == ollama_service.embedding_model
+            )
+        ).all()
+        index = None
+        if rows:
+            vectors = _numpy().vstack([from_bytes(row.vector) for row in rows])
+            index = new_index(vectors.shape[1])
+            index.add([row.message_id for row in rows], vectors)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), index)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return index
+
+    def add(self, user_id: str, ids: List[str], vectors) -> None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            index = entry[1]
+            if index is None:
+                index = new_index(len(vectors[0]))
+                self._entries[user_id] = (entry[0], index)
+            index.add(ids, vectors)
+
+index_cache = UserIndexCache(EMBEDDINGS_CACHE_USERS, EMBEDDINGS_CACHE_TTL)
+
+@dataclass
+class PendingEmbedding:
+    message_id: str
+    session_id: str
+    user_id: str
+    content: str
+    # Already computed (e.g. the query embedding of a user message) or None
+    vector: Optional[List[float]] = None
+
+class EmbeddingWriter:
+    """
+    Embed new chat messages in the background.
+
+    Handlers queue messages after commit; a background task embeds up to
+    `batch_size` texts per Ollama call and inserts the vectors in one batch.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "32")),
+        flush_interval: float = float(os.getenv("EMBEDDING_FLUSH_INTERVAL", "1.0")),
+        max_pending: int = int(os.getenv("EMBEDDING_MAX_PENDING", "5000"))
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and embed whatever is still queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        while not self._queue.empty():
+            await self._process(self._drain(self.batch_size))
+
+    def submit(self, item: PendingEmbedding) -> None:
+        """Queue a message for embedding; dropped (and backfilled later) when the queue is full."""
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            logger.warning("Embedding queue full; dropping message %s", item.message_id)
+
+    def _drain(self, limit: int) -> List[PendingEmbedding]:
+        items = []
+        while len(items) < limit and not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        return items
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            try:
+                while len(items) < self.batch_size:
+                    items.extend(self._drain(self.batch_size - len(items)))
+                    remaining = deadline - loop.time()
+                    if len(items) >= self.batch_size or remaining <= 0:
+                        break
+                    try:
+                        items.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            finally:
+                await self._process(items)
+
+    async def _process(self, items: List[PendingEmbedding]) -> None:
+        if not items:
+            return
+        try:
+            await embed_and_store(items)
+        except Exception as e:
+            logger.error("Failed to embed %d messages: %s", len(items), e)
+
+async def embed_and_store(items: List[PendingEmbedding]) -> None:
+    missing = [item for item in items if item.vector is None]
+    if missing:
+        vectors = await ollama_service.embed([item.content for item in missing])
+        for item, vector in zip(missing, vectors):
+            item.vector = vector
+    await run_in_threadpool(_insert_embeddings, items)
+
+    by_user: Dict[str, List[PendingEmbedding]] = {}
+    for item in items:
+        by_user.setdefault(item.user_id, []).append(item)
+    for user_id, user_items in by_user.items():
+        index_cache.add(user_id, [item.message_id for item in user_items], [item.vector for item in user_items])
+
+def _insert_embeddings(items: List[PendingEmbedding]) -> None:
+    """
+    Store the vectors, skipping messages that already have one.
+
+    The live writer and a backfill can embed the same message; a duplicate
+    must not fail the rest of the batch.
+    """
+    rows = [
+        {
+            "message_id": item.message_id,
+            "session_id": item.session_id,
+            "user_id": item.user_id,
+            "model": ollama_service.embedding_model,
+            "dim": len(item.vector),
+            "vector": to_bytes(item.vector)
+        }
+        for item in items
+    ]
+    with SessionLocal() as db:
+        dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(db.get_bind().dialect.name)
+        if dialect_insert is not None:
+            db.execute(dialect_insert(MessageEmbedding).on_conflict_do_nothing(index_elements=["message_id"]), rows)
+        else:
+            existing = set(db.scalars(
+                select(MessageEmbedding.message_id).where(MessageEmbedding.message_id.in_([row["message_id"] for row in rows]))
+            ))
+            rows = [row for row in rows if row["message_id"] not in existing]
+            if rows:
+                db.execute(insert(MessageEmbedding), rows)
+        db.commit()
+
+embedding_writer = EmbeddingWriter()
+
+async def recall(
+    db: Session,
+    user_id: str,
+    text: str,
+    exclude_session_id: Optional[str] = None,
+    k: int = EMBEDDINGS_TOP_K
+) -> Tuple[List[ChatMessage], List[float]]:
+    """
+    Find the user's past turns most similar to `text`.
+
+    Returns:
+        Tuple[List[ChatMessage], List[float]]: Relevant messages from other
+        sessions in chronological order, and the embedding of `text` so the
+        caller can store it without embedding the message again
+    """
+    query = (await ollama_service.embed([text]))[0]
+    index = await run_in_threadpool(index_cache.get, db, user_id)
+    if index is None:
+        return [], query
+
+    # Over-fetch: hits from the current session are dropped below
+    hits = [(message_id, score) for message_id, score in index.search(query, k * 3) if score >= EMBEDDINGS_MIN_SCORE]
+    if not hits:
+        return [], query
+    messages = db.query(ChatMessage).filter(
+        ChatMessage.message_id.in_([message_id for message_id, _ in hits])
+    ).all()
+    if exclude_session_id:
+        messages = [m for m in messages if m.session_id != exclude_session_id]
+    rank = {message_id: position for position, (message_id, _) in enumerate(hits)}
+    messages = sorted(messages, key=lambda m: rank[m.message_id])[:k]
+    return sorted(messages, key=lambda m: m.timestamp), query
+
+def format_recalled(messages: List[ChatMessage]) -> str:
+    """Render recalled turns as a compact prompt section."""
+    lines = []
+    for message in messages:
+        content = message.content
+        if len(content) > RECALL_MAX_CHARS:
+            content = content[:RECALL_MAX_CHARS].rsplit(" ", 1)[0] + "…"
+        lines.append(f"- ({message.timestamp:%Y-%m-%d}) {message.role}: {content}")
+    return "\n".join(lines)
+
+async def backfill_embeddings(batch_size: int = 64, limit: Optional[int] = None) -> int:
+    """
+    Embed stored messages that have no embedding yet, oldest first.
+
+    Returns:
+        int: Number of messages embedded
+    """
+    embedded = 0
+    while limit is None or embedded < limit:
+        size = batch_size if limit is None else min(batch_size, limit - embedded)
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(ChatMessage.message_id, ChatMessage.session_id, ChatSession.user_id, ChatMessage.content)
+                .join(ChatSession, ChatSession.session_id == ChatMessage.session_id)
+                .outerjoin(MessageEmbedding, MessageEmbedding.message_id == ChatMessage.message_id)
+                .where(MessageEmbedding.message_id.is_(None), ChatSession.user_id.isnot(None))
+                .order_by(ChatMessage.timestamp)
+                .limit(size)
+            ).all()
+        if not rows:
+            break
+        await embed_and_store([
+            PendingEmbedding(message_id=row.message_id, session_id=row.session_id, user_id=row.user_id, content=row.content or "")
+            for row in rows
+        ])
+        embedded += len(rows)
+        logger.info("Embedded %d messages", embedded)
+    return embedded
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Embed stored chat messages for recall")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    configure_logging()
+    embedded = asyncio.run(backfill_embeddings(batch_size=args.batch_size, limit=args.limit))
+    logger.info("Backfill finished: %d messages embedded", embedded)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import Response
+from disconnect import cancel_on_disconnect
+from profiling import profiler
+from services.usage import current_usage, usage_scope, usage_meter
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+# How long a finished turn's response is kept for retries
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "600"))
+# Lifetime of the "in progress" marker, so a worker that died mid-turn does not block the key for good
+IDEMPOTENCY_PENDING_TTL = float(os.getenv("IDEMPOTENCY_PENDING_TTL", "300"))
+# How long a retry waits for a turn running in another worker before getting 409
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "120"))
+# Share keys across workers. Without it keys live in each worker's memory, so with more
+# than one worker a retry that lands on another worker runs the turn a second time
+IDEMPOTENCY_REDIS_URL = os.getenv("IDEMPOTENCY_REDIS_URL")
+# Budget for stored responses in the in-memory store (voice replies carry base64 audio)
+IDEMPOTENCY_MEMORY_BYTES = int(os.getenv("IDEMPOTENCY_MEMORY_BYTES", str(64 * 1024 * 1024)))
+
+POLL_INTERVAL = 0.25
+
+@dataclass
+class StoredResponse:
+    """A finished turn's response, as replayed to retries."""
+    status_code: int
+    body: str
+    media_type: str = "application/json"
+
+    @classmethod
+    def from_content(cls, content: Any, status_code: int = 200) -> "StoredResponse":
+        return cls(status_code, json.dumps(jsonable_encoder(content)))
+
+    def to_response(self, replayed: bool = False) -> Response:
+        headers = {REPLAYED_HEADER: "true"} if replayed else None
+        return Response(self.body, status_code=self.status_code, media_type=self.media_type, headers=headers)
+
+def request_key(request: Request) -> Optional[str]:
+    """
+    The request's Idempotency-Key, or None if it did not send one.
+
+    Raises:
+        HTTPException: 400 if the key is empty or longer than MAX_KEY_LENGTH
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+    return key
+
+def fingerprint(*parts: Any) -> str:
+    """Digest of the request parameters; a key reused for a different request is rejected."""
+    return hashlib.sha256(json.dumps(jsonable_encoder(parts), sort_keys=True).encode()).hexdigest()
+
+def _scoped_key(request: Request, key: str) -> str:
+    # Keys are chosen by clients, so scope them to the caller and the route
+    credential = request.headers.get("X-API-Key") or request.headers.get("Authorization") or ""
+    principal = hashlib.sha256(f"{credential}\n{request.headers.get('X-User-Email', '')}".encode()).hexdigest()
+    return f"{request.url.path}:{principal[:32]}:{key}"
+
+class MemoryIdempotencyStore:
+    """Per-process store; stored responses are evicted oldest first beyond `max_bytes`."""
+
+    def __init__(self, max_bytes: int = IDEMPOTENCY_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self._records: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+
+    def _size(self, record: Dict[str, Any]) -> int:
+        return len(record.get("body") or "")
+
+    def _pop(self, key: str) -> None:
+        entry = self._records.pop(key, None)
+        if entry is not None:
+            self._bytes -= self._size(entry[1])
+
+    def _put(self, key: str, record: Dict[str, Any], ttl: float) -> None:
+        self._pop(key)
+        self._records[key] = (time.monotonic() + ttl, record)
+        self._bytes += self._size(record)
+        while self._bytes > self.max_bytes and len(self._records) > 1:
+            self._pop(next(iter(self._records)))
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._records.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._pop(key)
+            return None
+        return entry[1]
+
+    async def claim(self, key: str, fingerprint: str, ttl: float) -> bool:
+        if await self.get(key) is not None:
+            return False
+        self._put(key, {"state": "pending", "fingerprint": fingerprint}, ttl)
+        return True
+
+    async def complete(self, key: str, record: Dict[str, Any], ttl: float) -> None:
+        self._put(key, record, ttl)
+
+    async def release(self, key: str) -> None:
+        self._pop(key)
+
+    async def close(self) -> None:
+        pass
+
+class RedisIdempotencyStore:
+    """Store shared by every process; records are JSON strings with a Redis TTL."""
+
+    PREFIX = "healmind:idempotency:"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = await self._client.get(self.PREFIX + key)
+        return json.loads(value) if value is not None else None
+
+    async def claim(self, key: str, fingerprint: str, ttl: float) -> bool:
+        record = json.dumps({"state": "pending", "fingerprint": fingerprint})
+        return bool(await self._client.set(self.PREFIX + key, record, nx=True, px=int(ttl * 1000)))
+
+    async def complete(self, key: str, record: Dict[str, Any], ttl: float) -> None:
+        await self._client.set(self.PREFIX + key, json.dumps(record), px=int(ttl * 1000))
+
+    async def release(self, key: str) -> None:
+        await self._client.delete(self.PREFIX + key)
+
+    async def close(self) -> None:
+        # redis-py 5.0.1 renamed close() to aclose()
+        close = getattr(self._client, "aclose", None) or self._client.close
+        await close()
+
+class IdempotentTurns:
+    """
+    Runs each keyed turn once and shares its outcome with every retry.
+
+    The turn runs in its own task: a client that disconnects stops waiting
+    but the turn still finishes and is stored, so its retry gets the reply
+    instead of a second generation. The task meters its own usage against
+    the caller's key, since it can outlive the request's usage scope.
+
+    A retry arriving while the turn runs waits for it; one arriving later
+    gets the stored response. Failures are not stored, so a retry after a
+    failure runs the turn again.
+    """
+
+    def __init__(self):
+        self._store = None
+        self._running: Dict[str, Tuple[str, asyncio.Task]] = {}
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = RedisIdempotencyStore(IDEMPOTENCY_REDIS_URL) if IDEMPOTENCY_REDIS_URL else MemoryIdempotencyStore()
+        return self._store
+
+    async def close(self) -> None:
+        if self._store is not None:
+            await self._store.close()
+            self._store = None
+
+    async def run(
+        self,
+        request: Request,
+        key: str,
+        request_fingerprint: str,
+        turn: Callable[[], Awaitable[StoredResponse]]
+    ) -> Response:
+        """
+        Answer a request carrying an Idempotency-Key.
+
+        Raises:
+            HTTPException: 422 if the key was used for a different request,
+            409 if the turn is still running elsewhere after IDEMPOTENCY_WAIT_TIMEOUT
+            ClientDisconnected: If the client went away; the turn keeps running
+        """
+        scoped = _scoped_key(request, key)
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            running = self._running.get(scoped)
+            if running is not None:
+                self._check_fingerprint(running[0], request_fingerprint)
+                return (await cancel_on_disconnect(request, asyncio.shield(running[1]))).to_response()
+
+            record = await self.store.get(scoped)
+            if record is not None:
+                self._check_fingerprint(record["fingerprint"], request_fingerprint)
+                if record["state"] == "done":
+                    return StoredResponse(record["status_code"], record["body"], record["media_type"]).to_response(replayed=True)
+            elif await self.store.claim(scoped, request_fingerprint, IDEMPOTENCY_PENDING_TTL):
+                usage = current_usage()
+                route = getattr(request.scope.get("route"), "path_format", request.url.path)
+                task = asyncio.create_task(self._run_turn(
+                    scoped, request_fingerprint, turn, usage.api_key_hash if usage else None, route
+                ))
+                task.add_done_callback(_retrieve_exception)
+                profiler.adopt(task)
+                self._running[scoped] = (request_fingerprint, task)
+                return (await cancel_on_disconnect(request, asyncio.shield(task))).to_response()
+
+            # Another worker is running the turn (or just claimed it)
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still being processed",
+                    headers={"Retry-After": "5"}
+                )
+            await cancel_on_disconnect(request, asyncio.sleep(POLL_INTERVAL))
+
+    def _check_fingerprint(self, stored: str, request_fingerprint: str) -> None:
+        if stored != request_fingerprint:
+            raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} was already used for a different request")
+
+    async def _run_turn(
+        self,
+        scoped: str,
+        request_fingerprint: str,
+        turn: Callable[[], Awaitable[StoredResponse]],
+        api_key_hash: Optional[str],
+        route: str
+    ) -> StoredResponse:
+        # The request's own scope is handed to the meter when its client hangs up,
+        # which can be long before the turn's tokens and audio are recorded
+        with usage_scope(api_key_hash, route) as usage:
+            try:
+                try:
+                    result = await turn()
+                except BaseException:
+                    await self.store.release(scoped)
+                    raise
+                record = {"state": "done", "fingerprint": request_fingerprint, **asdict(result)}
+                try:
+                    await self.store.complete(scoped, record, IDEMPOTENCY_TTL)
+                except Exception as e:
+                    # The reply was persisted; only a retry of it would run again
+                    logger.warning("Failed to store idempotent response: %s", e)
+                return result
+            finally:
+                self._running.pop(scoped, None)
+                # The request was already counted by UsageMiddleware
+                usage_meter.add(usage, requests=0)
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    # A turn whose client left has nobody awaiting it; the turn logs its own errors
+    if not task.cancelled():
+        task.exception()
+
+idempotent_turns = IdempotentTurns()
@@ -0,0 +1,339 @@
+import os
+import time
+import asyncio
+import logging
+import itertools
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models.job import Job
+from models.chat import ChatSession
+from database import SessionLocal
+from services import archive, summaries
+from services.usage import current_usage, usage_scope, usage_meter
+
+logger = logging.getLogger(__name__)
+
+# Run jobs inside the API workers; set false when a separate `cli.py worker` runs them
+JOB_RUNNER_ENABLED = os.getenv("JOB_RUNNER_ENABLED", "true").lower() == "true"
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+# How often the database is scanned for jobs queued elsewhere or due for retry
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "300"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "10"))
+# Optional shared queue; without it each process only runs the jobs it enqueued or polled
+JOBS_REDIS_URL = os.getenv("JOBS_REDIS_URL")
+# Seconds between scheduled archive runs (see services/archive.py); 0 turns the schedule off
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "86400"))
+
+DEFAULT_PRIORITY = 100
+# Scheduled maintenance yields to jobs users are waiting on
+MAINTENANCE_PRIORITY = 1000
+# Payload key carrying the enqueuing API key's hash, so the job's model usage is billed to it
+USAGE_KEY_FIELD = "_api_key_hash"
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+_handlers: Dict[str, JobHandler] = {}
+
+class UnknownJobKind(Exception):
+    """Raised when enqueuing a job kind without a registered handler"""
+    pass
+
+def job_handler(kind: str):
+    """Register an async function as the handler for one job kind."""
+    def register(handler: JobHandler) -> JobHandler:
+        _handlers[kind] = handler
+        return handler
+    return register
+
+def job_kinds() -> List[str]:
+    return sorted(_handlers)
+
+class LocalJobQueue:
+    """In-process priority queue of job ids."""
+
+    def __init__(self):
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._queued = set()
+        self._sequence = itertools.count()
+
+    async def push(self, job_id: str, priority: int) -> None:
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        if job_id in self._queued:
+            return
+        self._queued.add(job_id)
+        self._queue.put_nowait((priority, next(self._sequence), job_id))
+
+    async def pop(self) -> str:
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        _, _, job_id = await self._queue.get()
+        self._queued.discard(job_id)
+        return job_id
+
+    async def close(self) -> None:
+        pass
+
+class RedisJobQueue:
+    """Priority queue shared by every process, as a Redis sorted set."""
+
+    KEY = "healmind:jobs"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+
+    async def push(self, job_id: str, priority: int) -> None:
+        # Priority first, then FIFO; NX keeps the original position of a re-pushed id
+        await self._client.zadd(self.KEY, {job_id: priority * 1e10 + time.time()}, nx=True)
+
+    async def pop(self) -> str:
+        while True:
+            item = await self._client.bzpopmin(self.KEY, timeout=5)
+            if item is not None:
+                _, job_id, _ = item
+                return job_id.decode() if isinstance(job_id, bytes) else job_id
+
+    async def close(self) -> None:
+        # redis-py 5.0.1 renamed close() to aclose()
+        close = getattr(self._client, "aclose", None) or self._client.close
+        await close()
+
+def _claim(job_id: str) -> Optional[Tuple[str, Dict[str, Any], int, int]]:
+    """Atomically move a due job from queued to running; None if someone else got it."""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        result = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "queued", Job.run_after <= now)
+            .values(status="running", attempts=Job.attempts + 1, started_at=now)
+        )
+        db.commit()
+        if result.rowcount != 1:
+            return None
+        job = db.get(Job, job_id)
+        return job.kind, job.payload or {}, job.attempts, job.max_attempts
+
+def _finish(job_id: str, result: Optional[Dict[str, Any]]) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            update(Job).where(Job.id == job_id)
+            .values(status="succeeded", result=result, error=None, finished_at=datetime.utcnow())
+        )
+        db.commit()
+
+def _fail(job_id: str, error: str, retry_at: Optional[datetime]) -> None:
+    if retry_at is not None:
+        values = {"status": "queued", "error": error, "run_after": retry_at}
+    else:
+        values = {"status": "failed", "error": error, "finished_at": datetime.utcnow()}
+    with SessionLocal() as db:
+        db.execute(update(Job).where(Job.id == job_id).values(**values))
+        db.commit()
+
+def _release(job_id: str) -> None:
+    """Hand back a job interrupted by shutdown without counting the attempt."""
+    with SessionLocal() as db:
+        db.execute(
+            update(Job).where(Job.id == job_id, Job.status == "running")
+            .values(status="queued", attempts=Job.attempts - 1, started_at=None)
+        )
+        db.commit()
+
+def _due_jobs(limit: int) -> List[Tuple[str, int]]:
+    """Queued jobs that are due, after re-queuing jobs whose worker died mid-run."""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.execute(
+            update(Job)
+            .where(Job.status == "running", Job.started_at < now - timedelta(seconds=JOB_TIMEOUT * 2))
+            .values(status="queued", error="Worker stopped while running the job")
+        )
+        db.commit()
+        rows = db.execute(
+            select(Job.id, Job.priority)
+            .where(Job.status == "queued", Job.run_after <= now)
+            .order_by(Job.priority, Job.created_at)
+            .limit(limit)
+        ).all()
+    return [(row.id, row.priority) for row in rows]
+
+def _schedule_periodic(kind: str, interval: float) -> None:
+    """
+    Queue one `kind` job per `interval` seconds across every process.
+
+    The job id is derived from the interval slot, so when several runners
+    schedule the same slot the primary key lets only the first insert through.
+    """
+    slot = int(time.time() // interval)
+    job_id = f"{kind}:{slot}"
+    with SessionLocal() as db:
+        if db.get(Job, job_id) is not None:
+            return
+        # One attempt: a retry could overlap a run that outlived its timeout in the threadpool
+        db.add(Job(id=job_id, kind=kind, payload={}, priority=MAINTENANCE_PRIORITY, max_attempts=1))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+
+class JobRunner:
+    """
+    Run persisted jobs on a pool of asyncio workers.
+
+    The jobs table is the source of truth; the queue (in-process, or Redis
+    when JOBS_REDIS_URL is set) only carries ids. A job is claimed with a
+    conditional UPDATE, so ids delivered twice or to several processes run once.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = JOB_CONCURRENCY,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        timeout: float = JOB_TIMEOUT
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._queue = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def queue(self):
+        if self._queue is None:
+            self._queue = RedisJobQueue(JOBS_REDIS_URL) if JOBS_REDIS_URL else LocalJobQueue()
+        return self._queue
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._poll()))
+
+    async def stop(self) -> None:
+        """Cancel the workers; interrupted jobs go back to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._queue is not None:
+            await self._queue.close()
+            self._queue = None
+
+    async def notify(self, job_id: str, priority: int) -> None:
+        """Push a freshly enqueued job; otherwise the poller finds it."""
+        if self.running or JOBS_REDIS_URL:
+            await self.queue.push(job_id, priority)
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                if ARCHIVE_INTERVAL > 0:
+                    await run_in_threadpool(_schedule_periodic, "archive_cold_sessions", ARCHIVE_INTERVAL)
+                for job_id, priority in await run_in_threadpool(_due_jobs, 100):
+                    await self.queue.push(job_id, priority)
+            except Exception as e:
+                logger.error("Failed to poll for jobs: %s", e)
+            await asyncio.sleep(self.poll_interval)
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self.queue.pop()
+            try:
+                claimed = await run_in_threadpool(_claim, job_id)
+            except Exception as e:
+                logger.error("Failed to claim job %s: %s", job_id, e)
+                continue
+            if claimed is not None:
+                await self._execute(job_id, *claimed)
+
+    async def _execute(self, job_id: str, kind: str, payload: Dict[str, Any], attempts: int, max_attempts: int) -> None:
+        handler = _handlers.get(kind)
+        started = time.perf_counter()
+        api_key_hash = payload.pop(USAGE_KEY_FIELD, None)
+        try:
+            if handler is None:
+                raise UnknownJobKind(f"No handler for job kind {kind!r}")
+            with usage_scope(api_key_hash, f"job:{kind}") as usage:
+                try:
+                    result = await asyncio.wait_for(handler(payload), self.timeout)
+                finally:
+                    usage_meter.add(usage)
+        except asyncio.CancelledError:
+            await run_in_threadpool(_release, job_id)
+            raise
+        except Exception as e:
+            logger.warning("Job %s (%s) attempt %d/%d failed: %s", job_id, kind, attempts, max_attempts, e)
+            retry_at = None
+            if attempts < max_attempts and not isinstance(e, UnknownJobKind):
+                # Exponential backoff: JOB_RETRY_DELAY, then 2x, 4x, ...
+                retry_at = datetime.utcnow() + timedelta(seconds=JOB_RETRY_DELAY * 2 ** (attempts - 1))
+            await run_in_threadpool(_fail, job_id, str(e) or type(e).__name__, retry_at)
+        else:
+            await run_in_threadpool(_finish, job_id, result)
+            logger.info("Job %s (%s) finished in %.2fs", job_id, kind, time.perf_counter() - started)
+
+job_runner = JobRunner()
+
+async def enqueue(
+    db: Session,
+    kind: str,
+    payload: Optional[Dict[str, Any]] = None,
+    priority: int = DEFAULT_PRIORITY,
+    max_attempts: int = 3
+) -> Job:
+    """
+    Persist a job and hand it to the queue.
+
+    Raises:
+        UnknownJobKind: If no handler is registered for `kind`
+    """
+    if kind not in _handlers:
+        raise UnknownJobKind(f"No handler for job kind {kind!r}")
+    payload = dict(payload or {})
+    usage = current_usage()
+    if usage is not None and usage.api_key_hash:
+        payload[USAGE_KEY_FIELD] = usage.api_key_hash
+    job = Job(kind=kind, payload=payload, priority=priority, max_attempts=max_attempts)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    await job_runner.notify(job.id, job.priority)
+    return job
+
+def _load_for_summary(db: Session, session_id: str) -> Tuple[ChatSession, Optional[str]]:
+    """The session and its cached summary; without one, archived messages are restored first."""
+    session = db.get(ChatSession, session_id)
+    if session is None:
+        raise ValueError(f"Session {session_id} not found")
+    summary = summaries.cached_summary(session)
+    if summary is None and session.archived_at is not None:
+        archive.rehydrate_session(db, session)
+    return session, summary
+
+@job_handler("copilot_summary")
+async def copilot_summary_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate and store the copilot summary of one session."""
+    with SessionLocal() as db:
+        session, summary = await run_in_threadpool(_load_for_summary, db, payload["session_id"])
+        if summary is None:
+            summary = await summaries.summarize_session(db, session)
+    return {"session_id": payload["session_id"], "summary": summary}
+
+@job_handler("archive_cold_sessions")
+async def archive_cold_sessions_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Archive sessions idle past the retention window, as `cli.py archive` does."""
+    def run() -> int:
+        with SessionLocal() as db:
+            archive.ensure_message_partitions(db)
+            return archive.archive_cold_sessions(db, limit=payload.get("limit"))
+    return {"archived": await run_in_threadpool(run)}
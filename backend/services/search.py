@@ -0,0 +1,201 @@
+import re
+import html
+import logging
+from collections import namedtuple
+from typing import List, Union
+from sqlalchemy import text, inspect, select, DateTime
+from sqlalchemy.engine import Engine, Row
+from sqlalchemy.orm import Session
+from models.chat import ChatMessage, ChatSession
+
+logger = logging.getLogger(__name__)
+
+# Text search configuration used for the PostgreSQL tsvector column
+SEARCH_LANGUAGE = "english"
+SNIPPET_WORDS = 16
+
+# Match markers written by ts_headline()/snippet(); replaced by <mark> after escaping
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+
+POSTGRES_SCHEMA = [
+    f"""
+    ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS content_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('{SEARCH_LANGUAGE}', coalesce(content, ''))) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_chat_messages_content_tsv ON chat_messages USING gin (content_tsv)",
+]
+
+# FTS5 index over chat_messages (rowid-aligned), kept in sync by triggers. Each
+# row also carries an `owner` token for its session's user, so the user filter
+# is applied inside the index instead of after matching every user's messages.
+SQLITE_OWNER_TOKEN = "'u' || hex(user_id)"
+SQLITE_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS chat_messages_fts USING fts5(
+        content, owner, tokenize='porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS chat_messages_fts_insert AFTER INSERT ON chat_messages BEGIN
+        INSERT INTO chat_messages_fts (rowid, content, owner) VALUES (
+            new.rowid, new.content,
+            (SELECT {SQLITE_OWNER_TOKEN} FROM chat_sessions WHERE session_id = new.session_id)
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_messages_fts_delete AFTER DELETE ON chat_messages BEGIN
+        DELETE FROM chat_messages_fts WHERE rowid = old.rowid;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_messages_fts_update AFTER UPDATE OF content ON chat_messages BEGIN
+        UPDATE chat_messages_fts SET content = new.content WHERE rowid = old.rowid;
+    END
+    """,
+]
+SQLITE_POPULATE = f"""
+    INSERT INTO chat_messages_fts (rowid, content, owner)
+    SELECT m.rowid, m.content, (SELECT {SQLITE_OWNER_TOKEN} FROM chat_sessions s WHERE s.session_id = m.session_id)
+      FROM chat_messages m
+"""
+
+# Rank on the GIN index first and build headlines only for the returned page
+POSTGRES_SEARCH = f"""
+    WITH query AS (
+        SELECT websearch_to_tsquery('{SEARCH_LANGUAGE}', :query) AS tsq
+    ), hits AS (
+        SELECT m.message_id, m.session_id, m.role, m.content, m."timestamp",
+               ts_rank_cd(m.content_tsv, query.tsq) AS score
+          FROM chat_messages m, query
+         WHERE m.content_tsv @@ query.tsq
+           AND m.session_id IN (SELECT session_id FROM chat_sessions WHERE user_id = :user_id)
+         ORDER BY score DESC, m."timestamp" DESC, m.message_id
+         LIMIT :limit OFFSET :offset
+    )
+    SELECT hits.message_id, hits.session_id, hits.role, hits."timestamp", hits.score,
+           ts_headline('{SEARCH_LANGUAGE}', hits.content, query.tsq,
+                       'StartSel=' || chr(2) || ', StopSel=' || chr(3) || ', MaxWords={SNIPPET_WORDS}, MinWords=5, MaxFragments=2') AS snippet
+      FROM hits, query
+     ORDER BY hits.score DESC, hits."timestamp" DESC, hits.message_id
+"""
+
+# bm25() is lower-is-better, so it is negated into a higher-is-better score;
+# the owner column gets no weight
+SQLITE_SEARCH = f"""
+    SELECT m.message_id, m.session_id, m.role, m."timestamp",
+           -bm25(chat_messages_fts, 1.0, 0.0) AS score,
+           snippet(chat_messages_fts, 0, char(2), char(3), '…', {SNIPPET_WORDS}) AS snippet
+      FROM chat_messages_fts
+      JOIN chat_messages m ON m.rowid = chat_messages_fts.rowid
+     WHERE chat_messages_fts MATCH :query
+     ORDER BY bm25(chat_messages_fts, 1.0, 0.0), m."timestamp" DESC, m.message_id
+     LIMIT :limit OFFSET :offset
+"""
+
+def ensure_search_schema(engine: Engine) -> None:
+    """
+    Create the full-text index for chat_messages if it is missing.
+
+    PostgreSQL gets a generated tsvector column with a GIN index; SQLite gets
+    an FTS5 table fed by triggers, populated from existing rows on creation.
+    """
+    dialect = engine.dialect.name
+    with engine.begin() as connection:
+        if dialect == "postgresql":
+            for statement in POSTGRES_SCHEMA:
+                connection.execute(text(statement))
+        elif dialect == "sqlite":
+            created = not inspect(connection).has_table("chat_messages_fts")
+            for statement in SQLITE_SCHEMA:
+                connection.execute(text(statement))
+            if created:
+                connection.execute(text(SQLITE_POPULATE))
+        else:
+            logger.warning("Full-text search is not supported on %s; search falls back to an unindexed scan", dialect)
+
+def _fts5_query(query: str) -> str:
+    """
+    Quote every term so user input cannot use (or break) FTS5 query syntax.
+
+    Terms are ANDed; a bare OR between two terms is kept, as in
+    websearch_to_tsquery() on PostgreSQL.
+    """
+    parts = []
+    for term in re.findall(r"\w+", query):
+        if term == "OR":
+            if parts and parts[-1] != "OR":
+                parts.append("OR")
+        else:
+            parts.append(f'"{term}"')
+    if parts and parts[-1] == "OR":
+        parts.pop()
+    return " ".join(parts)
+
+# Result of the unindexed scan, shaped like the rows of the full-text queries
+ScanHit = namedtuple("ScanHit", "message_id session_id role timestamp score snippet")
+
+def _scan_snippet(content: str, terms: List[str]) -> str:
+    """Up to SNIPPET_WORDS words around the first match, matching words marked."""
+    def matches(word: str) -> bool:
+        return any(term in word.lower() for term in terms)
+
+    words = (content or "").split()
+    first = next((i for i, word in enumerate(words) if matches(word)), 0)
+    start = max(0, first - SNIPPET_WORDS // 2)
+    window = [f"{_MARK_START}{word}{_MARK_END}" if matches(word) else word for word in words[start:start + SNIPPET_WORDS]]
+    return ("…" if start else "") + " ".join(window) + ("…" if start + SNIPPET_WORDS < len(words) else "")
+
+def _scan_messages(db: Session, user_id: str, query: str, limit: int, offset: int) -> List[ScanHit]:
+    """
+    Fallback for databases without a full-text index: every term must occur
+    (case-insensitively) in the message. Unranked, newest first.
+    """
+    terms = [term.lower() for term in re.findall(r"\w+", query) if term != "OR"]
+    if not terms:
+        return []
+    rows = db.execute(
+        select(ChatMessage.message_id, ChatMessage.session_id, ChatMessage.role, ChatMessage.timestamp, ChatMessage.content)
+        .join(ChatSession, ChatSession.session_id == ChatMessage.session_id)
+        .where(
+            ChatSession.user_id == user_id,
+            *(ChatMessage.content.ilike(f"%{term.replace('_', '/_')}%", escape="/") for term in terms)
+        )
+        .order_by(ChatMessage.timestamp.desc(), ChatMessage.message_id)
+        .limit(limit)
+        .offset(offset)
+    ).all()
+    return [
+        ScanHit(row.message_id, row.session_id, row.role, row.timestamp, 0.0, _scan_snippet(row.content, terms))
+        for row in rows
+    ]
+
+def highlight(snippet: str) -> str:
+    """HTML-escape a snippet and turn the match markers into <mark> tags."""
+    return html.escape(snippet or "").replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+def search_messages(db: Session, user_id: str, query: str, limit: int, offset: int = 0) -> List[Union[Row, ScanHit]]:
+    """
+    Rank the messages of a user's hot (non-archived) sessions against `query`.
+
+    Databases other than PostgreSQL and SQLite get an unranked substring scan.
+
+    Returns:
+        List[Row]: message_id, session_id, role, timestamp, score and snippet,
+        best match first
+    """
+    dialect = db.get_bind().dialect.name
+    params = {"user_id": user_id, "limit": limit, "offset": offset}
+    if dialect == "postgresql":
+        return db.execute(text(POSTGRES_SEARCH).columns(timestamp=DateTime), {**params, "query": query}).all()
+    if dialect == "sqlite":
+        fts_query = _fts5_query(query)
+        if not fts_query:
+            return []
+        owner = "u" + user_id.encode("utf-8").hex()
+        return db.execute(
+            text(SQLITE_SEARCH).columns(timestamp=DateTime),
+            {**params, "query": f"owner:{owner} AND content:({fts_query})"}
+        ).all()
+    return _scan_messages(db, user_id, query, limit, offset)
@@ -0,0 +1,106 @@
+import os
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
+from models.status import StatusCheck
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+class StatusIngestOverloaded(Exception):
+    """Raised when the pending heartbeat queue is full"""
+    pass
+
+class StatusCheckWriter:
+    """
+    Buffer status-check heartbeats and insert them in batches.
+
+    Request handlers only enqueue a row; a background task writes up to
+    `batch_size` rows per INSERT, at least every `flush_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = int(os.getenv("STATUS_BATCH_SIZE", "500")),
+        flush_interval: float = float(os.getenv("STATUS_FLUSH_INTERVAL", "0.5")),
+        max_pending: int = int(os.getenv("STATUS_MAX_PENDING", "10000"))
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and write whatever is still queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        while not self._queue.empty():
+            await self._write(self._drain(self.batch_size))
+
+    def submit(self, row: Dict) -> None:
+        """
+        Queue one heartbeat row for insertion.
+
+        Raises:
+            StatusIngestOverloaded: If more than `max_pending` rows are waiting
+        """
+        if self._queue is None:
+            raise RuntimeError("StatusCheckWriter has not been started")
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            raise StatusIngestOverloaded("Too many pending status checks")
+
+    def _drain(self, limit: int) -> List[Dict]:
+        rows = []
+        while len(rows) < limit and not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        return rows
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            rows = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            try:
+                while len(rows) < self.batch_size:
+                    rows.extend(self._drain(self.batch_size - len(rows)))
+                    remaining = deadline - loop.time()
+                    if len(rows) >= self.batch_size or remaining <= 0:
+                        break
+                    try:
+                        rows.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            finally:
+                # Also runs when stop() cancels us mid-batch, so collected rows are not lost
+                await self._write(rows)
+
+    async def _write(self, rows: List[Dict]) -> None:
+        if not rows:
+            return
+        try:
+            await run_in_threadpool(_insert_rows, rows)
+        except Exception as e:
+            logger.error("Failed to write %d status checks: %s", len(rows), e)
+
+def _insert_rows(rows: List[Dict]) -> None:
+    with SessionLocal() as db:
+        db.execute(insert(StatusCheck), rows)
+        db.commit()
+
+status_writer = StatusCheckWriter()
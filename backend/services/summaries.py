@@ -0,0 +1,77 @@
+import logging
+from typing import Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from external_integrations.ollama_service import OllamaService
+from models.chat import ChatSession, ChatMessage
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+ollama_service = OllamaService()
+
+def cached_summary(session: ChatSession) -> Optional[str]:
+    """The stored copilot summary, if no message was written since it was generated."""
+    metadata = session.session_metadata or {}
+    if metadata.get("summary") and metadata.get("summary_until") == _watermark(session):
+        return metadata["summary"]
+    return None
+
+def _watermark(session: ChatSession) -> Optional[str]:
+    return session.last_message_at.isoformat() if session.last_message_at else None
+
+def _load_transcript(db: Session, session: ChatSession) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Read everything the summary prompt needs, then release the connection.
+
+    Returns:
+        Tuple[str, Optional[str], Optional[str]]: The session id, its
+        transcript (None without messages) and the watermark it covers
+    """
+    session_id, watermark = session.session_id, _watermark(session)
+    messages = db.query(ChatMessage).filter(
+        ChatMessage.session_id == session_id
+    ).order_by(ChatMessage.timestamp).all()
+    chat_text = "\n".join([f"{m.role}: {m.content}" for m in messages]) if messages else None
+    db.commit()
+    return session_id, chat_text, watermark
+
+def _store_summary(session_id: str, summary: str, watermark: Optional[str]) -> None:
+    """
+    Write the summary keys on the primary, merged into the row's current
+    session_metadata so keys changed meanwhile by other requests are kept.
+    """
+    with SessionLocal() as db:
+        session = db.query(ChatSession).filter(ChatSession.session_id == session_id).with_for_update().first()
+        if session is None:
+            return
+        # JSON columns are not mutation-tracked; assign a new dict
+        session.session_metadata = {
+            **(session.session_metadata or {}),
+            "summary": summary,
+            "summary_until": watermark
+        }
+        db.commit()
+
+async def summarize_session(db: Session, session: ChatSession) -> Optional[str]:
+    """
+    Generate the copilot summary and insights for a session and store them in
+    session_metadata, so later reads can reuse them until the next message.
+
+    `db` may be a replica session; the summary is always written to the primary.
+
+    Returns:
+        Optional[str]: The summary, or None if the session has no messages
+    """
+    session_id, chat_text, watermark = await run_in_threadpool(_load_transcript, db, session)
+    if chat_text is None:
+        return None
+    prompt = (
+        "You are an expert wellness copilot. Summarize this wellness session in 2-3 sentences and provide 2 actionable insights for the user's personal growth and stress management.\n"
+        f"Session transcript:\n{chat_text}\n"
+        "Summary and insights:"
+    )
+    ai_response = await ollama_service.generate_response(prompt)
+
+    await run_in_threadpool(_store_summary, session_id, ai_response.response, watermark)
+    return ai_response.response
@@ -0,0 +1,209 @@
+import os
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, insert, update, select
+from sqlalchemy.dialects import postgresql, sqlite
+from models.usage import ApiUsage
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+USAGE_FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", "10"))
+# Per API key and UTC day; 0 disables. Enforced against totals that lag by up to
+# one flush interval across workers, so they are soft limits.
+USAGE_DAILY_TOKEN_QUOTA = int(os.getenv("USAGE_DAILY_TOKEN_QUOTA", "0"))
+USAGE_DAILY_AUDIO_SECONDS_QUOTA = float(os.getenv("USAGE_DAILY_AUDIO_SECONDS_QUOTA", "0"))
+
+COUNTERS = ("requests", "prompt_tokens", "completion_tokens", "stt_seconds", "tts_seconds")
+
+UsageKey = Tuple[str, str, datetime]
+
+@dataclass
+class RequestUsage:
+    """Usage of the request being handled, filled in as the work happens."""
+    api_key_hash: Optional[str] = None
+    route: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    stt_seconds: float = 0.0
+    tts_seconds: float = 0.0
+
+# Set per request by UsageMiddleware (and per job by the job runner); shared by
+# reference, so threadpool dependencies and child tasks add to the same object
+_current_usage: ContextVar[Optional[RequestUsage]] = ContextVar("current_usage", default=None)
+
+def current_usage() -> Optional[RequestUsage]:
+    return _current_usage.get()
+
+@contextmanager
+def usage_scope(api_key_hash: Optional[str] = None, route: Optional[str] = None) -> Iterator[RequestUsage]:
+    """Collect usage recorded inside the block; the caller hands it to usage_meter."""
+    usage = RequestUsage(api_key_hash=api_key_hash, route=route)
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+def record_tokens(prompt_tokens: Optional[int], completion_tokens: Optional[int] = None) -> None:
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.prompt_tokens += prompt_tokens or 0
+        usage.completion_tokens += completion_tokens or 0
+
+def record_audio(stt_seconds: Optional[float] = None, tts_seconds: Optional[float] = None) -> None:
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.stt_seconds += stt_seconds or 0.0
+        usage.tts_seconds += tts_seconds or 0.0
+
+class UsageQuotaExceeded(Exception):
+    """Raised when an API key has used up its daily token or audio quota"""
+    pass
+
+def _hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def _today() -> datetime:
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+class UsageMeter:
+    """
+    Per-key, per-route usage counters kept in memory and added to api_usage
+    in one batch every `flush_interval` seconds.
+
+    Requests only bump counters. After each flush the day's totals per key
+    are re-read, so quota checks never query the database.
+    """
+
+    def __init__(self, flush_interval: float = USAGE_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._pending: Dict[UsageKey, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        # Written on the event loop, swapped out by flush()
+        self._lock = threading.Lock()
+        self._day = _today()
+        self._daily_totals: Dict[str, Tuple[int, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write what is still pending."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self.flush()
+
+    def add(self, usage: RequestUsage, requests: int = 1) -> None:
+        """Add a finished scope's usage; `requests=0` for work metered apart from its request."""
+        if not usage.api_key_hash or not usage.route:
+            return
+        key = (usage.api_key_hash, usage.route, _hour(datetime.utcnow()))
+        with self._lock:
+            counters = self._pending[key]
+            counters["requests"] += requests
+            counters["prompt_tokens"] += usage.prompt_tokens
+            counters["completion_tokens"] += usage.completion_tokens
+            counters["stt_seconds"] += usage.stt_seconds
+            counters["tts_seconds"] += usage.tts_seconds
+
+    def usage_today(self, api_key_hash: str) -> Tuple[int, float]:
+        """Tokens and audio seconds used today: flushed totals plus this worker's pending counters."""
+        today = _today()
+        tokens, audio = self._daily_totals.get(api_key_hash, (0, 0.0)) if self._day == today else (0, 0.0)
+        with self._lock:
+            for (key_hash, _, period_start), counters in self._pending.items():
+                if key_hash == api_key_hash and period_start >= today:
+                    tokens += counters["prompt_tokens"] + counters["completion_tokens"]
+                    audio += counters["stt_seconds"] + counters["tts_seconds"]
+        return int(tokens), audio
+
+    def check_quota(self, api_key_hash: str) -> None:
+        """
+        Raises:
+            UsageQuotaExceeded: If the key is over its daily token or audio quota
+        """
+        if not USAGE_DAILY_TOKEN_QUOTA and not USAGE_DAILY_AUDIO_SECONDS_QUOTA:
+            return
+        tokens, audio = self.usage_today(api_key_hash)
+        if USAGE_DAILY_TOKEN_QUOTA and tokens >= USAGE_DAILY_TOKEN_QUOTA:
+            raise UsageQuotaExceeded(f"Daily token quota of {USAGE_DAILY_TOKEN_QUOTA} used up")
+        if USAGE_DAILY_AUDIO_SECONDS_QUOTA and audio >= USAGE_DAILY_AUDIO_SECONDS_QUOTA:
+            raise UsageQuotaExceeded(f"Daily audio quota of {USAGE_DAILY_AUDIO_SECONDS_QUOTA:.0f}s used up")
+
+    async def flush(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        if batch:
+            try:
+                await run_in_threadpool(_write_usage, batch)
+            except Exception as e:
+                logger.error("Failed to write usage for %d keys: %s", len(batch), e)
+                # Keep the counts for the next flush rather than losing them
+                with self._lock:
+                    for key, counters in batch.items():
+                        pending = self._pending[key]
+                        for name in COUNTERS:
+                            pending[name] += counters[name]
+                return
+        try:
+            day = _today()
+            self._daily_totals = await run_in_threadpool(_daily_totals, day)
+            self._day = day
+        except Exception as e:
+            logger.warning("Failed to refresh daily usage totals: %s", e)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+def _write_usage(batch: Dict[UsageKey, Dict[str, float]]) -> None:
+    table = ApiUsage.__table__
+    with SessionLocal() as db:
+        connection = db.connection()
+        dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(connection.dialect.name)
+        for (api_key_hash, route, period_start), counters in batch.items():
+            key = {"api_key_hash": api_key_hash, "route": route, "period_start": period_start}
+            if dialect_insert is not None:
+                stmt = dialect_insert(table).values(**key, **counters)
+                connection.execute(stmt.on_conflict_do_update(
+                    index_elements=list(key),
+                    set_={name: table.c[name] + stmt.excluded[name] for name in COUNTERS}
+                ))
+                continue
+            result = connection.execute(
+                update(table)
+                .where(*(table.c[name] == value for name, value in key.items()))
+                .values({name: table.c[name] + value for name, value in counters.items()})
+            )
+            if result.rowcount == 0:
+                connection.execute(insert(table).values(**key, **counters))
+        db.commit()
+
+def _daily_totals(day: datetime) -> Dict[str, Tuple[int, float]]:
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(
+                ApiUsage.api_key_hash,
+                func.sum(ApiUsage.prompt_tokens + ApiUsage.completion_tokens),
+                func.sum(ApiUsage.stt_seconds + ApiUsage.tts_seconds)
+            )
+            .where(ApiUsage.period_start >= day, ApiUsage.period_start < day + timedelta(days=1))
+            .group_by(ApiUsage.api_key_hash)
+        ).all()
+    return {key_hash: (int(tokens or 0), float(audio or 0.0)) for key_hash, tokens, audio in rows}
+
+usage_meter = UsageMeter()
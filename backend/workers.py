@@ -0,0 +1,38 @@
+import os
+import sys
+from gunicorn.arbiter import Arbiter
+from uvicorn.main import Server
+from uvicorn.workers import UvicornWorker
+
+# Keep in step with drain.DRAIN_TIMEOUT; read here so the gunicorn master does not import the app
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "60"))
+# Extra time for requests other than generations before uvicorn cancels them
+DRAIN_REQUEST_GRACE = 5
+
+class DrainingServer(Server):
+    """Uvicorn server that starts draining in-flight generations as soon as it is asked to exit."""
+
+    def handle_exit(self, sig, frame) -> None:
+        from drain import in_flight
+
+        in_flight.begin()
+        super().handle_exit(sig, frame)
+
+class DrainingUvicornWorker(UvicornWorker):
+    """
+    Gunicorn worker for graceful deploys.
+
+    On SIGTERM the worker closes its listening socket, refuses new
+    generations and lets running ones finish for up to DRAIN_TIMEOUT seconds,
+    then runs the app's shutdown handlers, which flush buffered writes.
+    """
+
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "timeout_graceful_shutdown": DRAIN_TIMEOUT + DRAIN_REQUEST_GRACE}
+
+    async def _serve(self) -> None:
+        self.config.app = self.wsgi
+        server = DrainingServer(config=self.config)
+        self._install_sigquit_handler()
+        await server.serve(sockets=self.sockets)
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
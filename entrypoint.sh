@@ -4,26 +4,71 @@ set -e
 # Start the FastAPI backend
 cd /backend || { echo "Backend directory not found"; exit 1; }
 
-echo "Starting FastAPI backend"
-# Start Uvicorn with proper host binding
-uvicorn server:app --host 0.0.0.0 --port 8001 &
-BACKEND_PID=$!
+# Workers share metrics through files in this directory
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+export WEB_CONCURRENCY=${WEB_CONCURRENCY:-$(nproc)}
+READY_TIMEOUT=${READY_TIMEOUT:-120}
 
-echo "Waiting for backend to start..."
-sleep 30
+# On SIGTERM drain instead of killing: Nginx stops accepting connections and
+# finishes the requests it is proxying, Gunicorn's workers let in-flight
+# generations complete (DRAIN_TIMEOUT) and flush their writes. Give the
+# container a stop timeout longer than GRACEFUL_TIMEOUT. Installed before
+# anything starts, so a stop during startup is forwarded too.
+BACKEND_PID=
+NGINX_PID=
+drain() {
+    echo "Draining backend and nginx..."
+    if [ -n "$BACKEND_PID" ]; then
+        kill -TERM $BACKEND_PID 2>/dev/null || true
+    fi
+    if [ -n "$NGINX_PID" ]; then
+        nginx -s quit 2>/dev/null || kill -QUIT $NGINX_PID 2>/dev/null || true
+    fi
+    if [ -n "$BACKEND_PID" ]; then
+        wait $BACKEND_PID || true
+    fi
+    if [ -n "$NGINX_PID" ]; then
+        wait $NGINX_PID || true
+    fi
+    echo "Drained"
+    exit 0
+}
+trap drain TERM INT
 
-if ! kill -0 $BACKEND_PID 2>/dev/null; then
-    echo "Backend failed to start at initialization, exiting"
-    exit 1
+# Apply migrations once, before any worker starts serving against the schema
+if [ "${RUN_MIGRATIONS:-true}" = "true" ]; then
+    echo "Applying database migrations"
+    alembic upgrade head
 fi
 
+echo "Starting FastAPI backend with $WEB_CONCURRENCY workers"
+gunicorn server:app -c gunicorn.conf.py &
+BACKEND_PID=$!
+
+echo "Waiting for backend to become ready..."
+waited=0
+until wget -q -O /dev/null http://127.0.0.1:8001/api/readyz 2>/dev/null; do
+    if ! kill -0 $BACKEND_PID 2>/dev/null; then
+        echo "Backend failed to start at initialization, exiting"
+        exit 1
+    fi
+    if [ "$waited" -ge "$READY_TIMEOUT" ]; then
+        echo "Backend not ready after ${READY_TIMEOUT}s, exiting"
+        kill $BACKEND_PID
+        exit 1
+    fi
+    sleep 1
+    waited=$((waited + 1))
+done
+echo "Backend ready after ${waited}s"
+
 # Start Nginx
 nginx -g 'daemon off;' &
 NGINX_PID=$!
 
-# Handle termination signals
-trap 'kill $BACKEND_PID $NGINX_PID; exit 0' SIGTERM SIGINT
-
 # Check if processes are still running
 while kill -0 $BACKEND_PID 2>/dev/null && kill -0 $NGINX_PID 2>/dev/null; do
     sleep 1
@@ -48,6 +48,23 @@ export const chatApi = {
         }
     },
 
+    // Fetch only messages newer than `cursor` (the last message_id already held)
+    syncSessionMessages: async (sessionId, cursor = null) => {
+        try {
+            const response = await api.get(`/chat/sessions/${sessionId}/export`, {
+                params: cursor ? { cursor } : {},
+                responseType: 'text'
+            });
+            return response.data
+                .split('\n')
+                .filter(line => line.trim())
+                .map(line => JSON.parse(line));
+        } catch (error) {
+            console.error('Error syncing session messages:', error);
+            throw error;
+        }
+    },
+
     getCopilotSummary: async (sessionId) => {
         try {
             const response = await api.get(`/chat/copilot-summary/${sessionId}`);
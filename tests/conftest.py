@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# The backend reads its configuration at import time, so set it up before any import
+_DATA_DIR = tempfile.mkdtemp(prefix="healmind-tests-")
+TEST_API_KEY = "test-key"
+os.environ["DATABASE_URL"] = f"sqlite:///{_DATA_DIR}/healmind.db"
+os.environ["API_KEYS"] = hashlib.sha256(TEST_API_KEY.encode()).hexdigest()
+os.environ["ARCHIVE_DIR"] = os.path.join(_DATA_DIR, "archive")
+os.environ["OLLAMA_BASE_URL"] = "http://ollama.test"
+os.environ["OPENAI_API_KEY"] = "test"
+os.environ["JOB_RUNNER_ENABLED"] = "false"
+os.environ["EMBEDDINGS_ENABLED"] = "false"
+os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ.pop("JOBS_REDIS_URL", None)
+os.environ.pop("IDEMPOTENCY_REDIS_URL", None)
+
+import httpx
+from fastapi.testclient import TestClient
+
+from database import Base, SessionLocal, engine
+import models.chat
+import models.status
+import models.analytics
+import models.embedding
+import models.job
+import models.usage
+from services.search import ensure_search_schema
+
+HEADERS = {"X-API-Key": TEST_API_KEY, "X-User-Email": "alice@example.com"}
+
+# Long enough to carry the wellness disclaimer
+REPLY = "Try a slow breathing exercise: in for four counts, hold for four, out for six, and notice how your shoulders drop. "
+PROMPT_TOKENS = 12
+COMPLETION_TOKENS = 30
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    Base.metadata.create_all(bind=engine)
+    ensure_search_schema(engine)
+    yield
+    engine.dispose()
+
+@pytest.fixture(autouse=True)
+def clean_tables():
+    yield
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+@pytest.fixture
+def db():
+    with SessionLocal() as session:
+        yield session
+
+@pytest.fixture(scope="session")
+def client():
+    import server
+
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def headers():
+    return dict(HEADERS)
+
+class FakeOllama:
+    """Answers Ollama's /api/generate with a fixed streamed reply and records the prompts."""
+
+    def __init__(self):
+        self.prompts = []
+        self.reply = REPLY
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path != "/api/generate":
+            return httpx.Response(200, json={"models": []})
+        self.prompts.append(json.loads(request.content)["prompt"])
+        words = [word + " " for word in self.reply.split()]
+        lines = [json.dumps({"model": "mistral", "created_at": "now", "response": word, "done": False}) for word in words]
+        lines.append(json.dumps({
+            "model": "mistral",
+            "created_at": "now",
+            "response": "",
+            "done": True,
+            "prompt_eval_count": PROMPT_TOKENS,
+            "eval_count": COMPLETION_TOKENS,
+        }))
+        return httpx.Response(200, text="\n".join(lines))
+
+@pytest.fixture
+def fake_ollama(monkeypatch):
+    fake = FakeOllama()
+    real_client = httpx.AsyncClient
+
+    def client_factory(*args, **kwargs):
+        kwargs["transport"] = httpx.MockTransport(fake.handler)
+        return real_client(*args, **kwargs)
+
+    monkeypatch.setattr(httpx, "AsyncClient", client_factory)
+    return fake
@@ -0,0 +1,91 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+from models.analytics import UserDailyActivity
+from models.chat import ChatMessage, ChatSession
+from services import analytics
+from tests.conftest import BACKEND_DIR
+
+USER = "alice@example.com"
+DAY = datetime(2024, 3, 4, 10, 0)
+
+def _session(db, session_id="s1", therapy="cbt"):
+    session = ChatSession(session_id=session_id, user_id=USER, session_metadata={"therapy": therapy})
+    db.add(session)
+    db.commit()
+    return session
+
+def _message(session_id, at, role="user"):
+    return ChatMessage(session_id=session_id, role=role, content="...", timestamp=at)
+
+def _rollups(db):
+    return {
+        (row.day.isoformat(), row.wellness_type): (row.sessions, row.messages, row.user_messages, row.talk_seconds)
+        for row in db.query(UserDailyActivity).filter(UserDailyActivity.user_id == USER)
+    }
+
+def test_messages_on_the_same_day_roll_up_into_one_row(db):
+    _session(db)
+    db.add_all([
+        _message("s1", DAY),
+        _message("s1", DAY + timedelta(seconds=60), role="assistant"),
+        _message("s1", DAY + timedelta(seconds=120)),
+    ])
+    db.commit()
+
+    assert _rollups(db) == {("2024-03-04", "cbt"): (1, 3, 2, 120.0)}
+    assert db.get(ChatSession, "s1").last_message_at == DAY + timedelta(seconds=120)
+
+def test_session_is_counted_on_each_day_it_is_active(db):
+    _session(db)
+    db.add(_message("s1", DAY))
+    db.commit()
+    db.add(_message("s1", DAY + timedelta(days=1)))
+    db.commit()
+
+    # A day-long gap is not talk time
+    assert _rollups(db) == {
+        ("2024-03-04", "cbt"): (1, 1, 1, 0.0),
+        ("2024-03-05", "cbt"): (1, 1, 1, 0.0),
+    }
+
+def test_second_flush_in_one_transaction_continues_from_the_first(db):
+    _session(db)
+    db.add(_message("s1", DAY))
+    db.flush()
+    db.add(_message("s1", DAY + timedelta(seconds=30), role="assistant"))
+    db.flush()
+    db.commit()
+
+    assert _rollups(db) == {("2024-03-04", "cbt"): (1, 2, 1, 30.0)}
+    assert db.get(ChatSession, "s1").last_message_at == DAY + timedelta(seconds=30)
+
+def test_rolled_back_messages_are_not_counted(db):
+    _session(db)
+    db.add(_message("s1", DAY))
+    db.flush()
+    db.rollback()
+
+    assert _rollups(db) == {}
+
+def test_rebuild_matches_the_incremental_rollups(db):
+    _session(db)
+    _session(db, "s2", therapy="mindfulness")
+    db.add_all([_message("s1", DAY), _message("s1", DAY + timedelta(seconds=90)), _message("s2", DAY)])
+    db.commit()
+    incremental = _rollups(db)
+
+    assert analytics.rebuild_user_activity(db, USER) == 2
+    assert _rollups(db) == incremental
+
+def test_listener_is_registered_without_the_chat_router():
+    script = (
+        "import sys, models.chat\n"
+        "from sqlalchemy import event\n"
+        "from sqlalchemy.orm import Session\n"
+        "assert 'routers.chat' not in sys.modules\n"
+        "assert event.contains(Session, 'after_flush', sys.modules['services.analytics']._roll_up_new_messages)\n"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=os.environ, check=True)
@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.chat import ChatMessage, ChatSession
+from models.job import Job
+from services import archive, jobs
+import disclaimers
+
+@pytest.fixture
+def store(tmp_path):
+    return archive.LocalArchiveStore(str(tmp_path))
+
+def _old_session(db, user_id="alice@example.com"):
+    started = datetime.utcnow() - timedelta(days=200)
+    session = ChatSession(session_id="old-session", user_id=user_id, created_at=started)
+    db.add(session)
+    db.add_all([
+        ChatMessage(message_id="m1", session_id=session.session_id, role="user",
+                    content="I keep waking up at 3am", timestamp=started),
+        ChatMessage(message_id="m2", session_id=session.session_id, role="assistant",
+                    content="That sounds exhausting.", disclaimer=disclaimers.WELLNESS,
+                    timestamp=started + timedelta(seconds=5)),
+    ])
+    db.commit()
+    return session
+
+def _messages(db, session_id):
+    return [
+        (m.message_id, m.role, m.content, m.disclaimer, m.timestamp)
+        for m in db.query(ChatMessage).filter(ChatMessage.session_id == session_id).order_by(ChatMessage.timestamp)
+    ]
+
+def test_archive_then_rehydrate_restores_messages(db, store):
+    session = _old_session(db)
+    before = _messages(db, session.session_id)
+
+    assert archive.archive_session(db, session, store) == 2
+    db.refresh(session)
+    assert session.archived_at is not None
+    assert _messages(db, session.session_id) == []
+    key = session.archive_key
+    assert store.get(key)
+
+    assert archive.rehydrate_session(db, session, store) == 2
+    db.refresh(session)
+    assert session.archived_at is None
+    assert session.archive_key is None
+    assert _messages(db, session.session_id) == before
+    with pytest.raises(archive.ArchiveStoreError):
+        store.get(key)
+
+def test_rehydrate_of_hot_session_is_a_no_op(db, store):
+    session = _old_session(db)
+    assert archive.rehydrate_session(db, session, store) == 0
+    assert len(_messages(db, session.session_id)) == 2
+
+def test_archive_cold_sessions_skips_recent_activity(db, store):
+    _old_session(db)
+    recent = ChatSession(session_id="recent-session", user_id="alice@example.com",
+                         created_at=datetime.utcnow() - timedelta(days=200))
+    db.add(recent)
+    db.add(ChatMessage(session_id=recent.session_id, role="user", content="still here"))
+    db.commit()
+
+    assert archive.archive_cold_sessions(db, store, older_than_days=90) == 1
+    assert db.get(ChatSession, "old-session").archived_at is not None
+    assert db.get(ChatSession, "recent-session").archived_at is None
+
+def test_archived_session_keeps_its_preview_in_the_list(client, db, headers, store):
+    session = _old_session(db)
+    archive.archive_session(db, session, store)
+
+    listed = client.get("/api/chat/sessions", headers=headers).json()
+
+    assert [(s["session_id"], s["summary"]) for s in listed] == [("old-session", "That sounds exhausting.")]
+
+    archive.rehydrate_session(db, session, store)
+    db.refresh(session)
+    assert session.archived_preview is None
+
+def test_archive_job_is_scheduled_once_per_interval(db):
+    jobs._schedule_periodic("archive_cold_sessions", 3600)
+    jobs._schedule_periodic("archive_cold_sessions", 3600)
+
+    job = db.query(Job).one()
+    assert (job.kind, job.status, job.max_attempts) == ("archive_cold_sessions", "queued", 1)
+
+def test_archive_job_archives_cold_sessions(db, monkeypatch, store):
+    _old_session(db)
+    monkeypatch.setattr(archive, "get_archive_store", lambda: store)
+
+    result = asyncio.run(jobs.archive_cold_sessions_job({}))
+
+    assert result == {"archived": 1}
+    db.expire_all()
+    assert db.get(ChatSession, "old-session").archived_at is not None
+
+def test_history_read_rehydrates_archived_session(client, db, headers):
+    session = _old_session(db)
+    before = _messages(db, session.session_id)
+    archive.archive_session(db, session)
+
+    response = client.get(f"/api/chat/sessions/{session.session_id}", headers=headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [m["message_id"] for m in body] == ["m1", "m2"]
+    assert body[1]["content"] == disclaimers.render("That sounds exhausting.", disclaimers.WELLNESS)
+    db.expire_all()
+    assert db.get(ChatSession, session.session_id).archived_at is None
+    assert _messages(db, session.session_id) == before
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from middleware.body_limit import BodySizeLimitMiddleware
+
+LIMIT = 1024
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.state.reached = []
+
+    @app.post("/limited")
+    async def limited(request: Request):
+        body = await request.body()
+        app.state.reached.append(len(body))
+        return {"size": len(body)}
+
+    @app.post("/upload")
+    async def upload(audio: UploadFile = File(...)):
+        data = await audio.read()
+        app.state.reached.append(len(data))
+        return {"size": len(data)}
+
+    @app.post("/unlimited")
+    async def unlimited(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(BodySizeLimitMiddleware, limits={"/limited": LIMIT, "/upload": LIMIT})
+    return app
+
+def _chunks(total: int, size: int = 256):
+    for _ in range(total // size):
+        yield b"x" * size
+
+def test_body_within_the_limit_is_passed_through(app):
+    response = TestClient(app).post("/limited", content=b"x" * LIMIT)
+
+    assert response.status_code == 200
+    assert response.json() == {"size": LIMIT}
+
+def test_declared_length_over_the_limit_is_refused_unread(app):
+    response = TestClient(app).post("/limited", content=b"x" * (LIMIT + 1))
+
+    assert response.status_code == 413
+    assert response.json() == {"detail": f"Request body exceeds {LIMIT} bytes"}
+    assert app.state.reached == []
+
+def test_chunked_body_over_the_limit_is_refused(app):
+    response = TestClient(app).post("/limited", content=_chunks(4 * LIMIT))
+
+    assert response.status_code == 413
+    assert app.state.reached == []
+
+def test_chunked_multipart_upload_over_the_limit_is_413_not_400(app):
+    boundary = "limit-test"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"audio\"; filename=\"a.wav\"\r\n"
+        "Content-Type: audio/wav\r\n\r\n"
+    ).encode() + b"x" * (4 * LIMIT) + f"\r\n--{boundary}--\r\n".encode()
+
+    response = TestClient(app).post(
+        "/upload",
+        content=(body[i:i + 256] for i in range(0, len(body), 256)),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+    )
+
+    assert response.status_code == 413
+    assert app.state.reached == []
+
+def test_chunked_body_is_cut_off_at_the_limit(app):
+    """The app never reads more than one chunk past the limit."""
+    chunk = b"x" * 256
+    delivered = []
+    sent = []
+
+    async def receive():
+        delivered.append(len(chunk))
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/limited", "raw_path": b"/limited", "root_path": "",
+        "query_string": b"", "headers": [(b"transfer-encoding", b"chunked")],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+
+    assert sent[0]["type"] == "http.response.start"
+    assert sent[0]["status"] == 413
+    assert sum(delivered) <= LIMIT + len(chunk)
+
+def test_other_paths_are_not_limited(app):
+    response = TestClient(app).post("/unlimited", content=b"x" * (4 * LIMIT))
+
+    assert response.status_code == 200
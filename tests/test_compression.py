@@ -0,0 +1,76 @@
+import gzip
+
+import brotli
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from middleware.compression import CompressionMiddleware
+from routers import chat
+
+BODY = "calm " * 500
+
+@pytest.fixture
+def app_client():
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large():
+        return PlainTextResponse(BODY)
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([BODY.encode(), BODY.encode()]), media_type="application/x-ndjson")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+def _get(client, path, accept):
+    # Read the raw bytes; httpx would otherwise decode gzip for us
+    with client.stream("GET", path, headers={"Accept-Encoding": accept}) as response:
+        return response, b"".join(response.iter_raw())
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("*", "br"),
+    ("*;q=0, gzip", "gzip"),
+    ("gzip;q=0, br;q=0", None),
+    ("identity", None),
+])
+def test_coding_follows_the_q_values(app_client, accept, expected):
+    response, body = _get(app_client, "/large", accept)
+
+    assert response.headers.get("Content-Encoding") == expected
+    assert response.headers["Content-Length"] == str(len(body))
+    if expected:
+        assert "Accept-Encoding" in response.headers["Vary"]
+    if expected == "br":
+        body = brotli.decompress(body)
+    elif expected == "gzip":
+        body = gzip.decompress(body)
+    assert body.decode() == BODY
+
+@pytest.mark.parametrize("path", ["/small", "/stream"])
+def test_small_and_streamed_bodies_are_not_compressed(app_client, path):
+    response, _ = _get(app_client, path, "br, gzip")
+
+    assert "Content-Encoding" not in response.headers
+
+def test_fast_json_history_matches_the_validated_response(client, headers, fake_ollama, monkeypatch):
+    session_id = client.post("/api/chat/message", json={"message": "hello"}, headers=headers).json()["session_id"]
+    validated = client.get(f"/api/chat/sessions/{session_id}", headers=headers)
+
+    monkeypatch.setattr(chat, "FAST_JSON_RESPONSES", True)
+    fast = client.get(f"/api/chat/sessions/{session_id}", headers=headers)
+
+    assert fast.status_code == 200
+    assert fast.json() == validated.json()
+    assert fast.headers["ETag"] == validated.headers["ETag"]
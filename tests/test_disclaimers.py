@@ -0,0 +1,78 @@
+import json
+
+import pytest
+import zstandard
+
+import disclaimers
+from models.chat import ChatMessage
+from services import archive
+from tests.conftest import REPLY
+
+LONG_REPLY = "x" * (disclaimers.MIN_REPLY_CHARS + 1)
+
+@pytest.mark.parametrize("template", sorted(disclaimers.DISCLAIMERS))
+def test_render_then_split_round_trips(template):
+    rendered = disclaimers.render(LONG_REPLY, template)
+
+    assert rendered != LONG_REPLY
+    assert disclaimers.split_disclaimer(rendered) == (LONG_REPLY, template)
+
+def test_plain_text_has_no_disclaimer():
+    assert disclaimers.render(LONG_REPLY, None) == LONG_REPLY
+    assert disclaimers.render(LONG_REPLY, "retired-template") == LONG_REPLY
+    assert disclaimers.split_disclaimer(LONG_REPLY) == (LONG_REPLY, None)
+
+def test_only_substantial_replies_get_a_disclaimer():
+    assert disclaimers.disclaimer_for("Hi there!") is None
+    assert disclaimers.disclaimer_for(LONG_REPLY) == disclaimers.WELLNESS
+    assert disclaimers.disclaimer_for(LONG_REPLY, disclaimers.VOICE_WELLNESS) == disclaimers.VOICE_WELLNESS
+
+def test_strip_context_removes_rendered_disclaimers():
+    context = [
+        {"role": "user", "content": "hello"},
+        {"role": "assistant", "content": disclaimers.render(LONG_REPLY, disclaimers.WELLNESS)},
+        {"role": "assistant"},
+        "not a turn",
+    ]
+
+    assert disclaimers.strip_context(context) == [
+        {"role": "user", "content": "hello"},
+        {"role": "assistant", "content": LONG_REPLY},
+        {"role": "assistant"},
+        "not a turn",
+    ]
+
+def test_chat_stores_the_template_id_and_renders_it(client, headers, fake_ollama, db):
+    response = client.post("/api/chat/message", json={"message": "I feel stuck"}, headers=headers)
+    assert response.status_code == 200
+    reply = response.json()["response"]
+
+    stored = db.query(ChatMessage).filter(ChatMessage.role == "assistant").one()
+    assert stored.content == REPLY
+    assert stored.disclaimer == disclaimers.WELLNESS
+    assert reply == disclaimers.render(stored.content, disclaimers.WELLNESS)
+
+    history = client.get(f"/api/chat/sessions/{stored.session_id}", headers=headers).json()
+    assert history[-1]["content"] == reply
+
+def test_resent_context_reaches_the_prompt_without_disclaimers(client, headers, fake_ollama):
+    rendered = disclaimers.render(LONG_REPLY, disclaimers.WELLNESS)
+    context = [{"role": "assistant", "content": rendered}, {"role": "user", "content": "and then?"}]
+
+    response = client.post("/api/chat/message", json={"message": "and then?", "context": context}, headers=headers)
+
+    assert response.status_code == 200
+    assert LONG_REPLY in fake_ollama.prompts[0]
+    assert disclaimers.DISCLAIMERS[disclaimers.WELLNESS].strip() not in fake_ollama.prompts[0]
+
+def test_legacy_archive_records_are_split_on_decode():
+    rendered = disclaimers.render(LONG_REPLY, disclaimers.WELLNESS)
+    lines = [
+        {"session_id": "s"},
+        {"message_id": "m1", "role": "assistant", "content": rendered, "timestamp": "2024-01-01T00:00:00"},
+    ]
+    data = zstandard.ZstdCompressor().compress("\n".join(json.dumps(line) for line in lines).encode())
+
+    _, messages = archive._decode_session(data)
+
+    assert (messages[0]["content"], messages[0]["disclaimer"]) == (LONG_REPLY, disclaimers.WELLNESS)
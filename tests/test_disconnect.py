@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+from starlette.requests import Request
+
+from disconnect import ClientDisconnected, cancel_on_disconnect
+
+def _request(disconnect_after=None):
+    async def receive():
+        if disconnect_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(disconnect_after)
+        return {"type": "http.disconnect"}
+    return Request({"type": "http", "method": "POST", "path": "/api/test/turn", "headers": []}, receive)
+
+def _disconnects():
+    return REGISTRY.get_sample_value("healmind_client_disconnects_total", {"route": "/api/test/turn"}) or 0
+
+def test_work_is_cancelled_when_the_client_leaves():
+    unwound = []
+
+    async def generation():
+        try:
+            await asyncio.sleep(10)
+        finally:
+            unwound.append(True)
+
+    async def scenario():
+        with pytest.raises(ClientDisconnected):
+            await cancel_on_disconnect(_request(disconnect_after=0.01), generation())
+    before = _disconnects()
+
+    asyncio.run(scenario())
+
+    # Cancelled and finished unwinding before ClientDisconnected was raised
+    assert unwound == [True]
+    assert _disconnects() == before + 1
+
+def test_result_is_returned_while_the_client_waits():
+    async def scenario():
+        return await cancel_on_disconnect(_request(), asyncio.sleep(0.01, result="reply"))
+
+    assert asyncio.run(scenario()) == "reply"
+
+def test_errors_from_the_work_propagate():
+    async def failing():
+        raise ValueError("model error")
+
+    async def scenario():
+        await cancel_on_disconnect(_request(), failing())
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
+
+def test_cancelling_the_request_cancels_the_work():
+    unwound = []
+
+    async def generation():
+        try:
+            await asyncio.sleep(10)
+        finally:
+            unwound.append(True)
+
+    async def scenario():
+        handler = asyncio.create_task(cancel_on_disconnect(_request(), generation()))
+        await asyncio.sleep(0.01)
+        handler.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await handler
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert unwound == [True]
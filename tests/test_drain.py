@@ -0,0 +1,77 @@
+import asyncio
+import inspect
+
+import pytest
+
+from drain import InFlightWork, ServerDraining, in_flight
+from models.chat import ChatSession
+
+def test_generations_are_refused_once_draining():
+    async def scenario():
+        work = InFlightWork(timeout=5)
+        work.begin()
+        generation = asyncio.sleep(0, result="reply")
+        with pytest.raises(ServerDraining):
+            await work.run(generation)
+        assert len(work) == 0
+        # Closed, so it is not reported as never awaited
+        assert inspect.getcoroutinestate(generation) == inspect.CORO_CLOSED
+    asyncio.run(scenario())
+
+def test_running_generation_finishes_within_the_timeout():
+    async def scenario():
+        work = InFlightWork(timeout=5)
+        generation = asyncio.create_task(work.run(asyncio.sleep(0.05, result="reply")))
+        await asyncio.sleep(0)
+        work.begin()
+        await work.wait()
+        assert await generation == "reply"
+    asyncio.run(scenario())
+
+def test_generation_past_the_timeout_is_cut_short():
+    async def scenario():
+        work = InFlightWork(timeout=0.05)
+        generation = asyncio.create_task(work.run(asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        work.begin()
+        await work.wait()
+        with pytest.raises(ServerDraining):
+            await generation
+        assert len(work) == 0
+    asyncio.run(scenario())
+
+def test_other_cancellations_are_not_reported_as_draining():
+    async def scenario():
+        work = InFlightWork(timeout=5)
+        generation = asyncio.create_task(work.run(asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        generation.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await generation
+    asyncio.run(scenario())
+
+@pytest.fixture
+def draining(monkeypatch):
+    monkeypatch.setattr(in_flight, "draining", True)
+
+def test_chat_while_draining_gets_503_with_retry_after(client, headers, fake_ollama, draining, db):
+    response = client.post("/api/chat/message", json={"message": "hello"}, headers=headers)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.headers["Connection"] == "close"
+    assert fake_ollama.prompts == []
+    # Refused before the session was created
+    assert db.query(ChatSession).count() == 0
+
+def test_ollama_chat_while_draining_gets_503(client, fake_ollama, draining):
+    response = client.post("/api/ollama-chat", json={"prompt": "hello"})
+
+    assert response.status_code == 503
+    assert fake_ollama.prompts == []
+
+def test_readiness_fails_while_draining(client, draining):
+    response = client.get("/api/readyz")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "draining"
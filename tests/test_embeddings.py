@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.chat import ChatMessage, ChatSession
+from models.embedding import MessageEmbedding
+from services import embeddings
+from services.embeddings import PendingEmbedding, UserIndexCache
+
+USER = "alice@example.com"
+# One axis per topic, so similarity is easy to reason about
+TOPICS = {"sleep": [1.0, 0.0, 0.0], "work": [0.0, 1.0, 0.0], "family": [0.0, 0.0, 1.0]}
+
+def _vector(text):
+    return next((vector for topic, vector in TOPICS.items() if topic in text), [0.0, 0.0, 0.0])
+
+@pytest.fixture(autouse=True)
+def fake_embeddings(monkeypatch):
+    embedded = []
+
+    async def embed(texts):
+        embedded.extend(texts)
+        return [_vector(text) for text in texts]
+
+    monkeypatch.setattr(embeddings.ollama_service, "embed", embed)
+    monkeypatch.setattr(embeddings, "index_cache", UserIndexCache(max_users=8, ttl=300))
+    return embedded
+
+def _history(db):
+    """Two older sessions and the current one, every message already embedded."""
+    start = datetime.utcnow() - timedelta(days=3)
+    turns = [
+        ("old", "m-sleep", "I only sleep four hours", start),
+        ("old", "m-work", "work deadlines pile up", start + timedelta(minutes=1)),
+        ("older", "m-sleep-2", "my sleep got better", start - timedelta(days=1)),
+        ("current", "m-now", "sleep is bad again", datetime.utcnow()),
+    ]
+    for session_id in {turn[0] for turn in turns}:
+        db.add(ChatSession(session_id=session_id, user_id=USER))
+    db.add_all(
+        ChatMessage(message_id=message_id, session_id=session_id, role="user", content=content, timestamp=at)
+        for session_id, message_id, content, at in turns
+    )
+    db.commit()
+    asyncio.run(embeddings.embed_and_store([
+        PendingEmbedding(message_id=message_id, session_id=session_id, user_id=USER, content=content)
+        for session_id, message_id, content, _ in turns
+    ]))
+
+def test_recall_finds_similar_turns_from_other_sessions(db):
+    _history(db)
+
+    messages, query = asyncio.run(embeddings.recall(db, USER, "cannot sleep", exclude_session_id="current"))
+
+    # Oldest first; the current session and the unrelated work turn are left out
+    assert [m.message_id for m in messages] == ["m-sleep-2", "m-sleep"]
+    assert query == TOPICS["sleep"]
+
+def test_recall_is_limited_to_k(db):
+    _history(db)
+
+    messages, _ = asyncio.run(embeddings.recall(db, USER, "sleep", exclude_session_id="current", k=1))
+
+    assert len(messages) == 1
+
+def test_recall_without_history_returns_the_query_vector(db):
+    messages, query = asyncio.run(embeddings.recall(db, "nobody@example.com", "sleep"))
+
+    assert (messages, query) == ([], TOPICS["sleep"])
+
+def test_duplicate_embeddings_are_skipped_not_failed(db):
+    first = PendingEmbedding(message_id="m1", session_id="s", user_id=USER, content="sleep", vector=TOPICS["sleep"])
+    embeddings._insert_embeddings([first])
+
+    again = PendingEmbedding(message_id="m1", session_id="s", user_id=USER, content="work", vector=TOPICS["work"])
+    new = PendingEmbedding(message_id="m2", session_id="s", user_id=USER, content="family", vector=TOPICS["family"])
+    embeddings._insert_embeddings([again, new])
+
+    stored = {row.message_id: list(embeddings.from_bytes(row.vector)) for row in db.query(MessageEmbedding)}
+    # The rest of the batch went in; the first vector was kept
+    assert stored == {"m1": TOPICS["sleep"], "m2": TOPICS["family"]}
+
+def test_backfill_only_embeds_messages_without_a_vector(db, fake_embeddings):
+    db.add(ChatSession(session_id="s", user_id=USER))
+    db.add_all([
+        ChatMessage(message_id="m1", session_id="s", role="user", content="sleep"),
+        ChatMessage(message_id="m2", session_id="s", role="assistant", content="work"),
+    ])
+    db.commit()
+    embeddings._insert_embeddings([
+        PendingEmbedding(message_id="m1", session_id="s", user_id=USER, content="sleep", vector=TOPICS["sleep"])
+    ])
+
+    assert asyncio.run(embeddings.backfill_embeddings()) == 1
+    assert fake_embeddings == ["work"]
+    assert db.query(MessageEmbedding).count() == 2
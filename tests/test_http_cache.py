@@ -0,0 +1,45 @@
+def _send(client, headers, message, session_id=None):
+    response = client.post("/api/chat/message", json={"message": message, "session_id": session_id}, headers=headers)
+    assert response.status_code == 200
+    return response.json()["session_id"]
+
+def test_history_revalidates_with_etag(client, headers, fake_ollama):
+    session_id = _send(client, headers, "I feel tense before meetings")
+    url = f"/api/chat/sessions/{session_id}"
+
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    cached = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+
+    _send(client, headers, "It got worse today", session_id)
+    changed = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.json()) == 4
+
+def test_history_honours_if_modified_since(client, headers, fake_ollama):
+    session_id = _send(client, headers, "Hello")
+    url = f"/api/chat/sessions/{session_id}"
+    last_modified = client.get(url, headers=headers).headers["Last-Modified"]
+
+    assert client.get(url, headers={**headers, "If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(url, headers={**headers, "If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}).status_code == 200
+
+def test_session_list_revalidates_with_etag(client, headers, fake_ollama):
+    _send(client, headers, "First session")
+
+    first = client.get("/api/chat/sessions", headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert client.get("/api/chat/sessions", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    _send(client, headers, "Second session")
+    changed = client.get("/api/chat/sessions", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert len(changed.json()) == 2
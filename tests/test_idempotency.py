@@ -0,0 +1,124 @@
+import asyncio
+import runpy
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+from starlette.requests import Request
+
+from routers.chat import ChatRequest
+from services import idempotency, usage
+from services.idempotency import MemoryIdempotencyStore, StoredResponse, idempotent_turns
+from tests.conftest import BACKEND_DIR, HEADERS
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    store = MemoryIdempotencyStore()
+    monkeypatch.setattr(idempotent_turns, "_store", store)
+    return store
+
+def _chat(client, headers, message="I can't sleep", key="turn-1"):
+    return client.post("/api/chat/message", json={"message": message}, headers={**headers, "Idempotency-Key": key})
+
+def test_retry_of_a_finished_turn_is_replayed(client, headers, fake_ollama):
+    first = _chat(client, headers)
+    retry = _chat(client, headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert "Idempotent-Replayed" not in first.headers
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert len(fake_ollama.prompts) == 1
+
+def test_key_reused_for_a_different_request_is_rejected(client, headers, fake_ollama):
+    assert _chat(client, headers).status_code == 200
+
+    response = _chat(client, headers, message="Something else entirely")
+
+    assert response.status_code == 422
+    assert len(fake_ollama.prompts) == 1
+
+def test_keys_are_scoped_to_the_caller(client, headers, fake_ollama):
+    first = _chat(client, headers)
+    other_user = _chat(client, {**headers, "X-User-Email": "bob@example.com"})
+
+    assert other_user.status_code == 200
+    assert "Idempotent-Replayed" not in other_user.headers
+    assert other_user.json()["session_id"] != first.json()["session_id"]
+    assert len(fake_ollama.prompts) == 2
+
+def test_failed_turn_releases_its_key(store):
+    async def turn():
+        raise RuntimeError("model unavailable")
+
+    async def scenario():
+        assert await store.claim("turn", "fingerprint", idempotency.IDEMPOTENCY_PENDING_TTL)
+        with pytest.raises(RuntimeError):
+            await idempotent_turns._run_turn("turn", "fingerprint", turn, None, "/api/chat/message")
+        return await store.get("turn")
+
+    # A retry runs the turn again instead of waiting on a turn that will never finish
+    assert asyncio.run(scenario()) is None
+
+@pytest.mark.parametrize("key", ["", "x" * (idempotency.MAX_KEY_LENGTH + 1)])
+def test_invalid_key_is_rejected(client, headers, fake_ollama, key):
+    assert _chat(client, headers, key=key).status_code == 400
+    assert fake_ollama.prompts == []
+
+def test_turn_running_elsewhere_gets_409_after_the_wait(client, headers, fake_ollama, store, monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_WAIT_TIMEOUT", 0.2)
+    monkeypatch.setattr(idempotency, "POLL_INTERVAL", 0.05)
+    request = Request({
+        "type": "http",
+        "method": "POST",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "path": "/api/chat/message",
+        "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in HEADERS.items()],
+    })
+    # Another worker claimed the key for the same request and has not finished
+    scoped = idempotency._scoped_key(request, "turn-1")
+    fingerprint = idempotency.fingerprint(ChatRequest(message="I can't sleep"))
+    assert asyncio.run(store.claim(scoped, fingerprint, idempotency.IDEMPOTENCY_PENDING_TTL))
+
+    response = _chat(client, headers)
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "5"
+    assert fake_ollama.prompts == []
+
+def test_turn_meters_its_own_usage(monkeypatch):
+    meter = usage.usage_meter
+    monkeypatch.setattr(meter, "_pending", defaultdict(lambda: dict.fromkeys(usage.COUNTERS, 0)))
+
+    async def turn():
+        usage.record_tokens(5, 7)
+        return StoredResponse.from_content({"ok": True})
+
+    async def scenario():
+        with usage.usage_scope("key-hash", "/api/chat/message") as request_usage:
+            result = await idempotent_turns._run_turn("turn", "fingerprint", turn, "key-hash", "/api/chat/message")
+        return request_usage, result
+
+    request_usage, result = asyncio.run(scenario())
+
+    assert result.status_code == 200
+    # Recorded against the turn's own scope, not the request's (which may be gone)
+    assert (request_usage.prompt_tokens, request_usage.completion_tokens) == (0, 0)
+    counters = next(iter(meter._pending.values()))
+    assert (counters["requests"], counters["prompt_tokens"], counters["completion_tokens"]) == (0, 5, 7)
+
+@pytest.mark.parametrize("workers, redis_url, warned", [(4, None, True), (1, None, False), (4, "redis://cache/1", False)])
+def test_gunicorn_warns_about_per_worker_keys(monkeypatch, workers, redis_url, warned):
+    if redis_url:
+        monkeypatch.setenv("IDEMPOTENCY_REDIS_URL", redis_url)
+    else:
+        monkeypatch.delenv("IDEMPOTENCY_REDIS_URL", raising=False)
+    config = runpy.run_path(str(BACKEND_DIR / "gunicorn.conf.py"))
+    warnings = []
+    server = SimpleNamespace(cfg=SimpleNamespace(workers=workers), log=SimpleNamespace(warning=lambda *args: warnings.append(args)))
+
+    config["on_starting"](server)
+
+    assert bool(warnings) == warned
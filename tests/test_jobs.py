@@ -0,0 +1,123 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.job import Job
+from services import jobs
+
+@pytest.fixture
+def handlers(monkeypatch):
+    registered = {}
+    monkeypatch.setattr(jobs, "_handlers", registered)
+    return registered
+
+def _job(db, kind="test", **values):
+    job = Job(kind=kind, payload={"n": 1}, **values)
+    db.add(job)
+    db.commit()
+    return job.id
+
+def _reload(db, job_id):
+    db.expire_all()
+    return db.get(Job, job_id)
+
+def _run(job_id):
+    runner = jobs.JobRunner(concurrency=1, timeout=5)
+    claimed = jobs._claim(job_id)
+    assert claimed is not None
+    asyncio.run(runner._execute(job_id, *claimed))
+
+def test_claim_runs_a_job_once(db):
+    job_id = _job(db)
+
+    assert jobs._claim(job_id) == ("test", {"n": 1}, 1, 3)
+    assert jobs._claim(job_id) is None
+    job = _reload(db, job_id)
+    assert job.status == "running"
+    assert job.attempts == 1
+
+def test_claim_waits_for_run_after(db):
+    job_id = _job(db, run_after=datetime.utcnow() + timedelta(minutes=5))
+
+    assert jobs._claim(job_id) is None
+    assert _reload(db, job_id).status == "queued"
+
+def test_successful_job_stores_its_result(db, handlers):
+    async def double(payload):
+        return {"n": payload["n"] * 2}
+    handlers["test"] = double
+    job_id = _job(db)
+
+    _run(job_id)
+
+    job = _reload(db, job_id)
+    assert job.status == "succeeded"
+    assert job.result == {"n": 2}
+    assert job.finished_at is not None
+
+def test_failed_job_is_retried_with_exponential_backoff(db, handlers, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_RETRY_DELAY", 10.0)
+    calls = []
+
+    async def flaky(payload):
+        calls.append(payload)
+        raise RuntimeError("model unavailable")
+    handlers["test"] = flaky
+    job_id = _job(db)
+
+    delays = []
+    for _ in range(2):
+        before = datetime.utcnow()
+        _run(job_id)
+        job = _reload(db, job_id)
+        assert job.status == "queued"
+        assert job.error == "model unavailable"
+        delays.append((job.run_after - before).total_seconds())
+        # Make the retry due now
+        job.run_after = datetime.utcnow()
+        db.commit()
+
+    assert 10 <= delays[0] < 11
+    assert 20 <= delays[1] < 21
+
+    _run(job_id)
+    job = _reload(db, job_id)
+    assert job.status == "failed"
+    assert job.attempts == 3
+    assert job.finished_at is not None
+    assert len(calls) == 3
+
+def test_unknown_kind_fails_without_retry(db, handlers):
+    job_id = _job(db, kind="missing")
+
+    _run(job_id)
+
+    job = _reload(db, job_id)
+    assert job.status == "failed"
+    assert job.attempts == 1
+
+def test_interrupted_job_is_released_without_counting_the_attempt(db, handlers):
+    async def slow(payload):
+        await asyncio.sleep(10)
+    handlers["test"] = slow
+    job_id = _job(db)
+
+    async def interrupt():
+        runner = jobs.JobRunner(concurrency=1, timeout=30)
+        task = asyncio.create_task(runner._execute(job_id, *jobs._claim(job_id)))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    asyncio.run(interrupt())
+
+    job = _reload(db, job_id)
+    assert job.status == "queued"
+    assert job.attempts == 0
+
+def test_stale_running_jobs_are_requeued(db, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_TIMEOUT", 1.0)
+    job_id = _job(db, status="running", attempts=1, started_at=datetime.utcnow() - timedelta(minutes=1))
+
+    assert jobs._due_jobs(10) == [(job_id, jobs.DEFAULT_PRIORITY)]
+    assert _reload(db, job_id).status == "queued"
@@ -0,0 +1,86 @@
+import io
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+
+import pytest
+
+import logging_config
+from logging_config import RequestContextFilter, SamplingFilter, _RecordQueueHandler, request_id_var
+
+def _record(name="app", level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+@pytest.fixture
+def json_logger():
+    """A logger wired like configure_logging: queue handler in front, JSON writer on the listener thread."""
+    stream = io.StringIO()
+    writer = logging.StreamHandler(stream)
+    writer.setFormatter(logging_config._build_formatter("json"))
+    handler = _RecordQueueHandler(queue.SimpleQueue())
+    handler.addFilter(RequestContextFilter())
+    listener = QueueListener(handler.queue, writer)
+    listener.start()
+
+    logger = logging.getLogger("tests.logging")
+    logger.propagate = False
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    def lines():
+        listener.stop()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+    yield logger, lines
+    logger.removeHandler(handler)
+
+def test_records_are_written_as_json_with_the_request_id(json_logger):
+    logger, lines = json_logger
+    token = request_id_var.set("req-123")
+    try:
+        logger.info("Saved %d messages", 3)
+    finally:
+        request_id_var.reset(token)
+
+    [line] = lines()
+    assert (line["level"], line["logger"], line["message"], line["request_id"]) == (
+        "INFO", "tests.logging", "Saved 3 messages", "req-123"
+    )
+
+def test_traceback_gets_its_own_field(json_logger):
+    logger, lines = json_logger
+    try:
+        raise ValueError("bad input")
+    except ValueError:
+        logger.exception("Request failed")
+
+    [line] = lines()
+    assert line["message"] == "Request failed"
+    assert "ValueError: bad input" in line["exc_info"]
+
+def test_queued_record_carries_its_rendered_message():
+    prepared = _RecordQueueHandler(queue.SimpleQueue()).prepare(_record(color_message="\x1b[1mhello\x1b[0m"))
+
+    assert (prepared.msg, prepared.args) == ("hello world", None)
+    assert "color_message" not in prepared.__dict__
+
+def test_sampled_loggers_are_thinned_but_warnings_are_kept(monkeypatch):
+    sampler = SamplingFilter(rate=0.1, loggers=["uvicorn.access"])
+    monkeypatch.setattr(logging_config.random, "random", lambda: 0.5)
+
+    assert not sampler.filter(_record("uvicorn.access"))
+    assert not sampler.filter(_record("app", sampled=True))
+    assert sampler.filter(_record("app"))
+    assert sampler.filter(_record("uvicorn.access", level=logging.WARNING))
+
+    monkeypatch.setattr(logging_config.random, "random", lambda: 0.05)
+    assert sampler.filter(_record("uvicorn.access"))
+
+def test_full_rate_keeps_everything():
+    assert SamplingFilter(rate=1.0, loggers=["uvicorn.access"]).filter(_record("uvicorn.access"))
+
+def test_request_id_is_reused_or_generated(client):
+    assert client.get("/api/healthz", headers={"X-Request-ID": "from-nginx"}).headers["X-Request-ID"] == "from-nginx"
+    assert client.get("/api/healthz").headers["X-Request-ID"]
@@ -0,0 +1,47 @@
+from prometheus_client import REGISTRY
+
+from metrics import observe_stage
+
+def _count(route, status, method="GET"):
+    value = REGISTRY.get_sample_value(
+        "healmind_http_request_duration_seconds_count",
+        {"method": method, "route": route, "status": status}
+    )
+    return value or 0
+
+def test_requests_are_labelled_by_route_template(client, headers):
+    before = _count("/api/chat/sessions/{session_id}", "404")
+
+    for session_id in ("first", "second"):
+        assert client.get(f"/api/chat/sessions/{session_id}", headers=headers).status_code == 404
+
+    assert _count("/api/chat/sessions/{session_id}", "404") == before + 2
+    assert _count("/api/chat/sessions/first", "404") == 0
+
+def test_unknown_paths_share_one_label(client):
+    before = _count("unmatched", "404")
+
+    client.get("/no/such/path/1")
+    client.get("/no/such/path/2")
+
+    assert _count("unmatched", "404") == before + 2
+
+def test_metrics_endpoint_exposes_the_histograms(client):
+    client.get("/api/healthz")
+
+    body = client.get("/metrics").text
+
+    assert "healmind_http_request_duration_seconds_bucket" in body
+    assert 'route="/api/healthz"' in body
+
+def test_observe_stage_times_failing_blocks_too():
+    labels = {"operation": "test_operation", "stage": "boom"}
+    before = REGISTRY.get_sample_value("healmind_stage_duration_seconds_count", labels) or 0
+
+    try:
+        with observe_stage("test_operation", "boom"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+
+    assert REGISTRY.get_sample_value("healmind_stage_duration_seconds_count", labels) == before + 1
@@ -0,0 +1,62 @@
+import asyncio
+import time
+from collections import Counter
+
+from profiling import RequestProfile, SamplingProfiler
+
+def _spin_in_child(seconds=0.1):
+    """Hold the event loop without yielding, as blocking code in a handler would."""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+async def _child_work():
+    _spin_in_child()
+
+def _profile_request(adopt: bool):
+    async def request():
+        profiler = SamplingProfiler(interval=0.001)
+        profile = profiler.begin("POST", "/api/chat/message", "req-1")
+        child = asyncio.create_task(_child_work())
+        if adopt:
+            profiler.adopt(child)
+        await child
+        profiler.end(profile)
+        return profiler, profile
+    return asyncio.run(request())
+
+def _sampled(profile, function):
+    return sum(count for stack, count in profile.samples.items() if any(function in label for label in stack))
+
+def test_adopted_child_task_is_charged_to_the_request():
+    profiler, profile = _profile_request(adopt=True)
+
+    assert _sampled(profile, "_spin_in_child") > 0
+    # The done callback released the child
+    assert profiler._active == {}
+
+def test_child_task_is_not_sampled_without_adopt():
+    _, profile = _profile_request(adopt=False)
+
+    assert _sampled(profile, "_spin_in_child") == 0
+
+def test_adopt_outside_a_profiled_request_is_a_no_op():
+    async def scenario():
+        profiler = SamplingProfiler(interval=0.001)
+        child = asyncio.create_task(asyncio.sleep(0))
+        profiler.adopt(child)
+        await child
+        return profiler
+    assert asyncio.run(scenario())._active == {}
+
+def test_profile_reports_self_and_total_counts():
+    profile = RequestProfile(profile_id="p", method="GET", path="/", interval=0.005)
+    profile.samples = Counter({("handler", "query"): 3, ("handler",): 1})
+
+    report = profile.to_dict()
+
+    assert report["samples"] == 4
+    assert report["on_loop_ms"] == 20.0
+    assert report["top"][0] == {"function": "handler", "self": 1, "total": 4}
+    assert {"function": "query", "self": 3, "total": 3} in report["top"]
+    assert report["folded"][0] == "handler;query 3"
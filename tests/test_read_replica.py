@@ -0,0 +1,99 @@
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+import database
+from database import Base, RecentWrites, RoutingSession
+from models.chat import ChatSession
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """
+    Point the primary and the replica at two SQLite files, as DATABASE_URL and
+    READ_DATABASE_URL would, each holding one session named after its database.
+    """
+    engines = {}
+    for name in ("primary", "replica"):
+        url = f"sqlite:///{tmp_path / name}.db"
+        engines[name] = create_engine(url, **database._engine_options(url))
+        Base.metadata.create_all(engines[name])
+        with sessionmaker(bind=engines[name])() as db:
+            db.add(ChatSession(session_id=f"on-{name}", user_id="alice@example.com"))
+            db.commit()
+
+    monkeypatch.setattr(database, "engine", engines["primary"])
+    monkeypatch.setattr(database, "read_engine", engines["replica"])
+    monkeypatch.setattr(database, "ReadSessionLocal", sessionmaker(autocommit=False, autoflush=False, class_=RoutingSession))
+    monkeypatch.setattr(database, "recent_writes", RecentWrites(60))
+    yield
+    for engine in engines.values():
+        engine.dispose()
+
+def _request(session_id=None, user_email=None):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"x-user-email", user_email.encode())] if user_email else [],
+        "path_params": {"session_id": session_id} if session_id else {},
+    })
+
+def _answered_by(db) -> str:
+    """Which database served the read: the session id names it."""
+    return db.query(ChatSession.session_id).filter(ChatSession.session_id.like("on-%")).scalar()
+
+def _read(request):
+    dependency = database.get_read_db(request)
+    db = next(dependency)
+    try:
+        return _answered_by(db)
+    finally:
+        dependency.close()
+
+def test_reads_go_to_the_replica(replica):
+    assert _read(_request()) == "on-replica"
+    assert _read(_request(session_id="s1", user_email="alice@example.com")) == "on-replica"
+
+def test_session_written_recently_is_read_from_the_primary(replica):
+    database.mark_written(session_id="s1")
+
+    assert _read(_request(session_id="s1")) == "on-primary"
+    assert _read(_request(session_id="s2")) == "on-replica"
+
+def test_user_who_wrote_recently_is_read_from_the_primary(replica):
+    database.mark_written(user_id="alice@example.com")
+
+    assert _read(_request(user_email="alice@example.com")) == "on-primary"
+    assert _read(_request(user_email="bob@example.com")) == "on-replica"
+
+def test_read_your_writes_window_expires(replica, monkeypatch):
+    monkeypatch.setattr(database, "recent_writes", RecentWrites(0))
+    database.mark_written(session_id="s1")
+
+    assert _read(_request(session_id="s1")) == "on-replica"
+
+def test_session_stays_on_the_primary_after_a_flush(replica):
+    with database.ReadSessionLocal() as db:
+        assert _answered_by(db) == "on-replica"
+        db.add(ChatSession(session_id="new-session", user_id="alice@example.com"))
+        db.flush()
+
+        assert db.pinned_to_primary
+        assert _answered_by(db) == "on-primary"
+        # Its own uncommitted write is visible
+        assert db.get(ChatSession, "new-session") is not None
+
+def test_session_stays_on_the_primary_after_dml(replica):
+    with database.ReadSessionLocal() as db:
+        db.execute(update(ChatSession).where(ChatSession.session_id == "on-primary").values(user_id="bob@example.com"))
+
+        assert _answered_by(db) == "on-primary"
+        assert db.get(ChatSession, "on-primary").user_id == "bob@example.com"
+
+def test_row_lock_is_taken_on_the_primary(replica):
+    with database.ReadSessionLocal() as db:
+        locked = db.query(ChatSession).filter(ChatSession.session_id.like("on-%")).with_for_update().one()
+
+        assert locked.session_id == "on-primary"
+        assert _answered_by(db) == "on-primary"
@@ -0,0 +1,56 @@
+import pytest
+
+from models.chat import ChatMessage, ChatSession
+from services import search
+
+ALICE = "alice@example.com"
+BOB = "bob@example.com"
+
+@pytest.fixture
+def histories(db):
+    db.add_all([
+        ChatSession(session_id="alice-session", user_id=ALICE),
+        ChatSession(session_id="bob-session", user_id=BOB),
+    ])
+    db.add_all([
+        ChatMessage(session_id="alice-session", role="user", content="My anxiety spikes before exams"),
+        ChatMessage(session_id="alice-session", role="user", content="Sleep has been fine lately"),
+        ChatMessage(session_id="bob-session", role="user", content="Work anxiety keeps me up at night"),
+    ])
+    db.commit()
+
+def _search(client, headers, query, user):
+    response = client.get("/api/chat/search", params={"q": query}, headers={**headers, "X-User-Email": user})
+    assert response.status_code == 200
+    return response.json()
+
+def test_search_only_returns_the_callers_messages(client, headers, histories):
+    alice_hits = _search(client, headers, "anxiety", ALICE)
+    bob_hits = _search(client, headers, "anxiety", BOB)
+
+    assert [hit["session_id"] for hit in alice_hits] == ["alice-session"]
+    assert [hit["session_id"] for hit in bob_hits] == ["bob-session"]
+    assert "<mark>anxiety</mark>" in alice_hits[0]["snippet"]
+
+def test_search_for_another_users_words_finds_nothing(client, headers, histories):
+    assert _search(client, headers, "work night", ALICE) == []
+    assert _search(client, headers, "exams", BOB) == []
+    assert _search(client, headers, "anxiety", "carol@example.com") == []
+
+def test_search_escapes_query_syntax_and_html(client, headers, db):
+    db.add(ChatSession(session_id="s", user_id=ALICE))
+    db.add(ChatMessage(session_id="s", role="user", content="<b>anxiety</b> AND \"quotes\""))
+    db.commit()
+
+    hits = _search(client, headers, 'anxiety" OR owner:*', ALICE)
+
+    assert len(hits) == 1
+    assert "&lt;b&gt;" in hits[0]["snippet"]
+
+def test_scan_fallback_is_scoped_to_the_user(db, histories):
+    alice_hits = search._scan_messages(db, ALICE, "Anxiety", limit=10, offset=0)
+    bob_hits = search._scan_messages(db, BOB, "anxiety night", limit=10, offset=0)
+
+    assert [hit.session_id for hit in alice_hits] == ["alice-session"]
+    assert [hit.session_id for hit in bob_hits] == ["bob-session"]
+    assert search.highlight(alice_hits[0].snippet) == "My <mark>anxiety</mark> spikes before exams"
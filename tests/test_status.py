@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.status import StatusCheck
+from services import status_ingest
+from services.status_ingest import StatusCheckWriter, StatusIngestOverloaded
+
+def _heartbeat(i):
+    return {"id": f"check-{i}", "client_name": "probe", "timestamp": datetime.utcnow()}
+
+def test_writer_inserts_in_batches_and_drains_on_stop(db, monkeypatch):
+    batches = []
+    insert_rows = status_ingest._insert_rows
+
+    def record(rows):
+        batches.append(len(rows))
+        insert_rows(rows)
+    monkeypatch.setattr(status_ingest, "_insert_rows", record)
+
+    async def scenario():
+        writer = StatusCheckWriter(batch_size=3, flush_interval=10, max_pending=100)
+        writer.start()
+        for i in range(7):
+            writer.submit(_heartbeat(i))
+        # Two full batches go out without waiting for the flush interval
+        for _ in range(100):
+            if sum(batches) >= 6:
+                break
+            await asyncio.sleep(0.01)
+        await writer.stop()
+
+    asyncio.run(scenario())
+
+    assert batches == [3, 3, 1]
+    assert db.query(StatusCheck).count() == 7
+
+def test_writer_refuses_heartbeats_past_max_pending():
+    async def scenario():
+        writer = StatusCheckWriter(batch_size=10, flush_interval=10, max_pending=2)
+        # Not started as a task, so nothing drains the queue
+        writer._queue = asyncio.Queue(maxsize=writer.max_pending)
+        writer.submit(_heartbeat(0))
+        writer.submit(_heartbeat(1))
+        with pytest.raises(StatusIngestOverloaded):
+            writer.submit(_heartbeat(2))
+    asyncio.run(scenario())
+
+def test_cursor_pages_cover_every_heartbeat_once(client, db):
+    now = datetime.utcnow()
+    # Heartbeats sharing a timestamp are ordered by id, so none is skipped at a page boundary
+    db.add_all(
+        StatusCheck(id=f"check-{i}", client_name="probe", timestamp=now - timedelta(seconds=i // 2))
+        for i in range(5)
+    )
+    db.commit()
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/status", params=params)
+        assert response.status_code == 200
+        pages.append([check["id"] for check in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert pages == [["check-1", "check-0"], ["check-3", "check-2"], ["check-4"]]
+
+def test_old_heartbeats_are_outside_the_default_window(client, db):
+    db.add_all([
+        StatusCheck(client_name="probe", timestamp=datetime.utcnow()),
+        StatusCheck(client_name="probe", timestamp=datetime.utcnow() - timedelta(days=2)),
+    ])
+    db.commit()
+
+    assert len(client.get("/api/status").json()) == 1
+    latest = client.get("/api/status/latest").json()
+    assert [(row["client_name"], row["heartbeats"]) for row in latest] == [("probe", 1)]
+
+def test_invalid_cursor_is_a_400(client):
+    assert client.get("/api/status", params={"cursor": "not-a-cursor"}).status_code == 400
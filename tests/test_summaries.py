@@ -0,0 +1,55 @@
+import asyncio
+
+from models.chat import ChatMessage, ChatSession
+from services import archive, jobs, summaries
+from tests.conftest import REPLY
+
+def _session(db, session_id="s1"):
+    db.add(ChatSession(session_id=session_id, user_id="alice@example.com", session_metadata={"therapy": "cbt"}))
+    db.add(ChatMessage(session_id=session_id, role="user", content="I keep replaying the meeting"))
+    db.commit()
+
+def _metadata(session_id="s1"):
+    with summaries.SessionLocal() as db:
+        return db.get(ChatSession, session_id).session_metadata
+
+def test_summary_write_keeps_metadata_changed_meanwhile(db, fake_ollama, monkeypatch):
+    _session(db)
+    generate_response = summaries.ollama_service.generate_response
+
+    async def slow_model(prompt):
+        # Another request updates the session while the model runs
+        with summaries.SessionLocal() as other:
+            other.get(ChatSession, "s1").session_metadata = {"therapy": "cbt", "mood": "low"}
+            other.commit()
+        return await generate_response(prompt)
+    monkeypatch.setattr(summaries.ollama_service, "generate_response", slow_model)
+
+    summary = asyncio.run(summaries.summarize_session(db, db.get(ChatSession, "s1")))
+
+    metadata = _metadata()
+    assert summary == metadata["summary"]
+    assert (metadata["therapy"], metadata["mood"]) == ("cbt", "low")
+    assert metadata["summary_until"] is not None
+
+def test_summary_is_reused_until_the_next_message(client, headers, fake_ollama, db):
+    _session(db)
+
+    first = client.get("/api/chat/copilot-summary/s1", headers=headers)
+    again = client.get("/api/chat/copilot-summary/s1", headers=headers)
+
+    assert first.status_code == again.status_code == 200
+    assert again.json() == first.json()
+    assert len(fake_ollama.prompts) == 1
+
+def test_summary_job_rehydrates_an_archived_session(db, fake_ollama, tmp_path, monkeypatch):
+    store = archive.LocalArchiveStore(str(tmp_path))
+    monkeypatch.setattr(archive, "get_archive_store", lambda: store)
+    _session(db)
+    archive.archive_session(db, db.get(ChatSession, "s1"))
+
+    result = asyncio.run(jobs.copilot_summary_job({"session_id": "s1"}))
+
+    assert result["summary"].strip() == REPLY.strip()
+    assert "I keep replaying the meeting" in fake_ollama.prompts[0]
+    assert _metadata()["summary"] == result["summary"]
@@ -0,0 +1,71 @@
+import asyncio
+import hashlib
+from collections import defaultdict
+
+import pytest
+
+from tests.conftest import COMPLETION_TOKENS, PROMPT_TOKENS, TEST_API_KEY
+from models.usage import ApiUsage
+from services import usage
+
+KEY_HASH = hashlib.sha256(TEST_API_KEY.encode()).hexdigest()
+
+@pytest.fixture(autouse=True)
+def fresh_meter(monkeypatch):
+    meter = usage.usage_meter
+    monkeypatch.setattr(meter, "_pending", defaultdict(lambda: dict.fromkeys(usage.COUNTERS, 0)))
+    monkeypatch.setattr(meter, "_daily_totals", {})
+    return meter
+
+def _chat(client, headers):
+    return client.post("/api/chat/message", json={"message": "I can't switch off after work"}, headers=headers)
+
+def test_tokens_are_metered_in_memory_until_flushed(client, headers, fake_ollama, db, fresh_meter):
+    assert _chat(client, headers).status_code == 200
+
+    assert fresh_meter.usage_today(KEY_HASH) == (PROMPT_TOKENS + COMPLETION_TOKENS, 0.0)
+    assert db.query(ApiUsage).count() == 0
+
+    asyncio.run(fresh_meter.flush())
+
+    row = db.query(ApiUsage).one()
+    assert (row.api_key_hash, row.route) == (KEY_HASH, "/api/chat/message")
+    assert (row.requests, row.prompt_tokens, row.completion_tokens) == (1, PROMPT_TOKENS, COMPLETION_TOKENS)
+    # Totals now come from the flushed rows
+    assert fresh_meter.usage_today(KEY_HASH) == (PROMPT_TOKENS + COMPLETION_TOKENS, 0.0)
+
+def test_flushes_add_to_the_same_hourly_row(client, headers, fake_ollama, db, fresh_meter):
+    for _ in range(2):
+        assert _chat(client, headers).status_code == 200
+        asyncio.run(fresh_meter.flush())
+
+    row = db.query(ApiUsage).one()
+    assert row.requests == 2
+    assert row.completion_tokens == 2 * COMPLETION_TOKENS
+
+def test_key_over_its_daily_token_quota_gets_429(client, headers, fake_ollama, monkeypatch):
+    monkeypatch.setattr(usage, "USAGE_DAILY_TOKEN_QUOTA", PROMPT_TOKENS + COMPLETION_TOKENS)
+
+    assert _chat(client, headers).status_code == 200
+    refused = _chat(client, headers)
+
+    assert refused.status_code == 429
+    assert "quota" in refused.json()["detail"]
+    assert len(fake_ollama.prompts) == 1
+    # Reading usage is still allowed
+    report = client.get("/api/usage", headers=headers)
+    assert report.status_code == 200
+    assert report.json()["quota"]["tokens_used_today"] == PROMPT_TOKENS + COMPLETION_TOKENS
+
+def test_quota_counts_flushed_usage(client, headers, fake_ollama, monkeypatch, fresh_meter):
+    monkeypatch.setattr(usage, "USAGE_DAILY_TOKEN_QUOTA", PROMPT_TOKENS + COMPLETION_TOKENS)
+    assert _chat(client, headers).status_code == 200
+    asyncio.run(fresh_meter.flush())
+
+    assert _chat(client, headers).status_code == 429
+
+def test_unauthenticated_requests_are_not_metered(client, fake_ollama, fresh_meter):
+    response = client.post("/api/chat/message", json={"message": "hi"}, headers={"X-API-Key": "wrong"})
+
+    assert response.status_code == 401
+    assert not fresh_meter._pending